@@ -1,9 +1,12 @@
+import glob
 import os
+import queue
+import threading
 
 import numpy
-import pandas as pd
 
 from model.audio_manager import AudioManager
+from model.downsampler import MinMaxDownsampler
 from model.eda_manager import EDAManager
 from model.survey_manager import SurveyManager
 from view.main_view import MainView
@@ -18,24 +21,79 @@ class SyncController:
     FIRST_NAME_HEADER = "RecipientFirstName"
     LAST_NAME_HEADER = "RecipientLastName"
 
-    def __init__(self, audio_model: AudioManager, survey_model: SurveyManager, eda_model: EDAManager, view: MainView):
+    # The spans of the live audio and EDA plots in seconds (None for the whole recording)
+    AUDIO_PLOT_SECONDS = 10
+    EDA_PLOT_SECONDS = 60
+
+    # The most points drawn per plot (a min/max pair per pixel column of a wide plot)
+    PLOT_POINTS = 2000
+
+    def __init__(self, audio_model: AudioManager, survey_model: SurveyManager, eda_model: EDAManager, view: MainView,
+                 plot_points: int = PLOT_POINTS):
         self.audio_model = audio_model
         self.survey_model = survey_model
         self.eda_model = eda_model
         self.view = view
+        self.survey_events = queue.Queue()
+        self.survey_thread = None
+        self.audio_file_path = None
+        self.eda_file_path = None
+        self.plot_points = plot_points
+        self.eda_downsampler = MinMaxDownsampler(plot_points)
+        self.view.update_profile_menu(audio_model.get_profile_names(), audio_model.profile_name)
 
     def process_survey_load_event(self, path) -> None:
         """
-        Takes a path and loads it as a survey.
+        Takes a path and starts loading it as a survey on a worker thread.
+        The view polls process_survey_progress_event until the load finishes.
 
         :return: nothing
         """
+        if not path or (self.survey_thread and self.survey_thread.is_alive()):
+            return
         self.survey_model.set_path(path)
-        self.survey_model.process_survey()
-        survey_results = self.survey_model.get_survey_results()
-        participants = [SyncController._participant_name(item) for item in survey_results]
-        participants.sort()
-        self.view.update_option_menu(participants)
+        self.view.update_survey_progress(0.0)
+        self.survey_thread = threading.Thread(target=self._load_survey, daemon=True)
+        self.survey_thread.start()
+        self.view.poll_survey_progress()
+
+    def _load_survey(self) -> None:
+        """
+        Loads the survey on the worker thread. Results are handed back to the
+        Tk thread through the survey event queue.
+
+        :return: nothing
+        """
+        try:
+            self.survey_model.process_survey(lambda fraction: self.survey_events.put(("progress", fraction)))
+            self.survey_events.put(("done", None))
+        except Exception as e:
+            self.survey_events.put(("error", e))
+
+    def process_survey_progress_event(self) -> bool:
+        """
+        Drains the survey event queue on the Tk thread, updating the load progress
+        and the participant menu once the survey is loaded.
+
+        :return: True if the survey is still loading
+        """
+        while True:
+            try:
+                event, value = self.survey_events.get_nowait()
+            except queue.Empty:
+                return True
+            if event == "progress":
+                self.view.update_survey_progress(value)
+            elif event == "done":
+                survey_results = self.survey_model.get_survey_results()
+                participants = [SyncController._participant_name(item) for item in survey_results]
+                participants.sort()
+                self.view.update_option_menu(participants)
+                self.view.update_survey_progress(None)
+                return False
+            else:
+                self.view.show_survey_error(str(value))
+                return False
 
     def process_participant_selection_event(self, name: str) -> None:
         """
@@ -46,26 +104,8 @@ class SyncController:
         :param name: the name of the participant in the format of the _participant_name method
         :return: nothing
         """
-        last_and_first = name.replace(" ", "").split(",")
-        survey_results = self.survey_model.get_survey_results()
-        participant_results = next(
-            item for item in survey_results
-            if item.get(SyncController.LAST_NAME_HEADER) == last_and_first[0]
-            and item.get(SyncController.FIRST_NAME_HEADER) == last_and_first[1]
-        )
-        sub_scales_to_segments = {}
-        sub_scales = {participant_results[key] for key in participant_results if "subscale" in key}
-        for sub_scale in sub_scales:
-            sub_scale_questions = [
-                "_".join(key.split("_")[1:3])
-                for key, value in participant_results.items()
-                if sub_scale == value
-            ]
-            sub_scales_to_segments[sub_scale] = {
-                "before": [x for x in sub_scale_questions if "before" in x],
-                "during": [x for x in sub_scale_questions if "during" in x],
-                "after": [x for x in sub_scale_questions if "after" in x]
-            }
+        last_name, first_name = (part.strip() for part in name.split(",", 1))
+        participant_results, sub_scales_to_segments = self.survey_model.get_participant(last_name, first_name)
         self.view.survey_view.update_survey_text(participant_results, sub_scales_to_segments)
         self.view.update_start_enabled(True)
 
@@ -79,14 +119,29 @@ class SyncController:
         """
         return f'{item.get(SyncController.LAST_NAME_HEADER)}, {item.get(SyncController.FIRST_NAME_HEADER)}'
 
+    def process_profile_selection_event(self, profile: str) -> None:
+        """
+        Switches the recording profile used by the next recording.
+
+        :param profile: the name of the profile
+        :return: nothing
+        """
+        self.audio_model.set_profile(profile)
+
     def process_start_event(self) -> None:
         """
-        Starts recording the mic.
+        Starts recording the mic. Output paths are chosen up front, so the
+        audio and EDA samples can be streamed to disk while recording.
 
         :return: nothing
         """
-        self.audio_model.start_recording()
-        self.eda_model.start_recording()
+        file_name = self.view.get_output_file_name()
+        self.audio_file_path = SyncController.get_fresh_output_path(
+            file_name, "audio", self.audio_model.get_extension()
+        )
+        self.eda_file_path = SyncController.get_fresh_output_path(file_name, "eda", self.eda_model.get_extension())
+        self.audio_model.start_recording(self.audio_file_path)
+        self.eda_model.start_recording(self.eda_file_path)
         self.view.update_start_enabled(False)
         self.view.update_stop_enabled(True)
         self.view.animate_plots()
@@ -97,50 +152,51 @@ class SyncController:
 
         :return: nothing
         """
+        self.view.stop_plots()
         self.audio_model.stop_recording()
         self.eda_model.stop_recording()
 
-        file_name = self.view.get_output_file_name()
-        audio_file_path = SyncController.get_fresh_output_path(file_name, "audio", "wav")
-        eda_file_path = SyncController.get_fresh_output_path(file_name, "eda", "csv")
-        self.audio_model.dump_recording(audio_file_path)
-        self.eda_model.dump_recording(eda_file_path)
+        self.audio_model.dump_recording(self.audio_file_path)
+        self.eda_model.dump_recording(self.eda_file_path)
 
         self.view.update_start_enabled(True)
         self.view.update_stop_enabled(False)
 
-    def process_audio_animation(self, i):
+    def process_audio_animation(self) -> tuple:
         """
-        Animates the audio plot the audio plot.
+        Provides the next frame of the audio plot: a min/max envelope of the end of the
+        recording, drawn as a vertical stroke per pair.
 
-        :param i: the index of the current frame
-        :return: an iterable of items to be cleared
+        :return: the x and y values to plot as a tuple
         """
-        self.view.audio_plot.clear()
-        decoded = numpy.fromstring(b''.join(self.audio_model.data), numpy.int16)
-        self.view.audio_plot.curve, = self.view.audio_plot.plot.plot(decoded)
-        self.view.audio_plot.redraw()
-        return self.view.audio_plot.curve,
+        times, mins, maxs = self.audio_model.get_envelope(
+            SyncController.AUDIO_PLOT_SECONDS,
+            self.plot_points // 2
+        )
+        return numpy.repeat(times, 2), numpy.column_stack((mins, maxs)).ravel()
 
-    def process_eda_animation(self, i):
-        self.view.eda_plot.clear()
-        try:
-            df = pd.DataFrame(self.eda_model.data)
-            time = df.get("time", pd.DataFrame()).astype("float")
-            value = df.get("value", pd.DataFrame()).astype("float")
-            if not time.empty and not value.empty:
-                self.view.eda_plot.curve, = self.view.eda_plot.plot.plot(time, value)
-            self.view.eda_plot.redraw()
-        except Exception as e:
-            print(f"Failed to draw a frame: {e}")
-        return self.view.eda_plot.curve,
+    def process_eda_animation(self) -> tuple:
+        """
+        Provides the next frame of the EDA plot: the end of the GSR recording (or of the
+        first stream recorded, if GSR isn't), cut down to the point budget.
+
+        :return: the x and y values to plot as a tuple
+        """
+        samples = self.eda_model.get_window(SyncController.EDA_PLOT_SECONDS)
+        times = samples["time"]
+        # Plot the first field after the timestamp (E4_Tag samples only have a timestamp)
+        values = next((column for field, column in samples.items() if field != "time"), numpy.zeros(len(times)))
+        return self.eda_downsampler.downsample(times, values, SyncController.EDA_PLOT_SECONDS)
 
     @staticmethod
     def get_fresh_output_path(filename, data_type, ext):
         i = 1
         file_path = os.path.join("data", f'{filename}_{data_type}_{i}.{ext}')
         if os.path.isdir("data"):
-            while os.path.isfile(file_path):
+            # EDA recordings are split into <name>_<type>.csv files (and segments while recording), and a
+            # recording cut short by a crash leaves <name>.<ext>.part behind until it is recovered
+            while os.path.isfile(file_path) or glob.glob(f'{glob.escape(os.path.splitext(file_path)[0])}_*') \
+                    or glob.glob(f'{glob.escape(file_path)}.*'):
                 file_path = os.path.join("data", f'{filename}_{data_type}_{i}.{ext}')
                 i += 1
         else:
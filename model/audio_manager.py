@@ -1,27 +1,108 @@
-import wave
+import os
+import threading
+import time
 
+import numpy
 import pyaudio
 
+from model.capture_stats import CaptureStats
+from model.resampler import PolyphaseResampler
+from model.ring_buffer import RingBuffer
+from model.voice_activity import VoiceActivityDetector, voice_index_path
+from model.wave_recorder import FlacRecorder, WaveRecorder
+from model.waveform_pyramid import WaveformPyramid, min_max_envelope
+
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 44100
 CHUNK = 1024
 
+# The number of seconds of recent audio kept in memory for plotting
+RECENT_SECONDS = 10
+
+# Recording profiles: the rate the mic is captured at, and the rate and format the
+# recording is kept in. Speech profiles resample to 16 kHz, which is plenty for voice
+# and cuts storage by almost two thirds (more again with FLAC).
+PROFILES = {
+    "Standard (44.1 kHz WAV)": {"capture_rate": RATE, "rate": RATE, "chunk": CHUNK, "format": "wav"},
+    "Speech (16 kHz WAV)": {"capture_rate": RATE, "rate": 16000, "chunk": CHUNK, "format": "wav"},
+    "Speech (16 kHz FLAC)": {"capture_rate": RATE, "rate": 16000, "chunk": CHUNK, "format": "flac"},
+}
+DEFAULT_PROFILE = "Standard (44.1 kHz WAV)"
+RECORDERS = {"wav": WaveRecorder, "flac": FlacRecorder}
+
 
 class AudioManager:
     """
-    An audio manager class which allows us to record from a PC mic.
+    An audio manager class which allows us to record from a PC mic. By default the mic
+    is read in the PortAudio callback; in blocking mode a dedicated thread reads it
+    instead. frames_per_buffer overrides the profile's buffer size.
     """
 
-    def __init__(self):
+    def __init__(self, stream_to_disk: bool = True, profile: str = DEFAULT_PROFILE,
+                 frames_per_buffer: int = None, blocking: bool = False):
         self.audio = pyaudio.PyAudio()
         self.stream = None
         self.data = list()
+        self.stream_to_disk = stream_to_disk
+        self.frames_per_buffer = frames_per_buffer
+        self.blocking = blocking
+        self.reader_thread = None
+        self.capturing = False
+        self.capture_stats = None
+        self.recorder = None
+        self.resampler = None
+        self.pyramid = WaveformPyramid()
+        self.voice = None
+        self.set_profile(profile)
+
+    def set_profile(self, name: str) -> None:
+        """
+        Selects the recording profile used by the next recording.
+
+        :param name: a key of PROFILES
+        :return: nothing
+        """
+        if name not in AudioManager.get_profile_names():
+            raise ValueError(f"Unknown or unavailable recording profile: {name}")
+        self.profile_name = name
+        self.profile = PROFILES[name]
+        self.rate = self.profile["rate"]
+        self.recent = RingBuffer(self.rate * RECENT_SECONDS, numpy.int16)
+
+    @staticmethod
+    def get_profile_names() -> list:
+        """
+        Returns the names of the recording profiles whose format can be written
+        (FLAC needs the optional soundfile package).
+
+        :return: the profile names
+        """
+        return [name for name, profile in PROFILES.items() if RECORDERS[profile["format"]].is_available()]
+
+    def get_extension(self) -> str:
+        """
+        Returns the file extension of recordings made with the current profile.
+
+        :return: the extension without a dot (e.g. wav)
+        """
+        return self.profile["format"]
+
+    def _open_recorder(self, path: str) -> WaveRecorder:
+        """
+        Opens a recorder for the current profile.
+
+        :param path: the path to write to
+        :return: the recorder
+        """
+        recorder = RECORDERS[self.profile["format"]]
+        return recorder(path, CHANNELS, self.audio.get_sample_size(FORMAT), self.rate)
 
     def _stream_chunk(self, in_data, frame_count, time_info, status) -> tuple:
         """
         Reads in the latest information from the audio stream, stores the results,
-        and keeps the stream alive.
+        and keeps the stream alive. The time spent here, the status flags, and the
+        input latency are recorded in the capture stats.
 
         :param in_data: latest data in the buffer
         :param frame_count: the number of frames included in data
@@ -29,30 +110,129 @@ class AudioManager:
         :param status: streaming status
         :return: the input data and the continue signal as a tuple
         """
-        self.data.append(in_data)
+        start = time.perf_counter()
+        self._store_chunk(in_data)
+        self.capture_stats.record(time.perf_counter() - start, status, time_info)
         return in_data, pyaudio.paContinue
 
-    def start_recording(self) -> None:
+    def _read_chunks(self) -> None:
         """
-        Begins recording from the mic.
+        Reads the mic with blocking reads until capturing stops. Used instead of the
+        callback in blocking mode.
 
         :return: nothing
         """
+        frames_per_buffer = self.capture_stats.frames_per_buffer
+        while self.capturing:
+            try:
+                in_data = self.stream.read(frames_per_buffer, exception_on_overflow=True)
+            except OSError as error:
+                if error.errno != pyaudio.paInputOverflowed:
+                    raise
+                self.capture_stats.record_overflow()
+                continue
+            start = time.perf_counter()
+            self._store_chunk(in_data)
+            self.capture_stats.record(time.perf_counter() - start)
+
+    def _store_chunk(self, in_data: bytes) -> None:
+        """
+        Resamples a chunk of mic input and hands it to the recorder, the ring buffer,
+        and the waveform pyramid.
+
+        :param in_data: raw audio frames at the capture rate
+        :return: nothing
+        """
+        samples = numpy.frombuffer(in_data, numpy.int16)
+        frames = in_data
+        if self.resampler:
+            samples = self.resampler.process(samples)
+            frames = samples.tobytes()
+        if self.recorder:
+            self.recorder.put(frames)
+        else:
+            self.data.append(frames)
+        self.recent.write(samples)
+        self.pyramid.append(samples)
+        self.voice.process(samples)
+
+    def start_recording(self, path=None) -> None:
+        """
+        Begins recording from the mic with the current profile. When streaming to disk,
+        audio is written to path + ".part" as it arrives and only the most recent
+        samples stay in memory.
+
+        :param path: the path the recording will be dumped to (required to stream to disk)
+        :return: nothing
+        """
+        capture_rate = self.profile["capture_rate"]
+        if capture_rate != self.rate:
+            self.resampler = PolyphaseResampler(capture_rate, self.rate)
+        else:
+            self.resampler = None
+        if self.stream_to_disk and path:
+            self.recorder = self._open_recorder(f'{path}{WaveRecorder.PART_SUFFIX}')
+        self.data = list()
+        self.recent.clear()
+        self.pyramid = WaveformPyramid()
+        self.voice = VoiceActivityDetector(self.rate)
+        frames_per_buffer = self.frames_per_buffer or self.profile["chunk"]
+        self.capture_stats = CaptureStats(frames_per_buffer, capture_rate)
         self.stream = self.audio.open(format=FORMAT,
                                       channels=CHANNELS,
-                                      rate=RATE,
+                                      rate=capture_rate,
                                       input=True,
-                                      frames_per_buffer=CHUNK,
-                                      stream_callback=self._stream_chunk)
+                                      frames_per_buffer=frames_per_buffer,
+                                      stream_callback=None if self.blocking else self._stream_chunk)
+        if self.blocking:
+            self.capturing = True
+            self.reader_thread = threading.Thread(target=self._read_chunks, daemon=True)
+            self.reader_thread.start()
 
     def stop_recording(self) -> None:
         """
-        Stops recording from the mic.
+        Stops recording from the mic and prints the capture stats.
 
         :return: nothing
         """
+        if self.reader_thread:
+            self.capturing = False
+            self.reader_thread.join()
+            self.reader_thread = None
         self.stream.stop_stream()
         self.stream.close()
+        if self.recorder:
+            self.recorder.close()
+        print(self.capture_stats.report())
+
+    def get_recent_samples(self, seconds: float = RECENT_SECONDS) -> numpy.ndarray:
+        """
+        Returns a zero-copy view of the most recent audio. Chunks are decoded once,
+        as they arrive, so the cost of this call does not grow with the recording.
+
+        :param seconds: how much audio to return (at most RECENT_SECONDS)
+        :return: a read-only view of int16 samples, oldest first
+        """
+        return self.recent.latest(int(seconds * self.rate))
+
+    def get_envelope(self, seconds: float = None, points: int = 1000) -> tuple:
+        """
+        Returns a min/max envelope of the end of the recording with at most points pairs, so
+        drawing it costs the same whatever the zoom level or recording length. Spans within
+        RECENT_SECONDS are reduced from the raw samples; longer spans come from the pyramid.
+
+        :param seconds: how much of the end of the recording to cover (None for all of it)
+        :param points: the most min/max pairs to return
+        :return: the start time of each pair (in seconds), the minimums, and the maximums as a tuple
+        """
+        total = self.recent.total
+        if seconds is not None and seconds <= RECENT_SECONDS:
+            samples = self.recent.latest(int(seconds * self.rate))
+            positions, mins, maxs = min_max_envelope(samples, points, total - len(samples))
+        else:
+            start = 0 if seconds is None else max(total - int(seconds * self.rate), 0)
+            positions, mins, maxs = self.pyramid.envelope(start, total, points)
+        return positions / self.rate, mins, maxs
 
     def close_manager(self) -> None:
         """
@@ -64,12 +244,17 @@ class AudioManager:
 
     def dump_recording(self, path) -> None:
         """
-        Dumps a recording to the root of the project.
+        Dumps a recording to the root of the project alongside its waveform pyramid
+        (saved as <name>_envelope.npz) and its voice activity index (<name>_voice.csv).
+        The path should end in get_extension().
         """
-        wave_file = wave.open(path, 'wb')
-        wave_file.setnchannels(CHANNELS)
-        wave_file.setsampwidth(self.audio.get_sample_size(FORMAT))
-        wave_file.setframerate(RATE)
-        wave_file.writeframes(b''.join(self.data))
-        wave_file.close()
+        self.pyramid.save(f'{os.path.splitext(path)[0]}_envelope.npz')
+        self.voice.save(voice_index_path(path))
+        if self.recorder:
+            os.replace(self.recorder.path, path)
+            self.recorder = None
+        else:
+            recorder = self._open_recorder(path)
+            recorder.put(b''.join(self.data), block=True)
+            recorder.close()
         self.data.clear()
@@ -0,0 +1,84 @@
+import bisect
+
+import pyaudio
+
+
+class CaptureStats:
+    """
+    Counters for a capture session: a histogram of how long each buffer took to
+    process, the overflow/underflow flags PortAudio reported, and how stale each
+    buffer was by the time it reached Python. Updating it is a handful of integer
+    operations, so it is cheap enough to run inside the audio callback.
+    """
+
+    # Upper edges (in milliseconds) of the processing time histogram buckets
+    BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50)
+
+    def __init__(self, frames_per_buffer: int, rate: int):
+        self.frames_per_buffer = frames_per_buffer
+        self.rate = rate
+        self.histogram = [0] * (len(CaptureStats.BUCKETS) + 1)
+        self.buffers = 0
+        self.overflows = 0
+        self.underflows = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.latencies = 0
+
+    def record(self, duration: float, status: int = 0, time_info: dict = None) -> None:
+        """
+        Records one buffer.
+
+        :param duration: how long the buffer took to process in seconds
+        :param status: the PortAudio status flags passed to the callback
+        :param time_info: the PortAudio time info passed to the callback
+        :return: nothing
+        """
+        self.buffers += 1
+        self.histogram[bisect.bisect_left(CaptureStats.BUCKETS, duration * 1000)] += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        if status & pyaudio.paInputUnderflow:
+            self.underflows += 1
+        if time_info and time_info.get("input_buffer_adc_time"):
+            latency = time_info["current_time"] - time_info["input_buffer_adc_time"]
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.latencies += 1
+
+    def record_overflow(self) -> None:
+        """
+        Records an overflow reported by a blocking read.
+
+        :return: nothing
+        """
+        self.overflows += 1
+
+    def report(self) -> str:
+        """
+        Summarizes the session for tuning the buffer size.
+
+        :return: a multi-line report
+        """
+        period = self.frames_per_buffer / self.rate
+        mean = self.total_duration / self.buffers if self.buffers else 0.0
+        lines = [
+            f'Captured {self.buffers} buffers of {self.frames_per_buffer} frames ({period * 1000:.1f} ms each)',
+            f'Processing: mean {mean * 1000:.3f} ms, max {self.max_duration * 1000:.3f} ms '
+            f'({self.max_duration / period:.0%} of the buffer period)',
+            f'Overflows: {self.overflows}, underflows: {self.underflows}'
+        ]
+        if self.latencies:
+            lines.append(f'Input latency: mean {self.total_latency / self.latencies * 1000:.1f} ms, '
+                         f'max {self.max_latency * 1000:.1f} ms')
+        lower = 0
+        for upper, count in zip(CaptureStats.BUCKETS + (None,), self.histogram):
+            if count:
+                label = f'{lower}-{upper} ms' if upper is not None else f'>{lower} ms'
+                lines.append(f'  {label:>12}: {count}')
+            lower = upper
+        return "\n".join(lines)
@@ -0,0 +1,111 @@
+import math
+
+import numpy
+
+
+def min_max_indices(ids: numpy.ndarray, y: numpy.ndarray) -> tuple:
+    """
+    Finds the first minimum and first maximum of every run of equal bucket IDs.
+
+    :param ids: the bucket of each sample (non-decreasing)
+    :param y: the value of each sample
+    :return: the bucket IDs, and the index of each bucket's earlier and later extreme as a tuple
+    """
+    starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(ids)) + 1))
+    counts = numpy.diff(numpy.append(starts, len(ids)))
+    positions = numpy.arange(len(ids))
+    extremes = []
+    for reduce in (numpy.minimum, numpy.maximum):
+        is_extreme = y == numpy.repeat(reduce.reduceat(y, starts), counts)
+        extremes.append(numpy.minimum.reduceat(numpy.where(is_extreme, positions, len(ids)), starts))
+    return ids[starts], numpy.minimum(*extremes), numpy.maximum(*extremes)
+
+
+class MinMaxDownsampler:
+    """
+    Reduces a line to at most points points for drawing while keeping every peak and
+    trough: the x range is cut into buckets (about one per pixel column) and each
+    bucket is drawn as its minimum and maximum, in the order they occur. Buckets are
+    aligned to multiples of their width, so as data is appended (e.g. a scrolling
+    window of a SampleStore) every bucket but the first and last stays the same;
+    completed buckets are cached and only the newest data (and the first bucket, which
+    the window may cut) is reduced on each call. The bucket
+    width is rounded up to a power of two, so a growing span only resets the cache
+    each time it doubles.
+    """
+
+    DEFAULT_POINTS = 1000
+
+    def __init__(self, points: int = DEFAULT_POINTS):
+        # A span can touch two aligned buckets however wide they are, so the smallest budget is two pairs
+        if points < 4:
+            raise ValueError("A downsampler needs a budget of at least 4 points")
+        self.points = points
+        self.width = None
+        self._reset()
+
+    def _reset(self) -> None:
+        """
+        Forgets every cached bucket.
+
+        :return: nothing
+        """
+        self.ids = numpy.empty(0, dtype=numpy.int64)
+        self.xs = numpy.empty(0)
+        self.ys = numpy.empty(0)
+
+    def _reduce(self, x: numpy.ndarray, y: numpy.ndarray) -> tuple:
+        """
+        Reduces samples to the minimum and maximum of each bucket.
+
+        :param x: the x values (sorted)
+        :param y: the y values
+        :return: the bucket IDs, and two x and y values per bucket as a tuple
+        """
+        if not len(x):
+            return self.ids[:0], self.xs[:0], self.ys[:0]
+        ids = numpy.floor(x / self.width).astype(numpy.int64)
+        buckets, first, last = min_max_indices(ids, y)
+        indices = numpy.column_stack((first, last)).ravel()
+        return buckets, x[indices], y[indices]
+
+    def downsample(self, x, y, span: float = None) -> tuple:
+        """
+        Returns the points to draw for a line. Lines with no more than points points
+        are returned as they are.
+
+        :param x: the x values (sorted, e.g. timestamps)
+        :param y: the y values
+        :param span: the x range the line is drawn over (None for the range of x)
+        :return: the x and y values to draw as a tuple
+        """
+        if len(x) <= self.points:
+            return x, y
+        x = numpy.asarray(x, dtype=numpy.float64)
+        y = numpy.asarray(y, dtype=numpy.float64)
+        span = span or float(x[-1] - x[0]) or 1.0
+        # One bucket fewer than the budget allows, as the span may touch one more than it covers
+        width = 2.0 ** math.ceil(math.log2(span / max(self.points // 2 - 1, 1)))
+        if width != self.width:
+            self.width = width
+            self._reset()
+        first_id = math.floor(x[0] / width)
+        last_id = math.floor(x[-1] / width)
+        # Data which went back in time (e.g. a new recording) invalidates the cache
+        if len(self.ids) and self.ids[-1] >= last_id:
+            self._reset()
+        # Drop the buckets which scrolled out of view, and the first one, which may be cut by the window
+        keep = int(numpy.searchsorted(self.ids, first_id, side="right"))
+        self.ids, self.xs, self.ys = self.ids[keep:], self.xs[2 * keep:], self.ys[2 * keep:]
+        head = int(numpy.searchsorted(x, (first_id + 1) * width))
+        _, head_x, head_y = self._reduce(x[:head], y[:head])
+        start_id = int(self.ids[-1]) + 1 if len(self.ids) else first_id + 1
+        start = max(int(numpy.searchsorted(x, start_id * width)), head)
+        ids, xs, ys = self._reduce(x[start:], y[start:])
+        # Every bucket but the last is complete, so it won't change again
+        complete = max(len(ids) - 1, 0)
+        self.ids = numpy.concatenate((self.ids, ids[:complete]))
+        self.xs = numpy.concatenate((self.xs, xs[:2 * complete]))
+        self.ys = numpy.concatenate((self.ys, ys[:2 * complete]))
+        return (numpy.concatenate((head_x, self.xs, xs[2 * complete:])),
+                numpy.concatenate((head_y, self.ys, ys[2 * complete:])))
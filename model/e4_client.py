@@ -0,0 +1,153 @@
+import asyncio
+import collections
+import threading
+
+from model.e4_parser import E4StreamParser
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running on a daemon thread, so network I/O never blocks
+    the Tk thread. Coroutines are handed over with submit and their results come back
+    as concurrent.futures.Future objects. One loop is shared by every E4 connection.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def get(cls):
+        """
+        Returns the shared background loop, starting it on first use.
+
+        :return: the shared loop
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def submit(self, coroutine):
+        """
+        Schedules a coroutine on the background loop.
+
+        :param coroutine: the coroutine to run
+        :return: a concurrent.futures.Future of its result
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+
+class E4Client(asyncio.BufferedProtocol):
+    """
+    An asyncio client for the E4 streaming server. Bytes are received straight into
+    the parser's buffer, samples are handed to a callback as they are parsed, and
+    command responses are matched to the commands awaiting them by command name
+    (the server answers each command in order), so commands can be sent while data
+    keeps streaming on the same connection. Responses nobody is waiting for (e.g.
+    "R connection lost to device") are kept in unsolicited.
+    """
+
+    COMMAND_TIMEOUT = 10
+
+    def __init__(self, on_samples, buffer_size: int = E4StreamParser.BUFFER_SIZE):
+        self.on_samples = on_samples
+        self.parser = E4StreamParser(buffer_size)
+        self.samples = list()
+        self.transport = None
+        self.waiting = collections.defaultdict(collections.deque)
+        self.unsolicited = list()
+        self.closed = asyncio.get_running_loop().create_future()
+
+    @classmethod
+    async def open(cls, host: str, port: int, on_samples, buffer_size: int = E4StreamParser.BUFFER_SIZE):
+        """
+        Connects to the E4 streaming server.
+
+        :param host: the server's host
+        :param port: the server's port
+        :param on_samples: called on the loop thread with each list of parsed samples (which it may clear)
+        :param buffer_size: the size of the receive buffer
+        :return: the connected client
+        """
+        loop = asyncio.get_running_loop()
+        _, client = await loop.create_connection(lambda: cls(on_samples, buffer_size), host, port)
+        return client
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.parser.get_buffer()
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self.parser.buffer_updated(nbytes, self.samples)
+        if self.samples:
+            self.on_samples(self.samples)
+            self.samples.clear()
+        for response in self.parser.responses:
+            self._dispatch(response)
+        self.parser.responses.clear()
+
+    def connection_lost(self, exc) -> None:
+        for futures in self.waiting.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(ConnectionError("The E4 server closed the connection"))
+        self.waiting.clear()
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def _dispatch(self, response: str) -> None:
+        """
+        Resolves the oldest command of the same name still waiting for a response.
+
+        :param response: a response line (e.g. "R device_subscribe gsr OK")
+        :return: nothing
+        """
+        fields = response.split(" ")
+        futures = self.waiting.get(fields[1]) if len(fields) > 1 else None
+        if not futures:
+            self.unsolicited.append(response)
+            return
+        # A command which timed out still gets its response, which is dropped
+        future = futures.popleft()
+        if not future.done():
+            future.set_result(response)
+
+    async def command(self, command: str, *args: str) -> str:
+        """
+        Sends a command and waits for its response.
+
+        :param command: the action to be performed (e.g. device_subscribe)
+        :param args: the command's arguments
+        :return: the response (e.g. "R device_subscribe gsr OK")
+        """
+        if self.transport is None or self.transport.is_closing():
+            raise ConnectionError("The E4 server connection is closed")
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[command].append(future)
+        self.transport.write(bytes(f'{command} {" ".join(args)}\r\n', 'utf-8'))
+        return await asyncio.wait_for(future, E4Client.COMMAND_TIMEOUT)
+
+    async def wait_closed(self) -> None:
+        """
+        Waits until the connection is closed by either side.
+
+        :return: nothing
+        """
+        await self.closed
+
+    async def close(self) -> None:
+        """
+        Closes the connection and waits until it is closed.
+
+        :return: nothing
+        """
+        if self.transport is not None:
+            self.transport.close()
+        await self.closed
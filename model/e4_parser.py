@@ -0,0 +1,108 @@
+import socket
+
+
+class E4StreamParser:
+    """
+    Frames the E4 streaming server's output into lines and parses them into samples.
+    Bytes are received straight into a reusable buffer with recv_into, and a line
+    split across two reads waits in the buffer until the rest of it arrives. Each
+    sample becomes a tuple of the stream name followed by its fields as floats
+    (e.g. ("E4_Gsr", 1617900000.123, 0.152)); stream names are interned, so repeated
+    samples share one string. Command responses (lines starting with "R ") are kept
+    separately.
+    """
+
+    BUFFER_SIZE = 65536
+    RESPONSE_PREFIX = "R "
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE):
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.length = 0
+        self.discarding = False
+        self.names = {}
+        self.responses = []
+        self.lines = 0
+        self.malformed_lines = 0
+        self.dropped_lines = 0
+
+    def read_from(self, connection: socket.socket, samples: list) -> int:
+        """
+        Receives whatever is available on a socket (blocking until something is) and
+        appends every complete sample to samples.
+
+        :param connection: a connected socket
+        :param samples: the list to append samples to
+        :return: the number of bytes received (0 once the connection is closed)
+        """
+        received = connection.recv_into(self.get_buffer())
+        if received:
+            self.buffer_updated(received, samples)
+        return received
+
+    def get_buffer(self) -> memoryview:
+        """
+        Returns the free end of the buffer for the next read (as asyncio's
+        BufferedProtocol.get_buffer would).
+
+        :return: a writable view
+        """
+        if self.length == len(self.buffer):
+            # A line longer than the whole buffer: drop it and skip ahead to the next one
+            if not self.discarding:
+                self.dropped_lines += 1
+            self.length = 0
+            self.discarding = True
+        return self.view[self.length:]
+
+    def buffer_updated(self, received: int, samples: list) -> None:
+        """
+        Parses the bytes just written into the view returned by get_buffer.
+
+        :param received: the number of bytes written
+        :param samples: the list to append samples to
+        :return: nothing
+        """
+        self.length += received
+        self._parse(samples)
+
+    def _parse(self, samples: list) -> None:
+        """
+        Parses every complete line in the buffer and moves the partial line at the
+        end (if any) to the front.
+
+        :param samples: the list to append samples to
+        :return: nothing
+        """
+        end = self.buffer.rfind(b"\n", 0, self.length) + 1
+        if not end:
+            return
+        lines = str(self.view[:end], "utf-8", "replace").split("\n")
+        lines.pop()
+        if self.discarding:
+            lines.pop(0)
+            self.discarding = False
+        self.lines += len(lines)
+        names = self.names
+        append = samples.append
+        for line in lines:
+            fields = line.split(" ")
+            if len(fields) < 2:
+                if line.strip():
+                    self.malformed_lines += 1
+                continue
+            name = names.get(fields[0]) or names.setdefault(fields[0], fields[0])
+            try:
+                # float() ignores the trailing carriage return
+                if len(fields) == 3:
+                    append((name, float(fields[1]), float(fields[2])))
+                else:
+                    append((name, *map(float, fields[1:])))
+            except ValueError:
+                if line.startswith(E4StreamParser.RESPONSE_PREFIX):
+                    self.responses.append(line.strip())
+                else:
+                    self.malformed_lines += 1
+        rest = self.length - end
+        self.buffer[:rest] = self.buffer[end:self.length]
+        self.length = rest
@@ -0,0 +1,191 @@
+import csv
+import itertools
+import math
+import os
+import struct
+
+import numpy
+
+# The file extension of EDA binary files
+EXTENSION = "e4b"
+
+
+class EDABinaryWriter:
+    """
+    Appends samples of one E4 sample type to an EDA binary file: a 64-byte header, a
+    chunk index, then fixed-width records of little-endian float64 fields (e.g. time
+    and value), so the file can be read straight back with numpy.memmap. The chunk
+    index holds the first timestamp of every chunk of CHUNK_RECORDS records (up to
+    INDEX_CAPACITY chunks), so a time window can be found without touching the rest
+    of the file. Records are only ever appended, and the number of records comes from
+    the file size, so a file cut short by a crash is still readable up to its last
+    complete record.
+    """
+
+    MAGIC = b"EDASYNC\x01"
+    HEADER = struct.Struct("<8sIII44s")
+    CHUNK_RECORDS = 16384
+    INDEX_CAPACITY = 1024
+
+    def __init__(self, path: str, fields: tuple, chunk_records: int = CHUNK_RECORDS,
+                 index_capacity: int = INDEX_CAPACITY):
+        names = ",".join(fields).encode("utf-8")
+        if len(names) > 44:
+            raise ValueError(f"Field names too long for an EDA binary file: {fields}")
+        self.path = path
+        self.fields = tuple(fields)
+        self.chunk_records = chunk_records
+        self.index_capacity = index_capacity
+        self.count = 0
+        self.file = open(path, "wb")
+        self.file.write(EDABinaryWriter.HEADER.pack(
+            EDABinaryWriter.MAGIC, len(self.fields), chunk_records, index_capacity, names
+        ))
+        self.file.write(numpy.full(index_capacity, numpy.nan, dtype="<f8").tobytes())
+
+    def append(self, *columns) -> None:
+        """
+        Appends samples, then records the first timestamp of every chunk they start.
+
+        :param columns: one sequence of values per field, all the same length, time first
+        :return: nothing
+        """
+        records = numpy.column_stack([numpy.asarray(column, dtype="<f8") for column in columns])
+        self.file.write(records.tobytes())
+        first_chunk = math.ceil(self.count / self.chunk_records)
+        self.count += len(records)
+        chunks = range(first_chunk, min(math.ceil(self.count / self.chunk_records), self.index_capacity))
+        if chunks:
+            starts = [records[chunk * self.chunk_records - self.count + len(records), 0] for chunk in chunks]
+            self.file.seek(EDABinaryWriter.HEADER.size + 8 * chunks[0])
+            self.file.write(numpy.array(starts, dtype="<f8").tobytes())
+            self.file.seek(0, os.SEEK_END)
+
+    def close(self) -> None:
+        """
+        Closes the file.
+
+        :return: nothing
+        """
+        self.file.close()
+
+
+class EDABinaryFile:
+    """
+    Reads an EDA binary file (see EDABinaryWriter) through numpy.memmap, so opening
+    one costs the same however long the recording is, and only the pages actually
+    read are loaded. Columns are read-only views into the mapped records.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as binary:
+            header = binary.read(EDABinaryWriter.HEADER.size)
+        if len(header) < EDABinaryWriter.HEADER.size:
+            raise ValueError(f"{path} is not an EDA binary file")
+        magic, field_count, self.chunk_records, index_capacity, names = EDABinaryWriter.HEADER.unpack(header)
+        if magic != EDABinaryWriter.MAGIC:
+            raise ValueError(f"{path} is not an EDA binary file")
+        self.path = path
+        self.fields = tuple(names.rstrip(b"\0").decode("utf-8").split(","))
+        offset = EDABinaryWriter.HEADER.size + 8 * index_capacity
+        count = max(os.path.getsize(path) - offset, 0) // (8 * field_count)
+        if count:
+            self.records = numpy.memmap(path, dtype="<f8", mode="r", offset=offset, shape=(count, field_count))
+            index = numpy.memmap(path, dtype="<f8", mode="r", offset=EDABinaryWriter.HEADER.size,
+                                 shape=(index_capacity,))
+        else:
+            self.records = numpy.empty((0, field_count))
+            index = numpy.empty(0)
+        # A crash between writing records and indexing them leaves the last chunks unindexed
+        index = index[:math.ceil(count / self.chunk_records)]
+        missing = numpy.isnan(index)
+        self.index = index[:int(missing.argmax())] if missing.any() else index
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def column(self, field: str) -> numpy.ndarray:
+        """
+        Returns every value of a field without copying.
+
+        :param field: the field (e.g. time)
+        :return: a read-only (strided) view
+        """
+        return self.records[:, self.fields.index(field)]
+
+    def view(self) -> dict:
+        """
+        Returns every record without copying.
+
+        :return: a mapping of fields to read-only views
+        """
+        return {field: self.records[:, i] for i, field in enumerate(self.fields)}
+
+    def _find(self, time: float, side: str) -> int:
+        """
+        Finds where a timestamp falls in the file, searching only the chunk the index
+        points to.
+
+        :param time: the timestamp
+        :param side: as for numpy.searchsorted
+        :return: the record number
+        """
+        chunk = int(numpy.searchsorted(self.index, time, side)) - 1
+        start = max(chunk, 0) * self.chunk_records
+        stop = (chunk + 1) * self.chunk_records if chunk + 1 < len(self.index) else len(self)
+        return start + int(numpy.searchsorted(self.column("time")[start:stop], time, side))
+
+    def window(self, start: float, stop: float = None) -> dict:
+        """
+        Returns the records whose timestamp falls in [start, stop) without copying.
+
+        :param start: the earliest timestamp to include
+        :param stop: the timestamp to stop before (None for no upper bound)
+        :return: a mapping of fields to read-only views
+        """
+        first = self._find(start, "left")
+        last = len(self) if stop is None else self._find(stop, "left")
+        return {field: self.records[first:last, i] for i, field in enumerate(self.fields)}
+
+
+def csv_to_binary(csv_path: str, path: str, rows: int = EDABinaryWriter.CHUNK_RECORDS) -> int:
+    """
+    Converts an EDA CSV (as written by EDAManager.dump_recording) to an EDA binary file,
+    a block of rows at a time.
+
+    :param csv_path: the CSV to read
+    :param path: the binary file to write
+    :param rows: the number of rows to convert at a time
+    :return: the number of samples converted
+    """
+    with open(csv_path, newline="") as source:
+        reader = csv.reader(source)
+        writer = EDABinaryWriter(path, next(reader))
+        try:
+            while True:
+                block = list(itertools.islice(reader, rows))
+                if not block:
+                    break
+                writer.append(*numpy.array(block, dtype=numpy.float64).T)
+        finally:
+            writer.close()
+    return writer.count
+
+
+def binary_to_csv(path: str, csv_path: str, rows: int = EDABinaryWriter.CHUNK_RECORDS) -> int:
+    """
+    Converts an EDA binary file back to the CSV layout written by EDAManager.dump_recording,
+    a block of records at a time.
+
+    :param path: the binary file to read
+    :param csv_path: the CSV to write
+    :param rows: the number of records to convert at a time
+    :return: the number of samples converted
+    """
+    binary = EDABinaryFile(path)
+    with open(csv_path, "w", newline="") as dump:
+        writer = csv.writer(dump)
+        writer.writerow(binary.fields)
+        for start in range(0, len(binary), rows):
+            writer.writerows(binary.records[start:start + rows].tolist())
+    return len(binary)
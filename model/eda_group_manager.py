@@ -0,0 +1,141 @@
+import asyncio
+import os
+
+from model.e4_client import BackgroundLoop
+from model.e4_parser import E4StreamParser
+from model.eda_manager import EDAManager
+
+
+class EDAGroupManager:
+    """
+    Records several E4 devices at once (e.g. for group interviews). Each device gets
+    its own EDAManager, so its own server connection and sample stores, and every
+    connection is served by the shared background event loop, so the devices never
+    wait on each other. Offers the same interface as
+    EDAManager, so the controller can use either.
+    """
+
+    ALL_DEVICES = "all"
+
+    def __init__(self, devices=ALL_DEVICES, streams: tuple = (EDAManager.GALVANIC_SKIN_RESPONSE,),
+                 buffer_size: int = E4StreamParser.BUFFER_SIZE, host: str = EDAManager.LOCALHOST,
+                 port: int = EDAManager.PORT, stream_to_disk: bool = True, file_format: str = "csv"):
+        self.devices = devices
+        self.streams = tuple(streams)
+        self.buffer_size = buffer_size
+        self.host = host
+        self.port = port
+        self.stream_to_disk = stream_to_disk
+        self.file_format = file_format
+        self.managers = dict()
+        self.loop = BackgroundLoop.get()
+        self.start_future = None
+
+    def get_extension(self) -> str:
+        """
+        Returns the file extension of recordings.
+
+        :return: the extension without a dot (e.g. csv)
+        """
+        return self.file_format
+
+    def start_recording(self, path=None):
+        """
+        Connects to every requested device and starts recording them in the background.
+        Returns immediately; the handshakes run concurrently on the background event loop.
+
+        :param path: the path the recording will be dumped to (required to stream to disk)
+        :return: a concurrent.futures.Future which resolves once every device is recording
+        """
+        self.start_future = self.loop.submit(self.start(path))
+        self.start_future.add_done_callback(self._report_start_failure)
+        return self.start_future
+
+    def _report_start_failure(self, future) -> None:
+        """
+        Prints why recording could not start on any device which failed (see
+        EDAManager._report_start_failure).
+
+        :param future: the start future
+        :return: nothing
+        """
+        if future.cancelled():
+            return
+        if future.exception():
+            print(f"Failed to start EDA recording: {future.exception()}")
+        elif not self.managers:
+            print("Failed to start EDA recording: the E4 server lists no devices")
+        for manager in self.managers.values():
+            if manager.start_failure:
+                print(f"Failed to start EDA recording: {manager.start_failure}")
+
+    async def start(self, path=None) -> list:
+        """
+        Lists the devices if needed, then connects to and subscribes on every device at once.
+
+        :param path: the path the recording will be dumped to (required to stream to disk)
+        :return: whether each device connected
+        """
+        device_ids = self.devices
+        if device_ids == EDAGroupManager.ALL_DEVICES:
+            device_ids = await EDAManager(host=self.host, port=self.port)._list_devices()
+        self.managers = {
+            device_id: EDAManager(self.streams, self.buffer_size, self.host, self.port, device_id,
+                                  self.stream_to_disk, self.file_format)
+            for device_id in device_ids
+        }
+        for device_id, manager in self.managers.items():
+            manager.open_recorder(EDAGroupManager.get_device_path(path, device_id) if path else None)
+        return await asyncio.gather(*(manager.start() for manager in self.managers.values()))
+
+    def stop_recording(self) -> None:
+        """
+        Stops recording every device.
+
+        :return: nothing
+        """
+        if self.start_future:
+            self.start_future.cancel()
+        for manager in self.managers.values():
+            manager.stop_recording()
+
+    def get_window(self, seconds: float = None, sample_type: str = None, device_id: str = None) -> dict:
+        """
+        Returns the most recent samples of a type from one device without copying them.
+        Until the devices are connected (or if none were found), there are no samples.
+
+        :param seconds: how far back from the latest sample to go (None for the whole recording)
+        :param sample_type: the type of sample (e.g. E4_Gsr, or None for EDAManager.get_plot_type)
+        :param device_id: the device (None for the first one)
+        :return: a mapping of fields (e.g. "time" and "value") to read-only arrays
+        """
+        if not self.managers:
+            return EDAManager.empty_window(sample_type)
+        manager = self.managers[device_id] if device_id else next(iter(self.managers.values()))
+        return manager.get_window(seconds, sample_type)
+
+    @staticmethod
+    def get_device_path(path: str, device_id: str) -> str:
+        """
+        Returns the base path of one device's recording (e.g. session_eda_1.csv becomes
+        session_eda_1_6D4ACD.csv).
+
+        :param path: the base path of the recording
+        :param device_id: the device
+        :return: the base path passed to that device's EDAManager
+        """
+        root, ext = os.path.splitext(path)
+        return f'{root}_{device_id}{ext}'
+
+    def dump_recording(self, path) -> list:
+        """
+        Dumps every device's recording, one file per device and sample type (e.g.
+        session_eda_1.csv becomes session_eda_1_6D4ACD_gsr.csv).
+
+        :param path: the base path of the recording
+        :return: the paths written
+        """
+        paths = list()
+        for device_id, manager in self.managers.items():
+            paths.extend(manager.dump_recording(EDAGroupManager.get_device_path(path, device_id)))
+        return paths
@@ -1,9 +1,22 @@
 import csv
-import socket
-import threading
+import os
+
+import numpy
+
+from model.e4_client import BackgroundLoop, E4Client
+from model.e4_parser import E4StreamParser
+from model.eda_file import EDABinaryWriter
+from model.eda_recorder import RECORDERS
+from model.sample_store import SampleStore
 
 
 class EDAManager:
+    """
+    Records E4 streams into per-sample-type stores. When streaming to disk, samples are
+    also written out as they arrive (see EDARecorder) and only the most recent
+    RECENT_ROWS of each sample type stay in memory. Recordings are saved as CSVs or,
+    with file_format set to "e4b", as EDA binary files (see EDABinaryWriter).
+    """
 
     # Connection details
     LOCALHOST = "127.0.0.1"
@@ -34,27 +47,147 @@ class EDAManager:
 
     COMMAND_SEPARATOR = "|"
 
-    def __init__(self):
-        self.socket = None
+    # The sample types each stream sends and their fields (after the sample type)
+    STREAM_SAMPLES = {
+        THREE_AXIS_ACCELERATION: {"E4_Acc": ("time", "x", "y", "z")},
+        BLOOD_VOLUME_PULSE: {"E4_Bvp": ("time", "value")},
+        GALVANIC_SKIN_RESPONSE: {"E4_Gsr": ("time", "value")},
+        INTERBEAT_INTERVAL_AND_HEARTRATE: {"E4_Ibi": ("time", "ibi"), "E4_Hr": ("time", "hr")},
+        SKIN_TEMPERATURE: {"E4_Temperature": ("time", "value")},
+        DEVICE_BATTERY: {"E4_Battery": ("time", "level")},
+        DEVICE_TAG: {"E4_Tag": ("time",)}
+    }
+    GALVANIC_SKIN_RESPONSE_TYPE = "E4_Gsr"
+
+    # The most samples of each type kept in memory when streaming to disk (over 30 minutes of E4_Bvp)
+    RECENT_ROWS = 2 ** 17
+
+    def __init__(self, streams: tuple = (GALVANIC_SKIN_RESPONSE,), buffer_size: int = E4StreamParser.BUFFER_SIZE,
+                 host: str = LOCALHOST, port: int = PORT, device_id: str = None, stream_to_disk: bool = True,
+                 file_format: str = "csv"):
+        self.host = host
+        self.port = port
+        self.device_id = device_id
+        self.client = None
+        self.loop = BackgroundLoop.get()
+        self.start_future = None
+        self.start_failure = None
         self.response_log = list()
-        self.data = list()
-        self.stream_thread = None
+        self.streams = tuple(streams)
+        self.stores = {
+            sample_type: SampleStore(fields)
+            for stream in self.streams
+            for sample_type, fields in EDAManager.STREAM_SAMPLES[stream].items()
+        }
+        self.buffer_size = buffer_size
+        self.ignored_samples = 0
+        self.stream_to_disk = stream_to_disk
+        if file_format not in RECORDERS:
+            raise ValueError(f"Unknown EDA file format: {file_format}")
+        self.file_format = file_format
+        self.recorder = None
+
+    def get_extension(self) -> str:
+        """
+        Returns the file extension of recordings.
+
+        :return: the extension without a dot (e.g. csv)
+        """
+        return self.file_format
+
+    def start_recording(self, path=None):
+        """
+        Starts the EDA recording process in the background, subscribing to every
+        configured stream. Records the device given at construction, or the first
+        device the server lists. Returns immediately; the connection and handshake
+        happen on the background event loop. When streaming to disk, samples are
+        written to segments next to path as they arrive.
+
+        :param path: the path the recording will be dumped to (required to stream to disk)
+        :return: a concurrent.futures.Future which resolves once recording has started
+        """
+        self.open_recorder(path)
+        self.start_future = self.loop.submit(self.start())
+        self.start_future.add_done_callback(self._report_start_failure)
+        return self.start_future
 
-    def start_recording(self) -> None:
+    def open_recorder(self, path) -> None:
         """
-        Starts the EDA recording process.
+        Starts streaming samples to disk (if enabled and given a path) and bounds the
+        stores to RECENT_ROWS, or keeps everything in memory otherwise.
 
+        :param path: the path the recording will be dumped to
         :return: nothing
         """
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.socket.connect((EDAManager.LOCALHOST, EDAManager.PORT))
-        devices = self._get_devices()
-        device_id = devices[0].split(" ")[0]
-        is_connected = self._connect_device(device_id)
+        if self.stream_to_disk and path:
+            self.recorder = RECORDERS[self.file_format](
+                {sample_type: EDAManager.get_stream_path(path, sample_type) for sample_type in self.stores},
+                {sample_type: store.fields for sample_type, store in self.stores.items()}
+            )
+        else:
+            self.recorder = None
+        for store in self.stores.values():
+            store.max_rows = EDAManager.RECENT_ROWS if self.recorder else None
+
+    def _report_start_failure(self, future) -> None:
+        """
+        Prints why recording could not start (an error, or a device which could not be
+        connected), since nobody waits on the start future.
+
+        :param future: the start future
+        :return: nothing
+        """
+        if future.cancelled():
+            return
+        if future.exception():
+            print(f"Failed to start EDA recording: {future.exception()}")
+        elif self.start_failure:
+            print(f"Failed to start EDA recording: {self.start_failure}")
+
+    async def start(self) -> bool:
+        """
+        Connects to the server and the device and subscribes to every configured stream.
+
+        :return: True if the device connected (otherwise start_failure says why)
+        """
+        self.ignored_samples = 0
+        self.start_failure = None
+        self.client = await E4Client.open(self.host, self.port, self._store_samples, self.buffer_size)
+        if self.device_id is None:
+            devices = await self.get_devices()
+            if not devices:
+                self.start_failure = "the E4 server lists no devices"
+                return False
+            self.device_id = devices[0].split(" ")[0]
+        is_connected = await self.connect_device(self.device_id)
         if is_connected:
-            self._subscribe_stream(EDAManager.GALVANIC_SKIN_RESPONSE)
-            self.stream_thread = threading.Thread(target=self._stream_data)
-            self.stream_thread.start()
+            for stream in self.streams:
+                await self.subscribe_stream(stream)
+        else:
+            self.start_failure = (f"device {self.device_id} did not connect "
+                                  f"(the server replied {self.response_log[-1]!r})")
+        return is_connected
+
+    def list_devices(self) -> list:
+        """
+        Asks the server which devices are available over a short-lived connection.
+        Blocks until the server answers.
+
+        :return: a list of device IDs (e.g. ['6D4ACD'])
+        """
+        return self.loop.submit(self._list_devices()).result()
+
+    async def _list_devices(self) -> list:
+        """
+        A helper method which lists the server's devices over a short-lived connection.
+
+        :return: a list of device IDs (e.g. ['6D4ACD'])
+        """
+        self.client = await E4Client.open(self.host, self.port, self._store_samples, self.buffer_size)
+        try:
+            return [device.split(" ")[0] for device in await self.get_devices()]
+        finally:
+            await self.client.close()
 
     def stop_recording(self) -> None:
         """
@@ -62,117 +195,161 @@ class EDAManager:
 
         :return: nothing
         """
-        self.socket.close()
-        self.stream_thread.join()
-
-    def _stream_data(self) -> None:
+        if self.start_future:
+            self.start_future.cancel()
+        if self.client:
+            self.loop.submit(self.client.close()).result(E4Client.COMMAND_TIMEOUT)
+            parser = self.client.parser
+            self.response_log.extend(self.client.unsolicited)
+            if parser.malformed_lines or parser.dropped_lines or self.ignored_samples:
+                print(f"Lost {parser.malformed_lines} malformed and {parser.dropped_lines} overlong lines "
+                      f"of {parser.lines} from E4 {self.device_id}, and ignored {self.ignored_samples} samples "
+                      f"from unexpected streams or with the wrong number of fields")
+        if self.recorder:
+            self.recorder.close()
+            print(self.recorder.report())
+
+    def wait_until_closed(self, timeout: float = None) -> None:
         """
-        Streams data from a socket and stores it as data samples.
+        Blocks until the server closes the connection (e.g. at the end of a replay).
+        Recording must have started.
 
+        :param timeout: the most seconds to wait (None for no limit)
         :return: nothing
         """
-        try:
-            raw_data = self.socket.recv(1024)
-            while raw_data:
-                self._store_samples(raw_data)
-                raw_data = self.socket.recv(1024)
-        except socket.error:
-            pass
+        self.loop.submit(self.client.wait_closed()).result(timeout)
 
-    def _store_samples(self, raw_data) -> None:
+    def _store_samples(self, samples: list) -> None:
         """
-        A helper method which takes raw data and converts it to data samples.
+        Moves a batch of parsed samples into their stores, one extend per sample type.
 
-        :param raw_data: a raw string from a socket connection
+        :param samples: parsed samples (cleared afterwards)
         :return: nothing
         """
-        raw_data_list = raw_data.decode("utf-8").splitlines()
-        for sample in raw_data_list:
-            items = sample.split(" ")
-            try:
-                self.data.append({
-                    "type": items[0],
-                    "time": items[1],
-                    "value": items[2]  # hardcoded for gsr
-                })
-            except IndexError:
-                print(f"Sample lost: {sample}")
+        batches = {sample_type: list() for sample_type in self.stores}
+        widths = {sample_type: len(store.fields) + 1 for sample_type, store in self.stores.items()}
+        for sample in samples:
+            batch = batches.get(sample[0])
+            if batch is not None and len(sample) == widths[sample[0]]:
+                batch.append(sample)
+            else:
+                self.ignored_samples += 1
+        samples.clear()
+        stored = {}
+        for sample_type, batch in batches.items():
+            if batch:
+                stored[sample_type] = list(zip(*batch))[1:]
+                self.stores[sample_type].extend(*stored[sample_type])
+        if self.recorder and stored:
+            self.recorder.put(stored)
+
+    def get_plot_type(self) -> str:
+        """
+        Returns the sample type shown by default: E4_Gsr if it is being recorded, otherwise
+        the first type being recorded.
+
+        :return: the type of sample (None if nothing is being recorded)
+        """
+        if EDAManager.GALVANIC_SKIN_RESPONSE_TYPE in self.stores:
+            return EDAManager.GALVANIC_SKIN_RESPONSE_TYPE
+        return next(iter(self.stores), None)
+
+    def get_window(self, seconds: float = None, sample_type: str = None) -> dict:
+        """
+        Returns the most recent samples of a type without copying them. A type which is not
+        being recorded has no samples.
+
+        :param seconds: how far back from the latest sample to go (None for everything in memory)
+        :param sample_type: the type of sample (e.g. E4_Gsr, or None for get_plot_type)
+        :return: a mapping of fields (e.g. "time" and "value") to read-only arrays
+        """
+        sample_type = sample_type or self.get_plot_type()
+        store = self.stores.get(sample_type)
+        if store is None:
+            return EDAManager.empty_window(sample_type)
+        if seconds is None or not len(store):
+            return store.view()
+        latest = store.latest(1)["time"][0]
+        return store.window(latest - seconds)
 
     @staticmethod
-    def _construct_command(command, *args) -> bytes:
+    def empty_window(sample_type: str = None) -> dict:
         """
-        Constructs an E4 command given the command and a set of arguments.
+        Returns a window with no samples, shaped like a window of a sample type.
 
-        :param command: the action to be performed (e.g. LIST_DEVICES_COMMAND, CONNECT_DEVICE_COMMAND, etc.)
-        :param args: a list of potential arguments to pass to alongside the command
-        :return: the resulting command as a set of bytes
+        :param sample_type: the type of sample (e.g. E4_Gsr, or None for a time and a value field)
+        :return: a mapping of fields to empty arrays
         """
-        return bytes(f'{command} {" ".join(args)}\r\n', 'utf-8')
+        fields = next(
+            (samples[sample_type] for samples in EDAManager.STREAM_SAMPLES.values() if sample_type in samples),
+            ("time", "value")
+        )
+        return {field: numpy.empty(0) for field in fields}
 
-    def _get_devices(self) -> list:
+    async def get_devices(self) -> list:
         """
-        A helper method which returns a list of devices connected to the EDA server.
+        Returns a list of devices connected to the EDA server.
 
         :return: a list of devices (e.g. ['6D4ACD Empatica_E4'])
         """
-        device_list_command = EDAManager._construct_command(EDAManager.LIST_DEVICES_COMMAND)
-        self.socket.sendall(device_list_command)
-        response = self.socket.recv(1024).decode("utf-8")
-        self.response_log.append(response)
-        devices = list(map(str.strip, response.split(EDAManager.COMMAND_SEPARATOR)[1:]))
+        response = await self._send_command(EDAManager.LIST_DEVICES_COMMAND)
+        # An empty list still ends in a separator (e.g. "R device_list 0 | ")
+        devices = [device.strip() for device in response.split(EDAManager.COMMAND_SEPARATOR)[1:] if device.strip()]
         return devices
 
-    def _connect_device(self, device_id: str) -> bool:
+    async def connect_device(self, device_id: str) -> bool:
         """
-        A helper method which connects to a specific device by ID
+        Connects to a specific device by ID.
 
         :param device_id: the ID of the device we want to connect to
         :return: a boolean indicating whether or not the connection was successful
         """
-        device_connect_command = EDAManager._construct_command(EDAManager.CONNECT_DEVICE_COMMAND, device_id)
-        return self._send_command(device_connect_command, 2)
+        response = await self._send_command(EDAManager.CONNECT_DEVICE_COMMAND, device_id)
+        return EDAManager._is_ok(response, 2)
 
-    def _unsubscribe_stream(self, stream: str) -> bool:
+    async def unsubscribe_stream(self, stream: str) -> bool:
         """
-        Unsubscribes from a stream from a device.
+        Unsubscribes from a stream from a device. Can be called while recording.
 
         :param stream: a data stream abbreviation according to documentation (e.g. BLOOD_VOLUME_PULSE)
         :return: True if the unsubscription was successful
         """
-        stream_unsubscribe_command = EDAManager._construct_command(
-            EDAManager.STREAM_SUBSCRIBE_COMMAND,
-            stream,
-            EDAManager.STREAM_OFF
-        )
-        return self._send_command(stream_unsubscribe_command, 3)
+        response = await self._send_command(EDAManager.STREAM_SUBSCRIBE_COMMAND, stream, EDAManager.STREAM_OFF)
+        return EDAManager._is_ok(response, 3)
 
-    def _subscribe_stream(self, stream: str) -> bool:
+    async def subscribe_stream(self, stream: str) -> bool:
         """
-        Subscribes to a stream of data from a device.
+        Subscribes to a stream of data from a device. Can be called while recording.
 
         :param stream: a data stream abbreviation according to documentation (e.g. BLOOD_VOLUME_PULSE)
         :return: True if the subscription was successful
         """
-        stream_subscribe_command = EDAManager._construct_command(
-            EDAManager.STREAM_SUBSCRIBE_COMMAND,
-            stream,
-            EDAManager.STREAM_ON
-        )
-        return self._send_command(stream_subscribe_command, 3)
+        response = await self._send_command(EDAManager.STREAM_SUBSCRIBE_COMMAND, stream, EDAManager.STREAM_ON)
+        return EDAManager._is_ok(response, 3)
+
+    async def _send_command(self, command: str, *args: str) -> str:
+        """
+        A helper method for issuing commands and waiting for their responses.
 
-    def _send_command(self, command, status_index):
+        :param command: the action to be performed (e.g. LIST_DEVICES_COMMAND, CONNECT_DEVICE_COMMAND, etc.)
+        :param args: a list of potential arguments to pass to alongside the command
+        :return: the response
         """
-        A helper method for issue commands and reading their responses.
+        response = await self.client.command(command, *args)
+        self.response_log.append(response)
+        return response
 
-        :param command: a command to be issued over the socket
+    @staticmethod
+    def _is_ok(response: str, status_index: int) -> bool:
+        """
+        A helper method which checks the status code of a response.
+
+        :param response: the response to a command
         :param status_index: the index of the status code of the response
         :return: True if the command was successful
         """
-        self.socket.sendall(command)
-        response = self.socket.recv(1024).decode("utf-8")
-        self.response_log.append(response)
-        status_code = response.strip().split(" ")[status_index]
-        return True if status_code == EDAManager.STATUS_CODE_OK else False
+        fields = response.strip().split(" ")
+        return len(fields) > status_index and fields[status_index] == EDAManager.STATUS_CODE_OK
 
     def _clear_logs(self) -> None:
         """
@@ -180,16 +357,52 @@ class EDAManager:
 
         :return: nothing
         """
-        self.data = list()
+        for store in self.stores.values():
+            store.clear()
         self.response_log = list()
 
-    def dump_recording(self, path) -> None:
+    @staticmethod
+    def get_stream_path(path: str, sample_type: str) -> str:
+        """
+        Returns the path a sample type is dumped to (e.g. session_eda_1.csv becomes
+        session_eda_1_gsr.csv for E4_Gsr samples).
+
+        :param path: the path passed to dump_recording
+        :param sample_type: the type of sample (e.g. E4_Gsr)
+        :return: the path of that sample type's CSV
         """
-        Dumps a recording to the root of the project.
+        root, ext = os.path.splitext(path)
+        return f'{root}_{sample_type.replace("E4_", "").lower()}{ext}'
+
+    def dump_recording(self, path) -> list:
+        """
+        Dumps a recording to the root of the project, one file per sample type
+        (see get_stream_path). When streaming to disk, the segments written while
+        recording are joined instead. The path should end in get_extension().
+
+        :param path: the base path of the recording
+        :return: the paths written
         """
-        with open(path, "w", newline="") as dump:
-            if self.data:
-                writer = csv.DictWriter(dump, self.data[0].keys())
-                writer.writeheader()
-                writer.writerows(self.data)
+        if self.recorder:
+            paths = [
+                self.recorder.join(sample_type, EDAManager.get_stream_path(path, sample_type))
+                for sample_type in self.stores
+            ]
+            self.recorder = None
+            self._clear_logs()
+            return paths
+        paths = list()
+        for sample_type, store in self.stores.items():
+            stream_path = EDAManager.get_stream_path(path, sample_type)
+            if self.file_format == "csv":
+                with open(stream_path, "w", newline="") as dump:
+                    writer = csv.writer(dump)
+                    writer.writerow(store.fields)
+                    writer.writerows(store.rows())
+            else:
+                writer = EDABinaryWriter(stream_path, store.fields)
+                writer.append(*store.view().values())
+                writer.close()
+            paths.append(stream_path)
         self._clear_logs()
+        return paths
@@ -0,0 +1,336 @@
+import csv
+import glob
+import os
+import queue
+import shutil
+import threading
+import time
+
+from model.eda_file import EXTENSION, EDABinaryFile, EDABinaryWriter
+
+
+class EDARecorder:
+    """
+    Writes E4 samples to disk on a dedicated thread as they arrive, so a crash or power
+    loss costs at most the last few seconds of a recording. Batches of samples are handed
+    over through a bounded queue, so the event loop never touches the disk, and the writer
+    drains up to BATCH_SIZE of them at once. Each sample type gets its own series of CSV
+    segments (e.g. session_eda_1_gsr.csv.0000.part), each with its own header, which is
+    flushed after every batch, fsynced every FSYNC_SECONDS, and rotated once it reaches
+    SEGMENT_BYTES or SEGMENT_SECONDS. paths maps each sample type to the CSV its
+    segments are joined into by join, and fields maps it to its header.
+    """
+
+    QUEUE_SIZE = 4096
+    BATCH_SIZE = 256
+    FSYNC_SECONDS = 1.0
+    SEGMENT_BYTES = 64 * 2 ** 20
+    SEGMENT_SECONDS = 3600
+    SEGMENT_SUFFIX = ".part"
+
+    def __init__(self, paths: dict, fields: dict, segment_bytes: int = SEGMENT_BYTES,
+                 segment_seconds: float = SEGMENT_SECONDS, fsync_seconds: float = FSYNC_SECONDS):
+        self.paths = paths
+        self.fields = fields
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.fsync_seconds = fsync_seconds
+        self.batches = queue.Queue(maxsize=EDARecorder.QUEUE_SIZE)
+        self.segments = {sample_type: list() for sample_type in paths}
+        self.files = dict()
+        self.writers = dict()
+        self.opened = dict()
+        self.dropped_samples = 0
+        self.samples_written = 0
+        self.writes = 0
+        self.total_write = 0.0
+        self.max_write = 0.0
+        self.max_batch = 0
+        self.fsyncs = 0
+        self.total_fsync = 0.0
+        self.max_fsync = 0.0
+        self.last_fsync = time.perf_counter()
+        self.writer_thread = threading.Thread(target=self._write_batches, daemon=True)
+        self.writer_thread.start()
+
+    @staticmethod
+    def segment_path(path: str, index: int) -> str:
+        """
+        Returns the path of one segment of a CSV.
+
+        :param path: the path of the joined CSV
+        :param index: the number of the segment (from 0)
+        :return: the segment's path
+        """
+        return f'{path}.{index:04d}{EDARecorder.SEGMENT_SUFFIX}'
+
+    def put(self, batch: dict) -> None:
+        """
+        Queues a batch of samples for writing. A batch which arrives while the queue is
+        full (the disk has fallen far behind) is counted as dropped.
+
+        :param batch: a mapping of sample types to columns (one sequence of values per field)
+        :return: nothing
+        """
+        try:
+            self.batches.put_nowait(batch)
+        except queue.Full:
+            self.dropped_samples += sum(len(columns[0]) for columns in batch.values())
+
+    def _rotate(self, sample_type: str) -> None:
+        """
+        Closes the current segment of a sample type (if any) and opens the next one.
+
+        :param sample_type: the type of sample (e.g. E4_Gsr)
+        :return: nothing
+        """
+        self._close_segment(sample_type)
+        segments = self.segments[sample_type]
+        segment = EDARecorder.segment_path(self.paths[sample_type], len(segments))
+        segments.append(segment)
+        self._open_segment(sample_type, segment)
+        self.opened[sample_type] = time.perf_counter()
+
+    def _open_segment(self, sample_type: str, segment: str) -> None:
+        """
+        Opens a segment and writes its header.
+
+        :param sample_type: the type of sample (e.g. E4_Gsr)
+        :param segment: the segment's path
+        :return: nothing
+        """
+        self.files[sample_type] = open(segment, "w", newline="")
+        self.writers[sample_type] = csv.writer(self.files[sample_type])
+        self.writers[sample_type].writerow(self.fields[sample_type])
+
+    def _append(self, sample_type: str, columns) -> None:
+        """
+        Appends samples to the current segment of a sample type.
+
+        :param sample_type: the type of sample (e.g. E4_Gsr)
+        :param columns: one sequence of values per field
+        :return: nothing
+        """
+        self.writers[sample_type].writerows(zip(*columns))
+
+    def _close_segment(self, sample_type: str) -> None:
+        """
+        Flushes, fsyncs, and closes the current segment of a sample type (if any).
+
+        :param sample_type: the type of sample (e.g. E4_Gsr)
+        :return: nothing
+        """
+        segment = self.files.pop(sample_type, None)
+        if segment:
+            segment.flush()
+            os.fsync(segment.fileno())
+            segment.close()
+
+    def _write(self, batch: list) -> None:
+        """
+        Appends queued batches of samples to the current segments, rotating any which
+        are due, then flushes them (and fsyncs them if FSYNC_SECONDS have passed).
+
+        :param batch: a list of batches, as passed to put
+        :return: nothing
+        """
+        start = time.perf_counter()
+        written = 0
+        touched = set()
+        for queued in batch:
+            for sample_type, columns in queued.items():
+                segment = self.files.get(sample_type)
+                if (segment is None or segment.tell() >= self.segment_bytes
+                        or start - self.opened[sample_type] >= self.segment_seconds):
+                    self._rotate(sample_type)
+                self._append(sample_type, columns)
+                written += len(columns[0])
+                touched.add(sample_type)
+        for sample_type in touched:
+            self.files[sample_type].flush()
+        now = time.perf_counter()
+        if now - self.last_fsync >= self.fsync_seconds:
+            for segment in self.files.values():
+                os.fsync(segment.fileno())
+            self.last_fsync = time.perf_counter()
+            self.fsyncs += 1
+            self.total_fsync += self.last_fsync - now
+            self.max_fsync = max(self.max_fsync, self.last_fsync - now)
+        duration = time.perf_counter() - start
+        self.samples_written += written
+        self.writes += 1
+        self.total_write += duration
+        self.max_write = max(self.max_write, duration)
+        self.max_batch = max(self.max_batch, written)
+
+    def _write_batches(self) -> None:
+        """
+        Drains the queue in batches of up to BATCH_SIZE and writes each batch.
+
+        :return: nothing
+        """
+        while True:
+            batch = [self.batches.get()]
+            while batch[-1] is not None and len(batch) < EDARecorder.BATCH_SIZE:
+                try:
+                    batch.append(self.batches.get_nowait())
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            if batch:
+                self._write(batch)
+            if done:
+                return
+
+    def close(self) -> None:
+        """
+        Writes any queued samples and closes every segment.
+
+        :return: nothing
+        """
+        self.batches.put(None)
+        self.writer_thread.join()
+        for sample_type in list(self.files):
+            self._close_segment(sample_type)
+        if self.dropped_samples:
+            print(f"Dropped {self.dropped_samples} EDA samples while writing them to disk")
+
+    def report(self) -> str:
+        """
+        Summarizes the cost of writing, for tuning the segment and fsync settings.
+
+        :return: a multi-line report
+        """
+        mean = self.total_write / self.writes if self.writes else 0.0
+        lines = [
+            f'Wrote {self.samples_written} EDA samples in {self.writes} batches '
+            f'(up to {self.max_batch} samples each)',
+            f'Per batch: mean {mean * 1000:.3f} ms, max {self.max_write * 1000:.3f} ms'
+        ]
+        if self.fsyncs:
+            lines.append(f'fsync: {self.fsyncs} times, mean {self.total_fsync / self.fsyncs * 1000:.3f} ms, '
+                         f'max {self.max_fsync * 1000:.3f} ms')
+        return "\n".join(lines)
+
+    def join(self, sample_type: str, path: str = None) -> str:
+        """
+        Joins a sample type's segments into one file and deletes them. The recorder must
+        be closed.
+
+        :param sample_type: the type of sample (e.g. E4_Gsr)
+        :param path: where to write the file (defaults to the one given in paths)
+        :return: the path of the file
+        """
+        path = path or self.paths[sample_type]
+        if not self.segments[sample_type]:
+            # Nothing arrived, so write an empty segment for the header
+            self._rotate(sample_type)
+            self._close_segment(sample_type)
+        self.join_segments(self.segments[sample_type], path)
+        return path
+
+    @staticmethod
+    def join_segments(segments: list, path: str) -> None:
+        """
+        Joins CSV segments (each with the same header) into one CSV and deletes them. A
+        partial last line (e.g. after a crash) is dropped.
+
+        :param segments: the segments in order
+        :param path: the path of the joined CSV
+        :return: nothing
+        """
+        with open(path, "w+b") as joined:
+            for index, segment in enumerate(segments):
+                with open(segment, "rb") as part:
+                    header = part.readline()
+                    if index == 0:
+                        joined.write(header)
+                    shutil.copyfileobj(part, joined)
+            # A crash can leave the last line half written (a line is far shorter than the tail read)
+            size = joined.tell()
+            joined.seek(max(size - 4096, 0))
+            tail = joined.read()
+            if tail and not tail.endswith(b"\n"):
+                joined.truncate(size - len(tail) + tail.rfind(b"\n") + 1)
+        for segment in segments:
+            os.remove(segment)
+
+    @staticmethod
+    def recover(path: str) -> list:
+        """
+        Joins the segments left behind by a recording which was never dumped (e.g. after
+        a crash) into their CSVs.
+
+        :param path: the base path of the recording (as passed to EDAManager.dump_recording)
+        :return: the paths written
+        """
+        root, ext = os.path.splitext(path)
+        return EDARecorder.recover_segments(
+            glob.glob(f'{glob.escape(root)}_*{ext}.*{EDARecorder.SEGMENT_SUFFIX}')
+        )
+
+    @staticmethod
+    def recover_segments(segments: list) -> list:
+        """
+        Joins segments left behind by recordings which were never dumped into their files,
+        picking the recorder from each file's extension.
+
+        :param segments: segment paths (e.g. session_eda_1_gsr.csv.0000.part), in any order
+        :return: the paths written
+        """
+        joined = dict()
+        for segment in sorted(segments):
+            joined.setdefault(segment[:-len(EDARecorder.SEGMENT_SUFFIX)].rsplit(".", 1)[0], []).append(segment)
+        for path, parts in joined.items():
+            RECORDERS.get(os.path.splitext(path)[1].lstrip("."), EDARecorder).join_segments(parts, path)
+        return list(joined)
+
+
+class BinaryEDARecorder(EDARecorder):
+    """
+    An EDARecorder which writes EDA binary files (see EDABinaryWriter) instead of CSVs.
+    """
+
+    def _open_segment(self, sample_type: str, segment: str) -> None:
+        self.writers[sample_type] = EDABinaryWriter(segment, self.fields[sample_type])
+        self.files[sample_type] = self.writers[sample_type].file
+
+    def _append(self, sample_type: str, columns) -> None:
+        self.writers[sample_type].append(*columns)
+
+    @staticmethod
+    def join_segments(segments: list, path: str) -> None:
+        """
+        Joins EDA binary segments into one file and deletes them. A partial last record
+        (e.g. after a crash) is dropped, as is a last segment whose header never made it
+        to disk.
+
+        :param segments: the segments in order
+        :param path: the path of the joined file
+        :return: nothing
+        """
+        if len(segments) > 1 and os.path.getsize(segments[-1]) < EDABinaryWriter.HEADER.size:
+            os.remove(segments[-1])
+            segments = segments[:-1]
+        if len(segments) == 1:
+            # Opening the segment checks its header
+            EDABinaryFile(segments[0])
+            os.replace(segments[0], path)
+            return
+        writer = None
+        for segment in segments:
+            part = EDABinaryFile(segment)
+            if writer is None:
+                writer = EDABinaryWriter(path, part.fields)
+            for start in range(0, len(part), writer.chunk_records):
+                writer.append(*part.records[start:start + writer.chunk_records].T)
+            del part
+        writer.close()
+        for segment in segments:
+            os.remove(segment)
+
+
+# The recorder for each EDA file extension
+RECORDERS = {"csv": EDARecorder, EXTENSION: BinaryEDARecorder}
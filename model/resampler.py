@@ -0,0 +1,55 @@
+import math
+
+import numpy
+
+
+class PolyphaseResampler:
+    """
+    A streaming rational resampler (up / down) built on a polyphase Kaiser-windowed
+    sinc filter. Chunks can be any size; the last few input samples are carried over
+    between calls, so the output is the same as resampling the whole recording at once.
+    """
+
+    TAPS_PER_PHASE = 24
+    KAISER_BETA = 8.0
+
+    def __init__(self, input_rate: int, output_rate: int, taps_per_phase: int = TAPS_PER_PHASE):
+        divisor = math.gcd(input_rate, output_rate)
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+        self.taps = taps_per_phase
+
+        # Low-pass at the lower of the two Nyquist rates (relative to the upsampled rate)
+        length = self.up * self.taps
+        cutoff = 0.5 / max(self.up, self.down)
+        n = numpy.arange(length) - (length - 1) / 2
+        prototype = 2 * cutoff * numpy.sinc(2 * cutoff * n) * numpy.kaiser(length, PolyphaseResampler.KAISER_BETA)
+
+        # Row p holds the taps applied to x[base], x[base - 1], ... for output phase p
+        self.phases = prototype.reshape(self.taps, self.up).T.copy()
+        self.phases /= self.phases.sum(axis=1, keepdims=True)
+
+        self.history = numpy.zeros(self.taps - 1)
+        self.consumed = 0
+        self.produced = 0
+
+    def process(self, samples: numpy.ndarray) -> numpy.ndarray:
+        """
+        Resamples the next chunk of a stream.
+
+        :param samples: a one-dimensional array of int16 samples
+        :return: the resampled chunk as int16 samples
+        """
+        buffer = numpy.concatenate((self.history, samples.astype(numpy.float64)))
+        offset = self.consumed - (self.taps - 1)
+        self.consumed += len(samples)
+
+        stop = -(-self.consumed * self.up // self.down)
+        outputs = numpy.arange(self.produced, stop, dtype=numpy.int64)
+        self.produced = stop
+        bases = outputs * self.down // self.up - offset
+        windows = bases[:, None] - numpy.arange(self.taps)[None, :]
+        resampled = numpy.einsum("ij,ij->i", buffer[windows], self.phases[outputs * self.down % self.up])
+
+        self.history = buffer[len(buffer) - (self.taps - 1):]
+        return numpy.clip(numpy.rint(resampled), -2 ** 15, 2 ** 15 - 1).astype(numpy.int16)
@@ -0,0 +1,54 @@
+import numpy
+
+
+class RingBuffer:
+    """
+    A preallocated, fixed-size buffer of the most recent samples. Every sample is
+    stored twice (at i and i + capacity), so the latest samples are always one
+    contiguous slice and can be read without copying. Meant for a single writer;
+    readers may race the writer and see a partially updated window.
+    """
+
+    def __init__(self, capacity: int, dtype=numpy.int16):
+        self.capacity = capacity
+        self.buffer = numpy.zeros(2 * capacity, dtype=dtype)
+        self.total = 0
+
+    def write(self, samples: numpy.ndarray) -> None:
+        """
+        Appends samples, overwriting the oldest ones once the buffer is full.
+
+        :param samples: a one-dimensional array of samples
+        :return: nothing
+        """
+        written = len(samples)
+        self.total += written - min(written, self.capacity)
+        samples = samples[-self.capacity:]
+        start = self.total % self.capacity
+        first = min(len(samples), self.capacity - start)
+        for offset in (0, self.capacity):
+            self.buffer[offset + start:offset + start + first] = samples[:first]
+            self.buffer[offset:offset + len(samples) - first] = samples[first:]
+        self.total += len(samples)
+
+    def latest(self, count: int = None) -> numpy.ndarray:
+        """
+        Returns a read-only view of the most recent samples.
+
+        :param count: the number of samples (defaults to everything in the buffer)
+        :return: a view of at most count samples, oldest first
+        """
+        available = min(self.total, self.capacity)
+        count = available if count is None else min(count, available)
+        end = self.total % self.capacity + self.capacity
+        view = self.buffer[end - count:end]
+        view.flags.writeable = False
+        return view
+
+    def clear(self) -> None:
+        """
+        Forgets every sample without releasing the buffer.
+
+        :return: nothing
+        """
+        self.total = 0
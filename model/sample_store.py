@@ -0,0 +1,152 @@
+import numpy
+
+
+class SampleStore:
+    """
+    A growable table of float64 columns (e.g. time and value) for streamed samples.
+    Columns double in capacity when full, so appends are amortized O(1), and reads
+    are read-only views into the columns rather than copies.
+
+    With max_rows set (e.g. when the samples are also being written to disk), the
+    store never grows past max_rows: once full, the oldest half is dropped to make
+    room, so memory stays bounded however long the recording runs.
+
+    Meant for a single writer and any number of readers. The writer fills a row
+    before publishing the new length, and a grown column is fully copied before it
+    replaces the old one, so a reader which takes the length before the columns
+    always sees complete rows. A reader racing a drop may see a partially updated
+    window (as with RingBuffer).
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, fields: tuple = ("time", "value"), capacity: int = INITIAL_CAPACITY, max_rows: int = None):
+        self.fields = tuple(fields)
+        self.columns = tuple(numpy.empty(capacity) for _ in self.fields)
+        self.length = 0
+        self.max_rows = max_rows
+        self.dropped_rows = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _reserve(self, count: int) -> None:
+        """
+        Makes room for count more rows, doubling the capacity as often as needed, or
+        dropping the oldest rows if that would take it past max_rows.
+
+        :param count: the number of rows about to be written (at most max_rows)
+        :return: nothing
+        """
+        capacity = len(self.columns[0])
+        if self.length + count <= capacity:
+            return
+        keep = self.length
+        while capacity < keep + count:
+            capacity *= 2
+        if self.max_rows and capacity > self.max_rows:
+            capacity = self.max_rows
+            keep = min(keep, self.max_rows // 2, self.max_rows - count)
+        grown = []
+        for column in self.columns:
+            new_column = numpy.empty(capacity)
+            new_column[:keep] = column[self.length - keep:self.length]
+            grown.append(new_column)
+        if keep < self.length:
+            self.dropped_rows += self.length - keep
+            self.length = keep
+        self.columns = tuple(grown)
+
+    def append(self, *values: float) -> None:
+        """
+        Appends a single row.
+
+        :param values: one value per field
+        :return: nothing
+        """
+        self._reserve(1)
+        for column, value in zip(self.columns, values):
+            column[self.length] = value
+        self.length += 1
+
+    def extend(self, *columns) -> None:
+        """
+        Appends many rows at once, given column by column.
+
+        :param columns: one sequence of values per field, all the same length
+        :return: nothing
+        """
+        count = len(columns[0])
+        if self.max_rows and count > self.max_rows:
+            self.dropped_rows += count - self.max_rows
+            columns = tuple(values[-self.max_rows:] for values in columns)
+            count = self.max_rows
+        self._reserve(count)
+        for column, values in zip(self.columns, columns):
+            column[self.length:self.length + count] = values
+        self.length += count
+
+    def _views(self, start: int, stop: int) -> dict:
+        """
+        Returns read-only views of a range of rows.
+
+        :param start: the first row
+        :param stop: the row after the last one
+        :return: a mapping of fields to views
+        """
+        views = {}
+        for field, column in zip(self.fields, self.columns):
+            view = column[start:stop]
+            view.flags.writeable = False
+            views[field] = view
+        return views
+
+    def view(self) -> dict:
+        """
+        Returns every row without copying.
+
+        :return: a mapping of fields to read-only views
+        """
+        return self._views(0, self.length)
+
+    def latest(self, count: int) -> dict:
+        """
+        Returns the most recent rows without copying.
+
+        :param count: the most rows to return
+        :return: a mapping of fields to read-only views
+        """
+        length = self.length
+        return self._views(max(length - count, 0), length)
+
+    def window(self, start: float, stop: float = None, field: str = "time") -> dict:
+        """
+        Returns the rows whose key falls in [start, stop) without copying. The key
+        column must be sorted (as timestamps are).
+
+        :param start: the lowest key to include
+        :param stop: the key to stop before (None for no upper bound)
+        :param field: the key column
+        :return: a mapping of fields to read-only views
+        """
+        length = self.length
+        keys = self.columns[self.fields.index(field)][:length]
+        first = int(numpy.searchsorted(keys, start, side="left"))
+        last = length if stop is None else int(numpy.searchsorted(keys, stop, side="left"))
+        return self._views(first, last)
+
+    def rows(self):
+        """
+        Iterates over every row as a tuple of Python floats, for bulk export.
+
+        :return: an iterator of rows
+        """
+        return zip(*(view.tolist() for view in self.view().values()))
+
+    def clear(self) -> None:
+        """
+        Forgets every row without releasing the columns.
+
+        :return: nothing
+        """
+        self.length = 0
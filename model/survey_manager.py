@@ -1,18 +1,191 @@
 import csv
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+from model.survey_table import SurveyTable
 
 
 class SurveyManager:
+
+    FIRST_NAME_HEADER = "RecipientFirstName"
+    LAST_NAME_HEADER = "RecipientLastName"
+    SEGMENTS = ("before", "during", "after")
+    CACHE_SIZE = 32
+    CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".edaaudiosync", "surveys")
+    # Bump whenever SurveyTable or the parsing changes, so older cache files are rebuilt rather than misread
+    CACHE_VERSION = 1
+    PROGRESS_INTERVAL = 1000
+
     def __init__(self):
         self.survey_results = list()
         self.survey_path = None
+        self.participant_index = dict()
+        self.sub_scales_to_segments = dict()
+        self.participant_cache = OrderedDict()
 
     def set_path(self, path):
         self.survey_path = path
 
-    def process_survey(self):
+    def process_survey(self, progress=None):
+        """
+        Loads the survey at the current path, reusing the parsed cache when the file is unchanged.
+        Safe to call from a worker thread.
+
+        :param progress: an optional callback which receives the fraction of the file parsed so far
+        :return: nothing
+        """
         if self.survey_path:
-            with open(self.survey_path) as my_data:
-                self.survey_results = list(csv.DictReader(my_data))
+            stat = os.stat(self.survey_path)
+            key = (os.path.abspath(self.survey_path), stat.st_mtime_ns, stat.st_size)
+            survey_results = self._load_cache(key)
+            if survey_results is None:
+                with open(self.survey_path) as my_data:
+                    survey_results = self._parse_survey(my_data, stat.st_size, progress)
+                self._dump_cache(key, survey_results)
+            self.survey_results = survey_results
+            self._index_survey()
+            if progress:
+                progress(1.0)
+
+    @staticmethod
+    def _parse_survey(my_data, size: int, progress=None) -> SurveyTable:
+        """
+        Parses a survey file into a compact table, reporting progress every PROGRESS_INTERVAL rows.
+
+        :param my_data: the open survey file
+        :param size: the size of the survey file
+        :param progress: an optional callback which receives the fraction of the file parsed so far
+        :return: the survey results as a table
+        """
+        position = 0
+
+        def lines():
+            nonlocal position
+            for line in my_data:
+                position += len(line)
+                yield line
+
+        def items():
+            for count, item in enumerate(csv.DictReader(lines()), start=1):
+                yield item
+                if progress and count % SurveyManager.PROGRESS_INTERVAL == 0:
+                    progress(min(position / max(size, 1), 1.0))
+
+        return SurveyTable.from_rows(items())
+
+    @staticmethod
+    def _cache_path(key: tuple) -> str:
+        """
+        Generates the path of the parsed cache for a survey file.
+
+        :param key: the (absolute path, mtime, size) of the survey file
+        :return: the path to the cache file
+        """
+        digest = hashlib.sha1(key[0].encode("utf-8")).hexdigest()
+        return os.path.join(SurveyManager.CACHE_DIRECTORY, f'{digest}.pickle')
+
+    @staticmethod
+    def _load_cache(key: tuple):
+        """
+        Loads the parsed survey from the cache if it matches the survey file and was written
+        in the current cache format.
+
+        :param key: the (absolute path, mtime, size) of the survey file
+        :return: the survey results or None if there is no up-to-date cache
+        """
+        try:
+            with open(SurveyManager._cache_path(key), "rb") as cache:
+                cached = pickle.load(cache)
+        except Exception:
+            # A cache written by an older version may not even unpickle (e.g. a class was renamed)
+            return None
+        if not isinstance(cached, dict) or cached.get("version") != SurveyManager.CACHE_VERSION \
+                or cached.get("key") != key:
+            return None
+        return cached["survey_results"]
+
+    @staticmethod
+    def _dump_cache(key: tuple, survey_results: list) -> None:
+        """
+        Stores the parsed survey in the cache. Failing to write the cache is not an error.
+
+        :param key: the (absolute path, mtime, size) of the survey file
+        :param survey_results: the parsed survey results
+        :return: nothing
+        """
+        path = SurveyManager._cache_path(key)
+        try:
+            os.makedirs(SurveyManager.CACHE_DIRECTORY, exist_ok=True)
+            with open(f'{path}.tmp', "wb") as cache:
+                pickle.dump(
+                    {"version": SurveyManager.CACHE_VERSION, "key": key, "survey_results": survey_results},
+                    cache,
+                    pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(f'{path}.tmp', path)
+        except OSError as e:
+            print(f"Failed to cache survey: {e}")
 
     def get_survey_results(self):
         return self.survey_results
+
+    def _index_survey(self) -> None:
+        """
+        Builds the name index and the subscale map for the current survey results. Both
+        only depend on the survey, so they are computed once at load time.
+
+        :return: nothing
+        """
+        self.participant_index = dict()
+        for item in self.survey_results:
+            key = (item.get(SurveyManager.LAST_NAME_HEADER), item.get(SurveyManager.FIRST_NAME_HEADER))
+            self.participant_index.setdefault(key, item)
+
+        # Every participant shares the same subscale columns, so the first non-empty value names the subscale
+        self.sub_scales_to_segments = dict()
+        fields = self.survey_results[0].keys() if self.survey_results else []
+        for key in fields:
+            if key.endswith("_subscale"):
+                sub_scale = next((item[key] for item in self.survey_results if item[key]), None)
+                if sub_scale:
+                    question, segment = key.split("_")[1:3]
+                    segments = self.sub_scales_to_segments.setdefault(
+                        sub_scale,
+                        {segment: [] for segment in SurveyManager.SEGMENTS}
+                    )
+                    segments[segment].append(f'{question}_{segment}')
+        self.participant_cache.clear()
+
+    def get_participant(self, last_name: str, first_name: str) -> tuple:
+        """
+        Looks up a participant's survey results alongside the subscale map restricted to the
+        questions they answered. Results are kept in a small LRU cache, so switching between
+        participants does not depend on the size of the survey.
+
+        :param last_name: the last name of the participant
+        :param first_name: the first name of the participant
+        :return: the participant's survey results and their subscale to segment to question map as a tuple
+        """
+        key = (last_name, first_name)
+        if key in self.participant_cache:
+            self.participant_cache.move_to_end(key)
+            return self.participant_cache[key]
+        participant_results = self.participant_index[key]
+        sub_scales_to_segments = {
+            sub_scale: {
+                segment: [question for question in questions if participant_results.get(f'Q1_{question}_question')]
+                for segment, questions in segments.items()
+            }
+            for sub_scale, segments in self.sub_scales_to_segments.items()
+        }
+        sub_scales_to_segments = {
+            sub_scale: segments
+            for sub_scale, segments in sub_scales_to_segments.items()
+            if any(segments.values())
+        }
+        self.participant_cache[key] = (participant_results, sub_scales_to_segments)
+        if len(self.participant_cache) > SurveyManager.CACHE_SIZE:
+            self.participant_cache.popitem(last=False)
+        return self.participant_cache[key]
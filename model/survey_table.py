@@ -0,0 +1,201 @@
+import sys
+from collections.abc import Mapping, Sequence
+
+import numpy
+
+
+class SurveyTable(Sequence):
+    """
+    A compact, column-oriented store for survey results. Likert responses live in a
+    single int8 matrix, and every other column is stored as integer codes (as narrow as
+    the column allows) into a table of the column's distinct values, so descriptions and
+    subscales are stored once per column and names are interned. Rows are exposed as read-only dict-like views.
+    """
+
+    MISSING = -128
+    LIKERT_SUFFIX = "_question"
+    CHUNK = 1024
+
+    def __init__(self, fieldnames: list, likert: numpy.ndarray, likert_columns: list, codes: list,
+                 category_columns: list, categories: list):
+        self.fieldnames = list(fieldnames)
+        self.likert = likert
+        self.codes = codes
+        self.categories = categories
+        self.columns = {
+            **{column: (True, j) for j, column in enumerate(likert_columns)},
+            **{column: (False, j) for j, column in enumerate(category_columns)}
+        }
+
+    @classmethod
+    def from_rows(cls, rows, fieldnames: list = None):
+        """
+        Builds a table from an iterable of survey rows (e.g. a csv.DictReader). Like csv.DictWriter,
+        the header defaults to the keys of the first row and missing values are stored as ''.
+        Question columns which hold anything other than small integers are stored like any other column.
+
+        :param rows: an iterable of dictionaries
+        :param fieldnames: the header of the survey
+        :return: the survey as a table
+        """
+        values = None
+        count = 0
+        for row in rows:
+            if values is None:
+                fieldnames = list(fieldnames or row.keys())
+                values = {column: [] for column in fieldnames}
+            if row.keys() - values.keys():
+                raise ValueError(f"Row has fields not in the header: {', '.join(row.keys() - values.keys())}")
+            for column, column_values in values.items():
+                column_values.append(row.get(column, ""))
+            count += 1
+        fieldnames = fieldnames or []
+        values = values or {column: [] for column in fieldnames}
+
+        likert_columns, likert = [], []
+        category_columns, codes, categories = [], [], []
+        for column in fieldnames:
+            column_likert = cls._encode_likert(values[column]) if column.endswith(cls.LIKERT_SUFFIX) else None
+            if column_likert is not None:
+                likert_columns.append(column)
+                likert.append(column_likert)
+            else:
+                column_codes, column_categories = cls._encode_categories(values[column])
+                category_columns.append(column)
+                codes.append(column_codes)
+                categories.append(column_categories)
+            del values[column]
+
+        return cls(
+            fieldnames,
+            numpy.stack(likert, axis=1) if likert else numpy.empty((count, 0), dtype=numpy.int8),
+            likert_columns,
+            codes,
+            category_columns,
+            categories
+        )
+
+    @classmethod
+    def _encode_likert(cls, column_values: list):
+        """
+        Encodes a column of Likert responses as int8, using MISSING for empty responses.
+
+        :param column_values: a column of strings
+        :return: an int8 array or None if the column does not hold small integers
+        """
+        encoded = numpy.empty(len(column_values), dtype=numpy.int8)
+        for i, value in enumerate(column_values):
+            if value == "" or value is None:
+                encoded[i] = cls.MISSING
+                continue
+            try:
+                number = int(value)
+            except ValueError:
+                return None
+            if not cls.MISSING < number <= 127 or str(number) != value:
+                return None
+            encoded[i] = number
+        return encoded
+
+    @staticmethod
+    def _encode_categories(column_values: list) -> tuple:
+        """
+        Encodes a column as integer codes into a table of its distinct values.
+
+        :param column_values: a column of strings
+        :return: the codes and the distinct values as a tuple
+        """
+        lookup = {}
+        codes = numpy.empty(len(column_values), dtype=numpy.int32)
+        for i, value in enumerate(column_values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            codes[i] = code
+        categories = [sys.intern(value) if isinstance(value, str) else value for value in lookup]
+        return codes.astype(numpy.min_scalar_type(max(len(lookup) - 1, 0))), categories
+
+    def __len__(self) -> int:
+        return len(self.likert)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SurveyRow(self, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("survey row index out of range")
+        return SurveyRow(self, index)
+
+    def value(self, index: int, column: str) -> str:
+        """
+        Looks up a single value.
+
+        :param index: the row of the value
+        :param column: the column of the value
+        :return: the value as it appeared in the survey
+        """
+        is_likert, j = self.columns[column]
+        if is_likert:
+            number = int(self.likert[index, j])
+            return "" if number == SurveyTable.MISSING else str(number)
+        return self.categories[j][self.codes[j][index]]
+
+    def iter_rows(self):
+        """
+        Generates every row as a list of values in header order, decoding a chunk of rows
+        at a time. Much faster than reading the rows through their views.
+
+        :return: a generator of lists
+        """
+        tables = []
+        for categories in self.categories:
+            table = numpy.empty(len(categories), dtype=object)
+            table[:] = categories
+            tables.append(table)
+        for start in range(0, len(self), SurveyTable.CHUNK):
+            stop = min(start + SurveyTable.CHUNK, len(self))
+            likert = self.likert[start:stop]
+            decoded = {}
+            for column, (is_likert, j) in self.columns.items():
+                if is_likert:
+                    decoded[column] = numpy.where(likert[:, j] == SurveyTable.MISSING, "", likert[:, j].astype(str))
+                else:
+                    decoded[column] = tables[j][self.codes[j][start:stop]]
+            yield from map(list, zip(*(decoded[column].tolist() for column in self.fieldnames)))
+
+    def nbytes(self) -> int:
+        """
+        Estimates the memory held by the table.
+
+        :return: the size of the arrays plus the distinct values, in bytes
+        """
+        return self.likert.nbytes + sum(codes.nbytes for codes in self.codes) + sum(
+            sum(sys.getsizeof(value) for value in categories) for categories in self.categories
+        )
+
+
+class SurveyRow(Mapping):
+    """
+    A read-only, dict-like view of a single row of a SurveyTable.
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: SurveyTable, index: int):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key: str) -> str:
+        if key not in self.table.columns:
+            raise KeyError(key)
+        return self.table.value(self.index, key)
+
+    def __iter__(self):
+        return iter(self.table.fieldnames)
+
+    def __len__(self) -> int:
+        return len(self.table.fieldnames)
+
+    def __repr__(self) -> str:
+        return f'SurveyRow({dict(self)!r})'
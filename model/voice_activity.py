@@ -0,0 +1,190 @@
+import csv
+import os
+import struct
+
+import numpy
+
+
+def voice_index_path(path: str) -> str:
+    """
+    Returns the path of the voice activity index kept next to a recording.
+
+    :param path: the path to the recording
+    :return: the path to its index (<name>_voice.csv)
+    """
+    return f'{os.path.splitext(path)[0]}_voice.csv'
+
+
+def wav_data(path: str) -> tuple:
+    """
+    Memory-maps the samples of a 16-bit PCM WAV file without reading it into memory.
+
+    :param path: the path to the WAV file
+    :return: the samples of the first channel (a read-only memmap view) and the sample rate as a tuple
+    """
+    with open(path, "rb") as wave_file:
+        header = wave_file.read(12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+        channels = rate = None
+        while True:
+            chunk = wave_file.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                audio_format, channels, rate, _, _, bits = struct.unpack("<HHIIHH", wave_file.read(16))
+                if audio_format != 1 or bits != 16:
+                    raise ValueError(f"{path} is not 16-bit PCM")
+                wave_file.seek(size - 16 + size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                offset = wave_file.tell()
+                break
+            else:
+                wave_file.seek(size + size % 2, os.SEEK_CUR)
+    if channels is None:
+        raise ValueError(f"{path} has no format chunk")
+    # The header of a recording that was cut short may overstate the data size
+    frames = min(size, os.path.getsize(path) - offset) // (2 * channels)
+    if not frames:
+        return numpy.empty(0, dtype=numpy.int16), rate
+    samples = numpy.memmap(path, dtype=numpy.int16, mode="r", offset=offset, shape=(frames, channels))
+    return samples[:, 0], rate
+
+
+class VoiceActivityDetector:
+    """
+    Finds the stretches of a recording where someone is talking. Audio is cut into
+    short frames, and a frame counts as speech if its energy is well above the noise
+    floor, or somewhat above it with a high zero-crossing rate (unvoiced sounds like
+    "s" are quiet but noisy). The noise floor tracks the quietest recent frames, so no
+    calibration is needed. Chunks can be any size; leftover samples wait for the next one.
+    """
+
+    FRAME_SECONDS = 0.02
+    SPEECH_DB = 12
+    UNVOICED_DB = 6
+    UNVOICED_ZCR = 0.25
+    HANGOVER_SECONDS = 0.3
+    MIN_SEGMENT_SECONDS = 0.25
+    MIN_GAP_SECONDS = 0.5
+    FLOOR_RISE_DB = 0.01
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.frame = int(rate * VoiceActivityDetector.FRAME_SECONDS)
+        self.hangover = int(VoiceActivityDetector.HANGOVER_SECONDS / VoiceActivityDetector.FRAME_SECONDS)
+        self.min_segment = int(rate * VoiceActivityDetector.MIN_SEGMENT_SECONDS)
+        self.min_gap = int(rate * VoiceActivityDetector.MIN_GAP_SECONDS)
+        self.pending = numpy.empty(0, dtype=numpy.int16)
+        self.position = 0
+        self.noise_floor = None
+        self.segment = None
+        self.quiet_frames = 0
+        self.segments = []
+
+    def process(self, samples: numpy.ndarray) -> None:
+        """
+        Runs the detector over the next chunk of a recording.
+
+        :param samples: a one-dimensional array of int16 samples
+        :return: nothing
+        """
+        if len(self.pending):
+            samples = numpy.concatenate((self.pending, samples))
+        count = len(samples) // self.frame
+        self.pending = numpy.array(samples[count * self.frame:])
+        if not count:
+            return
+        frames = numpy.asarray(samples[:count * self.frame], dtype=numpy.float64).reshape(count, self.frame)
+        energies = 10 * numpy.log10(numpy.mean(frames * frames, axis=1) + 1)
+        crossings = numpy.count_nonzero(numpy.diff(numpy.signbit(frames), axis=1), axis=1) / self.frame
+        for energy, crossing in zip(energies.tolist(), crossings.tolist()):
+            self._process_frame(energy, crossing)
+            self.position += self.frame
+
+    def _process_frame(self, energy: float, crossing: float) -> None:
+        """
+        Updates the noise floor and the current segment with one frame.
+
+        :param energy: the energy of the frame in dB
+        :param crossing: the zero-crossing rate of the frame
+        :return: nothing
+        """
+        if self.noise_floor is None or energy < self.noise_floor:
+            self.noise_floor = energy
+        else:
+            self.noise_floor += VoiceActivityDetector.FLOOR_RISE_DB
+        above = energy - self.noise_floor
+        speech = above > VoiceActivityDetector.SPEECH_DB or (
+            above > VoiceActivityDetector.UNVOICED_DB and crossing > VoiceActivityDetector.UNVOICED_ZCR
+        )
+        if speech:
+            if self.segment is None:
+                self.segment = [self.position, self.position, 0.0, 0]
+            self.segment[1] = self.position + self.frame
+            self.segment[2] += energy
+            self.segment[3] += 1
+            self.quiet_frames = 0
+        elif self.segment is not None:
+            self.quiet_frames += 1
+            if self.quiet_frames > self.hangover:
+                self._close_segment()
+
+    def _close_segment(self) -> None:
+        """
+        Ends the current segment, merging it into the previous one if the gap between
+        them is short and dropping it if it is too short to be speech.
+
+        :return: nothing
+        """
+        segment, self.segment = self.segment, None
+        self.quiet_frames = 0
+        if self.segments and segment[0] - self.segments[-1][1] < self.min_gap:
+            previous = self.segments[-1]
+            previous[1] = segment[1]
+            previous[2] += segment[2]
+            previous[3] += segment[3]
+        elif segment[1] - segment[0] >= self.min_segment:
+            self.segments.append(segment)
+
+    def finish(self) -> list:
+        """
+        Closes any open segment at the end of the recording.
+
+        :return: the segments as (start sample, end sample, mean energy in dB) tuples
+        """
+        if self.segment is not None:
+            self._close_segment()
+        return [(start, end, energy / frames) for start, end, energy, frames in self.segments]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the segment index as a CSV, one segment per row.
+
+        :param path: the path to the index
+        :return: nothing
+        """
+        with open(path, "w", newline="") as index:
+            writer = csv.writer(index)
+            writer.writerow(["start_sample", "end_sample", "start_seconds", "end_seconds", "energy_db"])
+            for start, end, energy in self.finish():
+                writer.writerow([start, end, f'{start / self.rate:.3f}', f'{end / self.rate:.3f}', f'{energy:.1f}'])
+
+    @staticmethod
+    def index_wav(path: str, block_seconds: int = 60) -> int:
+        """
+        Writes the voice activity index of an existing WAV file. The file is memory-mapped
+        and processed a block at a time, so memory use does not depend on its length.
+
+        :param path: the path to the WAV file
+        :param block_seconds: the length of audio processed at once
+        :return: the number of segments found
+        """
+        samples, rate = wav_data(path)
+        detector = VoiceActivityDetector(rate)
+        block = rate * block_seconds
+        for start in range(0, len(samples), block):
+            detector.process(samples[start:start + block])
+        detector.save(voice_index_path(path))
+        return len(detector.segments)
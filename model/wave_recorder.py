@@ -0,0 +1,181 @@
+import os
+import queue
+import struct
+import threading
+import wave
+
+import numpy
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+
+class WaveRecorder:
+    """
+    Writes audio chunks to a WAV file on a dedicated thread. Chunks are handed over
+    through a bounded queue, so the audio callback never touches the disk, and the
+    WAV header is patched after every batch, so a crash leaves a playable file.
+    """
+
+    QUEUE_SIZE = 256
+    HEADER_SIZE = 44
+
+    # Appended to the path of a recording while it is being written
+    PART_SUFFIX = ".part"
+
+    def __init__(self, path: str, channels: int, sample_width: int, rate: int):
+        self.path = path
+        self.chunks = queue.Queue(maxsize=WaveRecorder.QUEUE_SIZE)
+        self.dropped_chunks = 0
+        self.frames_written = 0
+        self._open(channels, sample_width, rate)
+        self.writer_thread = threading.Thread(target=self._write_chunks, daemon=True)
+        self.writer_thread.start()
+
+    def _open(self, channels: int, sample_width: int, rate: int) -> None:
+        """
+        Opens the output file.
+
+        :param channels: the number of channels
+        :param sample_width: the size of a sample in bytes
+        :param rate: the sample rate
+        :return: nothing
+        """
+        self.wave_file = wave.open(self.path, 'wb')
+        self.wave_file.setnchannels(channels)
+        self.wave_file.setsampwidth(sample_width)
+        self.wave_file.setframerate(rate)
+
+    def _write(self, frames: bytes) -> None:
+        """
+        Appends frames to the output file and patches its header.
+
+        :param frames: raw audio frames
+        :return: nothing
+        """
+        self.wave_file.writeframes(frames)
+        self.frames_written = self.wave_file.getnframes()
+
+    def _finish(self) -> None:
+        """
+        Closes the output file.
+
+        :return: nothing
+        """
+        self.wave_file.close()
+
+    def put(self, chunk: bytes, block: bool = False) -> None:
+        """
+        Queues a chunk for writing. Unless blocking is requested, a chunk that arrives
+        while the queue is full (the writer has fallen far behind) is counted as dropped.
+
+        :param chunk: raw audio frames
+        :param block: True to wait for room in the queue
+        :return: nothing
+        """
+        if block:
+            self.chunks.put(chunk)
+            return
+        try:
+            self.chunks.put_nowait(chunk)
+        except queue.Full:
+            self.dropped_chunks += 1
+
+    def _write_chunks(self) -> None:
+        """
+        Drains the queue in batches and appends each batch to the WAV file.
+
+        :return: nothing
+        """
+        while True:
+            batch = [self.chunks.get()]
+            while batch[-1] is not None:
+                try:
+                    batch.append(self.chunks.get_nowait())
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            if batch:
+                self._write(b''.join(batch))
+            if done:
+                return
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Checks whether this recorder can be used.
+
+        :return: True if the recorder's dependencies are installed
+        """
+        return True
+
+    def close(self) -> None:
+        """
+        Writes any queued chunks and closes the WAV file.
+
+        :return: nothing
+        """
+        self.chunks.put(None)
+        self.writer_thread.join()
+        self._finish()
+        if self.dropped_chunks:
+            print(f"Dropped {self.dropped_chunks} audio chunks while writing {self.path}")
+
+    @staticmethod
+    def recover(path: str) -> int:
+        """
+        Repairs the header of a WAV file which was not closed (e.g. after a crash), so its
+        sizes match the audio that actually made it to disk.
+
+        :param path: the path to the WAV file
+        :return: the number of bytes of audio in the file
+        """
+        with open(path, "r+b") as wave_file:
+            header = wave_file.read(WaveRecorder.HEADER_SIZE)
+            if header[:4] != b"RIFF" or header[36:40] != b"data":
+                raise ValueError(f"{path} is not a WAV file written by WaveRecorder")
+            block_align = struct.unpack("<H", header[32:34])[0]
+            data_size = os.path.getsize(path) - WaveRecorder.HEADER_SIZE
+            data_size -= data_size % block_align
+            wave_file.truncate(WaveRecorder.HEADER_SIZE + data_size)
+            wave_file.seek(4)
+            wave_file.write(struct.pack("<I", 36 + data_size))
+            wave_file.seek(40)
+            wave_file.write(struct.pack("<I", data_size))
+        return data_size
+
+
+class FlacRecorder(WaveRecorder):
+    """
+    A WaveRecorder which writes lossless FLAC instead of WAV. Needs the optional
+    soundfile package (pip install EDAAudioSync[flac]).
+    """
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Checks whether FLAC recording is possible (i.e., soundfile is installed).
+
+        :return: True if FlacRecorder can be used
+        """
+        return soundfile is not None
+
+    def _open(self, channels: int, sample_width: int, rate: int) -> None:
+        if soundfile is None:
+            raise RuntimeError("FLAC recording requires the soundfile package")
+        if sample_width != 2:
+            raise ValueError("FLAC recording only supports 16-bit audio")
+        self.flac_file = soundfile.SoundFile(self.path, 'w', samplerate=rate, channels=channels,
+                                             format='FLAC', subtype='PCM_16')
+
+    def _write(self, frames: bytes) -> None:
+        samples = numpy.frombuffer(frames, numpy.int16).reshape(-1, self.flac_file.channels)
+        self.flac_file.write(samples)
+        self.frames_written += len(samples)
+
+    def _finish(self) -> None:
+        self.flac_file.close()
@@ -0,0 +1,155 @@
+import numpy
+
+
+def reduce_envelope(positions: numpy.ndarray, mins: numpy.ndarray, maxs: numpy.ndarray, points: int) -> tuple:
+    """
+    Merges neighbouring min/max pairs until there are at most points of them.
+
+    :param positions: the first sample of each pair
+    :param mins: the minimum of each pair
+    :param maxs: the maximum of each pair
+    :param points: the most pairs to return
+    :return: the merged positions, minimums, and maximums as a tuple
+    """
+    if len(mins) <= points:
+        return positions, mins, maxs
+    edges = numpy.linspace(0, len(mins), points + 1).astype(numpy.int64)[:-1]
+    return positions[edges], numpy.minimum.reduceat(mins, edges), numpy.maximum.reduceat(maxs, edges)
+
+
+def min_max_envelope(samples: numpy.ndarray, points: int, offset: int = 0) -> tuple:
+    """
+    Computes a min/max envelope of raw samples with at most points buckets.
+
+    :param samples: a one-dimensional array of samples
+    :param points: the most buckets to return
+    :param offset: the position of the first sample
+    :return: the first sample of each bucket, the minimums, and the maximums as a tuple
+    """
+    positions = numpy.arange(offset, offset + len(samples))
+    return reduce_envelope(positions, samples, samples, points)
+
+
+class WaveformPyramid:
+    """
+    A multi-resolution min/max envelope of a recording. Level 0 holds the minimum and
+    maximum of every BLOCK samples and each level above merges FACTOR entries of the
+    level below, so any span of the recording can be drawn from a bounded number of
+    points. The pyramid is built incrementally as samples arrive.
+    """
+
+    BLOCK = 64
+    FACTOR = 4
+
+    def __init__(self, block: int = BLOCK, factor: int = FACTOR, dtype=numpy.int16):
+        self.block = block
+        self.factor = factor
+        self.dtype = dtype
+        self.mins = []
+        self.maxs = []
+        self.lengths = []
+        self.pending = numpy.empty(0, dtype=dtype)
+        self.total = 0
+
+    def append(self, samples: numpy.ndarray) -> None:
+        """
+        Adds samples to the pyramid. Samples which do not fill a block wait for the next call.
+
+        :param samples: a one-dimensional array of samples
+        :return: nothing
+        """
+        self.total += len(samples)
+        if len(self.pending):
+            samples = numpy.concatenate((self.pending, samples))
+        full = len(samples) // self.block * self.block
+        self.pending = samples[full:].copy()
+        if full:
+            blocks = samples[:full].reshape(-1, self.block)
+            self._push(0, blocks.min(axis=1), blocks.max(axis=1))
+
+    def _push(self, level: int, mins: numpy.ndarray, maxs: numpy.ndarray) -> None:
+        """
+        Appends entries to a level and merges every completed group into the level above.
+
+        :param level: the level to append to
+        :param mins: the new minimums
+        :param maxs: the new maximums
+        :return: nothing
+        """
+        if level == len(self.lengths):
+            self.mins.append(numpy.empty(max(len(mins), 1024), dtype=self.dtype))
+            self.maxs.append(numpy.empty(max(len(maxs), 1024), dtype=self.dtype))
+            self.lengths.append(0)
+        start, stop = self.lengths[level], self.lengths[level] + len(mins)
+        if stop > len(self.mins[level]):
+            capacity = max(stop, 2 * len(self.mins[level]))
+            self.mins[level] = numpy.resize(self.mins[level], capacity)
+            self.maxs[level] = numpy.resize(self.maxs[level], capacity)
+        self.mins[level][start:stop] = mins
+        self.maxs[level][start:stop] = maxs
+        self.lengths[level] = stop
+
+        merged = self.lengths[level + 1] * self.factor if level + 1 < len(self.lengths) else 0
+        complete = stop // self.factor * self.factor
+        if complete > merged:
+            self._push(
+                level + 1,
+                self.mins[level][merged:complete].reshape(-1, self.factor).min(axis=1),
+                self.maxs[level][merged:complete].reshape(-1, self.factor).max(axis=1)
+            )
+
+    def envelope(self, start: int, stop: int, points: int) -> tuple:
+        """
+        Returns the envelope of a span of the recording, read from the coarsest level
+        which still has at least points entries over the span.
+
+        :param start: the first sample of the span
+        :param stop: the sample after the end of the span
+        :param points: the most min/max pairs to return
+        :return: the first sample of each pair, the minimums, and the maximums as a tuple
+        """
+        if not self.lengths or stop <= start:
+            empty = numpy.empty(0, dtype=self.dtype)
+            return numpy.empty(0, dtype=numpy.int64), empty, empty
+        level, size = 0, self.block
+        while level + 1 < len(self.lengths) and size * self.factor * points <= stop - start:
+            level, size = level + 1, size * self.factor
+        first = start // size
+        last = min(-(-stop // size), self.lengths[level])
+        positions = numpy.arange(first, last, dtype=numpy.int64) * size
+        return reduce_envelope(positions, self.mins[level][first:last], self.maxs[level][first:last], points)
+
+    def save(self, path: str) -> None:
+        """
+        Saves the pyramid as a NumPy archive.
+
+        :param path: the path of the archive
+        :return: nothing
+        """
+        levels = {}
+        for level, length in enumerate(self.lengths):
+            levels[f'mins_{level}'] = self.mins[level][:length]
+            levels[f'maxs_{level}'] = self.maxs[level][:length]
+        with open(path, "wb") as archive:
+            numpy.savez(archive, block=self.block, factor=self.factor, total=self.total, pending=self.pending,
+                        **levels)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Loads a pyramid saved with save.
+
+        :param path: the path of the archive
+        :return: the pyramid
+        """
+        with numpy.load(path) as archive:
+            pyramid = cls(int(archive["block"]), int(archive["factor"]), archive["pending"].dtype)
+            pyramid.total = int(archive["total"])
+            pyramid.pending = archive["pending"]
+            level = 0
+            while f'mins_{level}' in archive:
+                pyramid.mins.append(archive[f'mins_{level}'])
+                pyramid.maxs.append(archive[f'maxs_{level}'])
+                pyramid.lengths.append(len(pyramid.mins[-1]))
+                level += 1
+        return pyramid
@@ -17,7 +17,12 @@ setuptools.setup(
     entry_points={
         "console_scripts": [
             'data_sync = tools.data_sync:main',
-            'data_aggregate = tools.data_aggregator:main'
+            'data_aggregate = tools.data_aggregator:main',
+            'voice_index = tools.voice_index:main',
+            'audio_recover = tools.audio_recover:main',
+            'eda_recover = tools.eda_recover:main',
+            'e4_simulator = tools.e4_simulator:main',
+            'eda_convert = tools.eda_convert:main'
         ],
     },
     classifiers=[
@@ -30,4 +35,7 @@ setuptools.setup(
         'pyaudio',
         'matplotlib'
     ],
+    extras_require={
+        'flac': ['soundfile']
+    },
 )
\ No newline at end of file
@@ -0,0 +1,42 @@
+import csv
+import pathlib
+
+import pytest
+
+from tools import data_aggregator
+
+QUESTIONS = {segment: [f'Q1_{i + 1}' for i in range(3)] for segment in data_aggregator.SEGMENTS}
+CHOICES = ["Strongly disagree", "Disagree", "Neutral", "Agree", "Strongly agree"]
+
+
+def write_test_survey(directory: pathlib.Path, segment: str, students: list, text: bool = False) -> pathlib.Path:
+    """
+    Writes a small Qualtrics export (a header row, two metadata rows, and one row per student).
+
+    :param directory: the directory to write the export to
+    :param segment: the segment of the export (before, during, after)
+    :param students: the indices of the students who completed the segment
+    :param text: True to export the choice text (e.g. Agree) instead of the choice number
+    :return: the path to the export
+    """
+    questions = QUESTIONS[segment]
+    path = directory.joinpath(f'{segment.capitalize()}-task AEQp_test.csv')
+    with path.open(mode="w", newline="") as export:
+        writer = csv.writer(export)
+        writer.writerow(["ResponseId", data_aggregator.LAST_NAME, data_aggregator.FIRST_NAME] + questions)
+        writer.writerow(["Response ID", "Recipient Last Name", "Recipient First Name"] + [
+            f'Please indicate how you are feeling {segment} the task. - Statement {question}' for question in questions
+        ])
+        writer.writerow(['{"ImportId":"_recordId"}', '{"ImportId":"recipientLastName"}',
+                         '{"ImportId":"recipientFirstName"}'] + [f'{{"ImportId":"{q}"}}' for q in questions])
+        for i in students:
+            choices = [(i + j) % 5 for j in range(3)]
+            writer.writerow([f'R_{segment}{i}', f'Last{i}', f'First{i}'] + [
+                CHOICES[choice] if text else choice + 1 for choice in choices
+            ])
+    return path
+
+
+@pytest.fixture
+def write_survey():
+    return write_test_survey
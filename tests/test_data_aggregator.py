@@ -0,0 +1,58 @@
+import argparse
+import csv
+import pathlib
+
+import pytest
+
+from tools import data_aggregator
+
+
+def aggregate(directory: pathlib.Path, **options) -> str:
+    """
+    Aggregates the surveys in a directory from the command line defaults and returns the aggregate survey.
+
+    :param directory: the directory holding the surveys
+    :param options: command line options to override (e.g. backend)
+    :return: the contents of the aggregate survey
+    """
+    args = data_aggregator.build_parser().parse_args([])
+    args = argparse.Namespace(**{**vars(args), **options})
+    paths = sorted(str(path) for path in directory.glob("*-task AEQp_test.csv"))
+    data_aggregator.aggregate(paths, directory, args)
+    return directory.joinpath("aggregate_survey.csv").read_text()
+
+
+@pytest.fixture
+def first_student_missing(tmp_path: pathlib.Path, write_survey) -> pathlib.Path:
+    write_survey(tmp_path, "before", [0, 1, 2])
+    write_survey(tmp_path, "during", [1, 2])
+    write_survey(tmp_path, "after", [2, 0])
+    return tmp_path
+
+
+def test_keep_first_student_missing_a_segment(first_student_missing):
+    rows = list(csv.DictReader(aggregate(first_student_missing).splitlines()))
+    assert [row[data_aggregator.FIRST_NAME] for row in rows] == ["First0", "First1", "First2"]
+    assert rows[0]["Q1_1_during_question"] == rows[0]["Q1_1_during_description"] == ""
+    assert rows[1]["Q1_1_during_subscale"] == "enjoyment"
+
+
+def test_backends_match_when_students_are_missing(first_student_missing):
+    pytest.importorskip("pandas")
+    for missing in data_aggregator.MISSING_POLICIES[:2]:
+        assert aggregate(first_student_missing, missing=missing) == \
+            aggregate(first_student_missing, missing=missing, backend=data_aggregator.BACKEND_PANDAS)
+
+
+def test_backends_match_on_text_responses(tmp_path, write_survey):
+    pytest.importorskip("pandas")
+    write_survey(tmp_path, "before", [0, 1, 2, 3])
+    write_survey(tmp_path, "during", [1, 2, 3], text=True)
+    write_survey(tmp_path, "after", [3, 0, 2], text=True)
+    for missing in data_aggregator.MISSING_POLICIES[:2]:
+        expected = aggregate(tmp_path, missing=missing)
+        assert "Strongly agree" in expected
+        assert aggregate(tmp_path, missing=missing, backend=data_aggregator.BACKEND_PANDAS) == expected
+    scored = list(csv.DictReader(aggregate(tmp_path, backend=data_aggregator.BACKEND_PANDAS, scores=True).splitlines()))
+    assert scored[0]["enjoyment_before_mean"] == "2.0"
+    assert scored[0]["enjoyment_during_mean"] == ""
@@ -0,0 +1,87 @@
+import numpy
+import pytest
+
+from model.downsampler import MinMaxDownsampler
+
+RATE = 4
+
+
+def spiky_stream(samples: int, spikes: list) -> tuple:
+    """
+    Generates a noisy EDA-like stream with single-sample spikes.
+
+    :param samples: the number of samples
+    :param spikes: the indices of the spikes (every other one points down)
+    :return: the timestamps and the values as a tuple
+    """
+    rng = numpy.random.default_rng(0)
+    x = 1600000000.0 + numpy.arange(samples) / RATE
+    y = 2.0 + 0.01 * rng.standard_normal(samples)
+    y[spikes[0::2]] = 50.0
+    y[spikes[1::2]] = -50.0
+    return x, y
+
+
+@pytest.mark.parametrize("points", [4, 10, 100, 1000])
+@pytest.mark.parametrize("spike", [0, 1, 4999, 33333, 49999])
+def test_single_sample_spike_survives_every_zoom_level(points, spike):
+    for direction in (1, -1):
+        x, y = spiky_stream(50000, [])
+        y[spike] = 2.0 + direction * 48.0
+        for start in (0, 1, 4000, 30000):
+            if spike < start:
+                continue
+            downsampled_x, downsampled_y = MinMaxDownsampler(points).downsample(x[start:], y[start:])
+            assert x[spike] in downsampled_x
+            assert y[spike] in downsampled_y
+
+
+@pytest.mark.parametrize("points", [4, 10, 100, 1000])
+def test_extremes_of_every_bucket_survive(points):
+    x, y = spiky_stream(50000, [17, 5000, 5001, 33333, 49999])
+    downsampled_x, downsampled_y = MinMaxDownsampler(points).downsample(x, y)
+    assert downsampled_y.max() == y.max()
+    assert downsampled_y.min() == y.min()
+    assert numpy.isin(downsampled_x, x).all()
+
+
+@pytest.mark.parametrize("points", [4, 5, 10, 999, 2000])
+def test_output_stays_within_budget(points):
+    x, y = spiky_stream(100000, [10])
+    downsampler = MinMaxDownsampler(points)
+    for samples in (points + 1, 5000, 100000):
+        downsampled_x, downsampled_y = downsampler.downsample(x[:samples], y[:samples])
+        assert len(downsampled_x) == len(downsampled_y) <= points
+        assert numpy.all(numpy.diff(downsampled_x) >= 0)
+
+
+def test_short_lines_are_returned_as_they_are():
+    x, y = spiky_stream(100, [10])
+    downsampled_x, downsampled_y = MinMaxDownsampler(100).downsample(x, y)
+    assert downsampled_x is x and downsampled_y is y
+
+
+def test_cached_matches_uncached_while_scrolling():
+    x, y = spiky_stream(40000, [100, 7777, 20001, 39998])
+    window, step, span = 60 * RATE, 7, 60.0
+    cached = MinMaxDownsampler(100)
+    for stop in range(window, len(x), step):
+        start = stop - window
+        expected = MinMaxDownsampler(100).downsample(x[start:stop], y[start:stop], span)
+        actual = cached.downsample(x[start:stop], y[start:stop], span)
+        numpy.testing.assert_array_equal(actual[0], expected[0])
+        numpy.testing.assert_array_equal(actual[1], expected[1])
+
+
+def test_cache_resets_when_time_goes_back():
+    x, y = spiky_stream(10000, [5])
+    downsampler = MinMaxDownsampler(50)
+    downsampler.downsample(x, y)
+    restarted = downsampler.downsample(x[:3000], -y[:3000])
+    expected = MinMaxDownsampler(50).downsample(x[:3000], -y[:3000])
+    numpy.testing.assert_array_equal(restarted[1], expected[1])
+
+
+def test_budget_must_hold_two_min_max_pairs():
+    with pytest.raises(ValueError):
+        MinMaxDownsampler(3)
@@ -0,0 +1,80 @@
+import csv
+import os
+
+import numpy
+import pytest
+
+from model.eda_file import EDABinaryFile
+from model.eda_recorder import RECORDERS, EDARecorder
+from tools import eda_recover
+
+FIELDS = ("time", "value")
+
+
+def record_and_crash(path: str, file_format: str, samples: int, segment_bytes: int) -> list:
+    """
+    Records GSR samples into segments and leaves them behind, as a crash would, with the
+    last segment cut off in the middle of a sample.
+
+    :param path: the base path of the recording
+    :param file_format: the file format (one of RECORDERS)
+    :param samples: the number of samples to record
+    :param segment_bytes: the size at which segments are rotated
+    :return: the segments left behind
+    """
+    recorder = RECORDERS[file_format]({"E4_Gsr": path}, {"E4_Gsr": FIELDS}, segment_bytes=segment_bytes)
+    for start in range(0, samples, 100):
+        times = numpy.arange(start, min(start + 100, samples)) / 4.0
+        recorder.put({"E4_Gsr": (times, times * 2)})
+    recorder.close()
+    segments = recorder.segments["E4_Gsr"]
+    with open(segments[-1], "r+b") as segment:
+        segment.truncate(os.path.getsize(segments[-1]) - 3)
+    return segments
+
+
+def read_samples(path: str, file_format: str) -> numpy.ndarray:
+    if file_format == "csv":
+        with open(path, newline="") as recording:
+            reader = csv.reader(recording)
+            assert tuple(next(reader)) == FIELDS
+            return numpy.array(list(reader), dtype=numpy.float64)
+    return numpy.array(EDABinaryFile(path).records)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "e4b"])
+@pytest.mark.parametrize("segment_bytes", [2 ** 30, 4096])
+def test_recover_joins_truncated_segments(tmp_path, file_format, segment_bytes):
+    base = str(tmp_path.joinpath(f'session_eda_1.{file_format}'))
+    path = str(tmp_path.joinpath(f'session_eda_1_gsr.{file_format}'))
+    segments = record_and_crash(path, file_format, 1000, segment_bytes)
+    assert (len(segments) > 1) == (segment_bytes == 4096)
+
+    assert EDARecorder.recover(base) == [path]
+    assert not any(os.path.exists(segment) for segment in segments)
+    samples = read_samples(path, file_format)
+    # Only the sample cut in half is lost
+    assert len(samples) == 999
+    numpy.testing.assert_array_equal(samples[:, 0], numpy.arange(999) / 4.0)
+    numpy.testing.assert_array_equal(samples[:, 1], numpy.arange(999) / 2.0)
+
+
+def test_recover_tool_finds_segments_in_a_directory(tmp_path):
+    segments = record_and_crash(str(tmp_path.joinpath("session_eda_1_gsr.csv")), "csv", 1000, 4096)
+    record_and_crash(str(tmp_path.joinpath("session_eda_2_gsr.e4b")), "e4b", 10, 4096)
+    tmp_path.joinpath("session_audio_1.wav.part").touch()
+
+    found = eda_recover.find_segments([str(tmp_path)])
+    assert sorted(found) == [str(tmp_path.joinpath("session_eda_1_gsr.csv")),
+                             str(tmp_path.joinpath("session_eda_2_gsr.e4b"))]
+    assert found[str(tmp_path.joinpath("session_eda_1_gsr.csv"))] == segments
+
+
+def test_recover_skips_an_empty_last_binary_segment(tmp_path):
+    path = str(tmp_path.joinpath("session_eda_1_gsr.e4b"))
+    segments = record_and_crash(path, "e4b", 1000, 4096)
+    open(EDARecorder.segment_path(path, len(segments)), "wb").close()
+
+    assert EDARecorder.recover(str(tmp_path.joinpath("session_eda_1.e4b"))) == [path]
+    assert len(EDABinaryFile(path)) == 999
+    assert os.listdir(tmp_path) == ["session_eda_1_gsr.e4b"]
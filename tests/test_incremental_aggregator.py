@@ -0,0 +1,68 @@
+import pathlib
+
+from tools import data_aggregator, incremental_aggregator
+
+
+def survey_paths(directory: pathlib.Path) -> list:
+    return sorted(str(path) for path in directory.glob("*-task AEQp_test.csv"))
+
+
+def full_aggregation(directory: pathlib.Path, output_path: pathlib.Path, on_missing: str) -> str:
+    """
+    Aggregates the surveys in a directory from scratch.
+
+    :param directory: the directory holding the surveys
+    :param output_path: the directory to dump the aggregate survey
+    :param on_missing: the missing segment policy (one of MISSING_POLICIES)
+    :return: the contents of the aggregate survey
+    """
+    surveys = data_aggregator.load_surveys(survey_paths(directory))
+    data_aggregator.dump_csv(data_aggregator.aggregate_surveys(surveys, on_missing=on_missing), output_path)
+    return output_path.joinpath("aggregate_survey.csv").read_text()
+
+
+def test_late_student_is_inserted_in_before_survey_order(tmp_path, write_survey):
+    output_path, expected_path = tmp_path.joinpath("output"), tmp_path.joinpath("expected")
+    output_path.mkdir()
+    expected_path.mkdir()
+    write_survey(tmp_path, "before", [0, 1, 2, 3])
+    write_survey(tmp_path, "during", [0, 1, 3])
+    write_survey(tmp_path, "after", [0, 1, 2, 3])
+    paths = survey_paths(tmp_path)
+    assert incremental_aggregator.aggregate_incremental(
+        paths, output_path, on_missing=data_aggregator.MISSING_DROP
+    ) == 3
+
+    write_survey(tmp_path, "during", [0, 1, 3, 2])
+    assert incremental_aggregator.aggregate_incremental(
+        paths, output_path, on_missing=data_aggregator.MISSING_DROP
+    ) == 4
+    assert output_path.joinpath("aggregate_survey.csv").read_text() == \
+        full_aggregation(tmp_path, expected_path, data_aggregator.MISSING_DROP)
+
+
+def test_up_to_date_run_counts_rows(tmp_path, write_survey):
+    write_survey(tmp_path, "before", [0, 1, 0, 2])
+    write_survey(tmp_path, "during", [0, 1, 2])
+    write_survey(tmp_path, "after", [0, 1])
+    paths = survey_paths(tmp_path)
+    assert incremental_aggregator.aggregate_incremental(paths, tmp_path) == 4
+    assert incremental_aggregator.aggregate_incremental(paths, tmp_path) == 4
+
+
+def test_unchanged_surveys_are_not_hashed(tmp_path, write_survey, monkeypatch):
+    write_survey(tmp_path, "before", [0, 1])
+    write_survey(tmp_path, "during", [0, 1])
+    write_survey(tmp_path, "after", [0, 1])
+    paths = survey_paths(tmp_path)
+    assert incremental_aggregator.aggregate_incremental(paths, tmp_path) == 2
+
+    hashed = []
+    file_digest = incremental_aggregator.file_digest
+    monkeypatch.setattr(incremental_aggregator, "file_digest", lambda path: hashed.append(path) or file_digest(path))
+    assert incremental_aggregator.aggregate_incremental(paths, tmp_path) == 2
+    assert hashed == []
+
+    write_survey(tmp_path, "after", [0, 1, 2])
+    assert incremental_aggregator.aggregate_incremental(paths, tmp_path) == 2
+    assert [data_aggregator.get_survey_segment(path) for path in hashed] == ["after"]
@@ -0,0 +1,60 @@
+import argparse
+import os
+
+from model.wave_recorder import WaveRecorder
+from tools.file_patterns import expand_patterns
+
+
+def find_partial_recordings(patterns: list) -> list:
+    """
+    Finds every WAV recording under a set of directories or glob patterns which was never
+    finished (i.e. is still named <name>.wav.part).
+
+    :param patterns: a list of directories, files, or glob patterns
+    :return: a sorted list of partial recording paths
+    """
+    suffix = f'.wav{WaveRecorder.PART_SUFFIX}'
+    return sorted(path for path in expand_patterns(patterns) if path.lower().endswith(suffix))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line interface for the audio recovery tool.
+
+    :return: the argument parser
+    """
+    parser = argparse.ArgumentParser(
+        description=f"Repairs WAV recordings left behind as <name>.wav{WaveRecorder.PART_SUFFIX} by a crash "
+                    f"and renames each to <name>.wav."
+    )
+    parser.add_argument("recordings", nargs="+", help="partial recordings, directories, or glob patterns to recover")
+    parser.add_argument("--force", action="store_true", help="overwrite recordings which already exist")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    recordings = find_partial_recordings(args.recordings)
+    if not recordings:
+        print("No partial recordings found")
+        return
+
+    failures = 0
+    for path in recordings:
+        output = path[:-len(WaveRecorder.PART_SUFFIX)]
+        if os.path.exists(output) and not args.force:
+            print(f"Skipping {path}: {output} already exists")
+            continue
+        try:
+            data_size = WaveRecorder.recover(path)
+        except (OSError, ValueError) as e:
+            print(f"Failed to recover {path}: {e}")
+            failures += 1
+            continue
+        os.replace(path, output)
+        print(f"Recovered {data_size} bytes of audio from {path} to {output}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
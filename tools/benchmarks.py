@@ -0,0 +1,765 @@
+import argparse
+import collections
+import csv
+import pathlib
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from model.survey_table import SurveyTable
+from tools import data_aggregator
+
+SURVEY_COLUMNS = ["ResponseId", data_aggregator.LAST_NAME, data_aggregator.FIRST_NAME]
+
+
+def write_synthetic_survey(directory: pathlib.Path, segment: str, respondents: int, seed: int = 0) -> pathlib.Path:
+    """
+    Writes a synthetic Qualtrics export (a header row, two metadata rows, and one row per respondent).
+
+    :param directory: the directory to write the export to
+    :param segment: the segment of the export (before, during, after)
+    :param respondents: the number of respondents to generate
+    :param seed: the seed for the random responses (respondents are shuffled per segment)
+    :return: the path to the export
+    """
+    rng = random.Random(f"{seed}-{segment}")
+    questions = [f'Q1_{i + 1}' for i in range(len(data_aggregator.EMOTIONS_TO_PROMPTS[segment]))]
+    order = list(range(respondents))
+    rng.shuffle(order)
+    path = directory.joinpath(f'{segment.capitalize()}-task AEQp_synthetic.csv')
+    with path.open(mode="w", newline="") as export:
+        writer = csv.writer(export)
+        writer.writerow(SURVEY_COLUMNS + questions)
+        writer.writerow(["Response ID", "Recipient Last Name", "Recipient First Name"] + [
+            f'Please indicate how you are feeling {segment} the programming task. - Statement {question}'
+            for question in questions
+        ])
+        writer.writerow(['{"ImportId":"_recordId"}', '{"ImportId":"recipientLastName"}',
+                         '{"ImportId":"recipientFirstName"}'] + [f'{{"ImportId":"{q}"}}' for q in questions])
+        for i in order:
+            writer.writerow([f'R_{segment}{i}', f'Last{i}', f'First{i}'] + [rng.randint(1, 5) for _ in questions])
+    return path
+
+
+def write_synthetic_exports(directory: pathlib.Path, respondents: int) -> list:
+    """
+    Writes a before, during, and after export for the same set of respondents.
+
+    :param directory: the directory to write the exports to
+    :param respondents: the number of respondents per export
+    :return: a list of export paths
+    """
+    return [write_synthetic_survey(directory, segment, respondents) for segment in data_aggregator.SEGMENTS]
+
+
+def benchmark_join(sizes: list) -> None:
+    """
+    Times loading and joining synthetic exports of increasing size. Linear scaling
+    shows up as a constant cost per respondent.
+
+    :param sizes: a list of respondent counts
+    :return: nothing
+    """
+    print(f'{"respondents":>12} {"load (s)":>10} {"join (s)":>10} {"us/respondent":>14}')
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = write_synthetic_exports(pathlib.Path(directory), size)
+            start = time.perf_counter()
+            surveys = data_aggregator.load_surveys(paths)
+            loaded = time.perf_counter()
+            data_aggregator.aggregate_surveys(surveys)
+            joined = time.perf_counter()
+        print(f'{size:>12} {loaded - start:>10.3f} {joined - loaded:>10.3f} {(joined - start) / size * 1e6:>14.1f}')
+
+
+def benchmark_stream(sizes: list) -> None:
+    """
+    Compares the peak traced memory of the in-memory and streaming aggregators on synthetic
+    exports of increasing size. The streaming peak should stay flat once the exports are
+    larger than a single sorted run.
+
+    :param sizes: a list of respondent counts
+    :return: nothing
+    """
+    print(f'{"respondents":>12} {"mode":>8} {"time (s)":>10} {"peak (MB)":>10}')
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            output = pathlib.Path(directory)
+            paths = write_synthetic_exports(output, size)
+            for mode in ("memory", "stream"):
+                tracemalloc.start()
+                start = time.perf_counter()
+                if mode == "stream":
+                    with ExitStack() as stack:
+                        fieldnames, responses = data_aggregator.stream_student_responses(paths, stack, 10000)
+                        data_aggregator.stream_csv(fieldnames, responses, output)
+                else:
+                    surveys = data_aggregator.load_surveys(paths)
+                    data_aggregator.dump_csv(data_aggregator.aggregate_surveys(surveys), output)
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f'{size:>12} {mode:>8} {elapsed:>10.3f} {peak / 2 ** 20:>10.1f}')
+
+
+def uncompiled_load_questions(responses: dict, participant: dict, segment: str, metadata: dict) -> None:
+    """
+    The original load_questions, which rebuilds every key and description for each participant.
+    Kept as the baseline for benchmark_plan.
+    """
+    for i in range(len(data_aggregator.EMOTIONS_TO_PROMPTS[segment])):
+        question_base = f'Q1_{i + 1}'
+        if question_base in participant:
+            question = f'{question_base}_{segment}_question'
+            responses[question] = participant[question_base]
+            description = f'{question_base}_{segment}_description'
+            responses[description] = metadata[question_base].split("-")[-1].strip()
+            sub_scale = f'{question_base}_{segment}_subscale'
+            responses[sub_scale] = data_aggregator.EMOTIONS_TO_PROMPTS[segment][i]
+
+
+def benchmark_plan(sizes: list) -> None:
+    """
+    Times the per-row cost of loading a participant's questions with and without a compiled column plan.
+
+    :param sizes: a list of respondent counts
+    :return: nothing
+    """
+    print(f'{"respondents":>12} {"segment":>8} {"uncompiled (us/row)":>20} {"compiled (us/row)":>18}')
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            surveys = data_aggregator.load_surveys(write_synthetic_exports(pathlib.Path(directory), size))
+        for segment in data_aggregator.SEGMENTS:
+            survey, metadata = surveys[segment]["survey"], surveys[segment]["metadata1"]
+            start = time.perf_counter()
+            for participant in survey:
+                uncompiled_load_questions({}, participant, segment, metadata)
+            uncompiled = time.perf_counter() - start
+            start = time.perf_counter()
+            plan = data_aggregator.get_column_plan(segment, metadata, surveys[segment]["metadata2"])
+            for participant in survey:
+                data_aggregator.apply_column_plan({}, participant, plan)
+            compiled = time.perf_counter() - start
+            print(f'{size:>12} {segment:>8} {uncompiled / size * 1e6:>20.2f} {compiled / size * 1e6:>18.2f}')
+
+
+def benchmark_table(sizes: list) -> None:
+    """
+    Compares the memory retained by an aggregate survey held as one dictionary per student
+    with the same survey held as a compact table.
+
+    :param sizes: a list of respondent counts
+    :return: nothing
+    """
+    print(f'{"respondents":>12} {"dicts (MB)":>11} {"table (MB)":>11} {"ratio":>7}')
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            surveys = data_aggregator.load_surveys(write_synthetic_exports(pathlib.Path(directory), size))
+        retained = []
+        for build in (list, SurveyTable.from_rows):
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            master_survey = build(
+                data_aggregator.join_participant(surveys, data_aggregator.participant_key(participant))[0]
+                for participant in surveys[data_aggregator.SEGMENTS[0]]["survey"]
+            )
+            retained.append(tracemalloc.get_traced_memory()[0] - baseline)
+            tracemalloc.stop()
+            del master_survey
+        print(f'{size:>12} {retained[0] / 2 ** 20:>11.1f} {retained[1] / 2 ** 20:>11.1f} '
+              f'{retained[0] / retained[1]:>7.1f}')
+
+
+def benchmark_waveform(sizes: list) -> None:
+    """
+    Times building a waveform pyramid chunk by chunk and rendering the whole recording and
+    its last second from it. Render time should stay flat as recordings get longer.
+
+    :param sizes: a list of recording lengths in seconds
+    :return: nothing
+    """
+    import numpy
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from model.waveform_pyramid import WaveformPyramid
+
+    rate, chunk, points = 44100, 1024, 1000
+    figure = Figure(figsize=(6, 4), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    plot = figure.add_subplot(111)
+    rng = numpy.random.default_rng(0)
+    print(f'{"seconds":>8} {"append (us/chunk)":>18} {"whole (ms)":>11} {"last second (ms)":>17}')
+    for size in sizes:
+        pyramid = WaveformPyramid()
+        samples = rng.integers(-2 ** 15, 2 ** 15, chunk * 64, dtype=numpy.int16)
+        chunks = size * rate // chunk
+        start = time.perf_counter()
+        for i in range(chunks):
+            pyramid.append(samples[i % 64 * chunk:(i % 64 + 1) * chunk])
+        append = (time.perf_counter() - start) / chunks
+        renders = []
+        for span in (pyramid.total, rate):
+            start = time.perf_counter()
+            positions, mins, maxs = pyramid.envelope(pyramid.total - span, pyramid.total, points)
+            plot.clear()
+            plot.plot(numpy.repeat(positions, 2), numpy.column_stack((mins, maxs)).ravel())
+            canvas.draw()
+            renders.append(time.perf_counter() - start)
+        print(f'{size:>8} {append * 1e6:>18.1f} {renders[0] * 1e3:>11.1f} {renders[1] * 1e3:>17.1f}')
+
+
+def benchmark_resample(sizes: list) -> None:
+    """
+    Times resampling a 44.1 kHz capture to 16 kHz chunk by chunk, as the audio callback
+    does, and reports the slowest chunk against the time a chunk takes to arrive.
+
+    :param sizes: a list of chunk sizes in frames
+    :return: nothing
+    """
+    import numpy
+    from model.resampler import PolyphaseResampler
+
+    capture_rate, rate, seconds = 44100, 16000, 60
+    rng = numpy.random.default_rng(0)
+    samples = rng.integers(-2 ** 15, 2 ** 15, capture_rate * seconds, dtype=numpy.int16)
+    print(f'{"chunk":>6} {"period (ms)":>12} {"mean (ms)":>10} {"max (ms)":>9} {"realtime x":>11}')
+    for size in sizes:
+        resampler = PolyphaseResampler(capture_rate, rate)
+        times = []
+        for start in range(0, len(samples) - size + 1, size):
+            begin = time.perf_counter()
+            resampler.process(samples[start:start + size])
+            times.append(time.perf_counter() - begin)
+        period = size / capture_rate
+        mean = sum(times) / len(times)
+        print(f'{size:>6} {period * 1e3:>12.1f} {mean * 1e3:>10.3f} {max(times) * 1e3:>9.3f} {period / mean:>11.0f}')
+
+
+# Samples per second of each E4 sample type when every stream is subscribed (tags come from button presses)
+E4_SAMPLE_RATES = {
+    "E4_Acc": 32, "E4_Bvp": 64, "E4_Gsr": 4, "E4_Temperature": 4,
+    "E4_Ibi": 1, "E4_Hr": 1, "E4_Battery": 0.1, "E4_Tag": 0.01
+}
+E4_SAMPLE_RATE = sum(E4_SAMPLE_RATES.values())
+
+
+def write_synthetic_e4_stream(samples: int, seed: int = 0) -> bytes:
+    """
+    Generates E4 streaming server output: every sample type interleaved at its real rate.
+
+    :param samples: the number of samples to generate
+    :param seed: the seed for the random values
+    :return: the raw bytes the server would send
+    """
+    rng = random.Random(seed)
+    names = rng.choices(list(E4_SAMPLE_RATES), list(E4_SAMPLE_RATES.values()), k=samples)
+    lines = []
+    timestamp = 1617900000.0
+    for name in names:
+        timestamp += 1 / E4_SAMPLE_RATE
+        if name == "E4_Acc":
+            values = f' {rng.randint(-64, 64)} {rng.randint(-64, 64)} {rng.randint(-64, 64)}'
+        elif name == "E4_Tag":
+            values = ''
+        else:
+            values = f' {rng.uniform(0, 50):.6f}'
+        lines.append(f'{name} {timestamp:.3f}{values}\r\n')
+    return "".join(lines).encode("utf-8")
+
+
+def legacy_store_samples(raw_data: bytes, data: list) -> None:
+    """
+    The original EDAManager._store_samples, which parses each recv on its own and keeps
+    strings. Kept as the baseline for benchmark_e4.
+    """
+    for sample in raw_data.decode("utf-8", "replace").splitlines():
+        items = sample.split(" ")
+        try:
+            data.append({"type": items[0], "time": items[1], "value": items[2]})
+        except IndexError:
+            pass
+
+
+def benchmark_e4(sizes: list) -> None:
+    """
+    Replays synthetic E4 data over a local socket as fast as it can be sent and times
+    the original recv(1024) parser against E4StreamParser.
+
+    :param sizes: a list of sample counts
+    :return: nothing
+    """
+    import socket
+    import threading
+    from model.e4_parser import E4StreamParser
+
+    def replay(server: socket.socket, payload: bytes) -> None:
+        connection, _ = server.accept()
+        with connection:
+            connection.sendall(payload)
+        server.close()
+
+    def connect(payload: bytes) -> socket.socket:
+        server = socket.create_server(("127.0.0.1", 0))
+        threading.Thread(target=replay, args=(server, payload), daemon=True).start()
+        return socket.create_connection(server.getsockname())
+
+    print(f'{"samples":>10} {"parser":>8} {"time (s)":>9} {"samples/s":>11} {"x realtime":>11} {"lost":>7}')
+    for size in sizes:
+        payload = write_synthetic_e4_stream(size)
+        with connect(payload) as connection:
+            data = []
+            start = time.perf_counter()
+            raw_data = connection.recv(1024)
+            while raw_data:
+                legacy_store_samples(raw_data, data)
+                raw_data = connection.recv(1024)
+            legacy = time.perf_counter() - start
+        # A line split across reads is lost or becomes two corrupt samples
+        expected = collections.Counter(tuple(line.split(" ")[:3]) for line in payload.decode("utf-8").splitlines())
+        received = collections.Counter((sample["type"], sample["time"], sample["value"]) for sample in data)
+        lost = size - sum((expected & received).values())
+        print(f'{size:>10} {"legacy":>8} {legacy:>9.3f} {size / legacy:>11.0f} '
+              f'{size / legacy / E4_SAMPLE_RATE:>11.0f} {lost:>7}')
+        for buffer_size in (4096, E4StreamParser.BUFFER_SIZE):
+            with connect(payload) as connection:
+                parser, data = E4StreamParser(buffer_size), []
+                start = time.perf_counter()
+                while parser.read_from(connection, data):
+                    pass
+                framed = time.perf_counter() - start
+            label = f'{buffer_size // 1024}k'
+            print(f'{size:>10} {label:>8} {framed:>9.3f} {len(data) / framed:>11.0f} '
+                  f'{len(data) / framed / E4_SAMPLE_RATE:>11.0f} {size - len(data):>7}')
+
+
+def serve_e4(server, payload: bytes, streams: int, devices: int = 1, connections: int = 1) -> None:
+    """
+    A minimal E4 streaming server for benchmarks: answers the device list, connect, and
+    subscribe commands on each connection, then sends payload as fast as the client reads it.
+
+    :param server: a listening socket
+    :param payload: the raw samples to send once every stream is subscribed
+    :param streams: the number of subscriptions to wait for on each connection
+    :param devices: the number of devices to list
+    :param connections: the number of connections to accept before closing the server
+    :return: nothing
+    """
+    import threading
+
+    device_list = " | ".join(f'{device:06x} Empatica_E4' for device in range(devices))
+
+    def serve(connection) -> None:
+        with connection, connection.makefile("rb") as commands:
+            subscriptions = streams
+            while subscriptions:
+                command = commands.readline().decode("utf-8").split()
+                if not command:
+                    return
+                if command[0] == "device_list":
+                    connection.sendall(f'R device_list {devices} | {device_list}\r\n'.encode("utf-8"))
+                elif command[0] == "device_connect":
+                    connection.sendall(b"R device_connect OK\r\n")
+                elif command[0] == "device_subscribe":
+                    connection.sendall(f'R device_subscribe {command[1]} OK\r\n'.encode("utf-8"))
+                    subscriptions -= 1
+            connection.sendall(payload)
+
+    handlers = []
+    for _ in range(connections):
+        connection, _ = server.accept()
+        handlers.append(threading.Thread(target=serve, args=(connection,), daemon=True))
+        handlers[-1].start()
+    server.close()
+    for handler in handlers:
+        handler.join()
+
+
+def benchmark_e4_devices(sizes: list) -> None:
+    """
+    Records every E4 stream from 1, 4, and 8 simulated devices at once through
+    EDAGroupManager, each device sending as fast as it is read, and reports the total
+    and per-device rates.
+
+    :param sizes: a list of sample counts per device
+    :return: nothing
+    """
+    import socket
+    import threading
+    from model.eda_group_manager import EDAGroupManager
+    from model.eda_manager import EDAManager
+
+    streams = tuple(EDAManager.STREAM_SAMPLES)
+    print(f'{"samples":>10} {"devices":>8} {"time (s)":>9} {"samples/s":>11} {"per device":>11} {"x realtime":>11}')
+    for size in sizes:
+        payload = write_synthetic_e4_stream(size)
+        for devices in (1, 4, 8):
+            server = socket.create_server(("127.0.0.1", 0))
+            manager = EDAGroupManager(streams=streams, port=server.getsockname()[1])
+            threading.Thread(
+                target=serve_e4, args=(server, payload, len(streams), devices, devices + 1), daemon=True
+            ).start()
+            start = time.perf_counter()
+            manager.start_recording().result()
+            for device in manager.managers.values():
+                device.wait_until_closed()
+            elapsed = time.perf_counter() - start
+            manager.stop_recording()
+            stored = sum(len(store) for device in manager.managers.values() for store in device.stores.values())
+            assert stored == size * devices, f"stored {stored} of {size * devices} samples"
+            print(f'{size:>10} {devices:>8} {elapsed:>9.3f} {stored / elapsed:>11.0f} '
+                  f'{stored / elapsed / devices:>11.0f} {stored / elapsed / devices / E4_SAMPLE_RATE:>11.0f}')
+
+
+def benchmark_e4_streams(sizes: list) -> None:
+    """
+    Records every E4 stream through EDAManager from a local server which sends samples
+    as fast as they are read, and reports how many times faster than the E4 the
+    client stores them.
+
+    :param sizes: a list of sample counts
+    :return: nothing
+    """
+    import socket
+    import threading
+    from model.eda_manager import EDAManager
+
+    streams = tuple(EDAManager.STREAM_SAMPLES)
+    print(f'{"samples":>10} {"time (s)":>9} {"samples/s":>11} {"x realtime":>11} {"stored":>8} {"ignored":>8}')
+    for size in sizes:
+        payload = write_synthetic_e4_stream(size)
+        server = socket.create_server(("127.0.0.1", 0))
+        manager = EDAManager(streams=streams, port=server.getsockname()[1])
+        sender = threading.Thread(target=serve_e4, args=(server, payload, len(streams)), daemon=True)
+        sender.start()
+        start = time.perf_counter()
+        manager.start_recording().result()
+        manager.wait_until_closed()
+        elapsed = time.perf_counter() - start
+        manager.stop_recording()
+        stored = sum(len(store) for store in manager.stores.values())
+        print(f'{size:>10} {elapsed:>9.3f} {stored / elapsed:>11.0f} {stored / elapsed / E4_SAMPLE_RATE:>11.0f} '
+              f'{stored:>8} {manager.ignored_samples:>8}')
+
+
+def run_e4_simulator(speed: float, duration: float, fragment: int, results) -> None:
+    """
+    Runs an E4Simulator for a single streaming connection (in its own process, so it
+    doesn't share the GIL with the client being measured). Puts the port it listens
+    on into results, then the samples sent and scheduled once the connection is done.
+
+    :param speed: the multiple of the real sample rate to send at
+    :param duration: how many seconds to stream for
+    :param fragment: the largest fragment to send, in bytes
+    :param results: a multiprocessing queue
+    :return: nothing
+    """
+    import asyncio
+    from tools.e4_simulator import E4Simulator
+
+    async def run():
+        simulator = E4Simulator(speed=speed, fragment=fragment, duration=duration)
+        server = await simulator.serve("127.0.0.1", 0)
+        results.put(server.sockets[0].getsockname()[1])
+        while not simulator.scheduled:
+            await asyncio.sleep(0.1)
+        server.close()
+        results.put((sum(simulator.sent.values()), sum(simulator.scheduled.values())))
+
+    asyncio.run(run())
+
+
+def benchmark_e4_ingest(sizes: list) -> None:
+    """
+    Streams every E4 stream from the E4 simulator (cut into fragments of up to 512
+    bytes) into EDAManager for a few seconds at each rate multiplier, and reports the
+    highest rate the client kept up with: every sample sent was stored, and the
+    simulator was never held back by the client for more than 2% of the samples due.
+    Note the simulator itself tops out somewhere, in which case it falls behind too.
+
+    :param sizes: a list of multiples of the real sample rate
+    :return: nothing
+    """
+    import multiprocessing
+    from model.eda_manager import EDAManager
+
+    duration = 3.0
+    context = multiprocessing.get_context("spawn")
+    streams = tuple(EDAManager.STREAM_SAMPLES)
+    best = None
+    print(f'{"x realtime":>11} {"scheduled":>10} {"sent":>10} {"stored":>10} {"samples/s":>11} {"kept up":>8}')
+    for speed in sizes:
+        results = context.Queue()
+        simulator = context.Process(target=run_e4_simulator, args=(speed, duration, 512, results), daemon=True)
+        simulator.start()
+        manager = EDAManager(streams=streams, port=results.get())
+        start = time.perf_counter()
+        manager.start_recording().result()
+        manager.wait_until_closed()
+        elapsed = time.perf_counter() - start
+        manager.stop_recording()
+        sent, scheduled = results.get()
+        simulator.join()
+        stored = sum(len(store) for store in manager.stores.values())
+        kept_up = stored == sent and sent >= 0.98 * scheduled
+        if kept_up and (best is None or stored / elapsed > best):
+            best = stored / elapsed
+        print(f'{speed:>11} {scheduled:>10} {sent:>10} {stored:>10} {stored / elapsed:>11.0f} {str(kept_up):>8}')
+    if best is None:
+        print("EDAManager kept up with none of the rates")
+    else:
+        print(f"Highest sustained rate: {best:.0f} samples/s ({best / E4_SAMPLE_RATE:.0f}x a single E4)")
+
+
+def benchmark_eda_writer(sizes: list) -> None:
+    """
+    Feeds synthetic E4 samples through EDAManager in 4 KB reads, keeping everything in
+    memory and then streaming to disk through EDARecorder, and compares the peak traced
+    memory and the time to dump. The streaming peak stops growing once a sample type
+    passes EDAManager.RECENT_ROWS. Reads wait while the recorder's queue is full (a real
+    E4 is thousands of times slower than the writer), so no samples are dropped. The
+    recorder prints its per-batch write cost when recording stops.
+
+    :param sizes: a list of sample counts
+    :return: nothing
+    """
+    from model.e4_parser import E4StreamParser
+    from model.eda_manager import EDAManager
+
+    streams = tuple(EDAManager.STREAM_SAMPLES)
+    print(f'{"samples":>10} {"mode":>7} {"ingest (s)":>11} {"dump (s)":>9} {"peak (MB)":>10}')
+    for size in sizes:
+        payload = write_synthetic_e4_stream(size)
+        for mode in ("memory", "disk"):
+            with tempfile.TemporaryDirectory() as directory:
+                path = str(pathlib.Path(directory).joinpath("benchmark_eda_1.csv"))
+                manager = EDAManager(streams=streams, stream_to_disk=mode == "disk")
+                parser = E4StreamParser()
+                samples = []
+                tracemalloc.start()
+                start = time.perf_counter()
+                manager.open_recorder(path)
+                for offset in range(0, len(payload), 4096):
+                    chunk = payload[offset:offset + 4096]
+                    parser.get_buffer()[:len(chunk)] = chunk
+                    parser.buffer_updated(len(chunk), samples)
+                    manager._store_samples(samples)
+                    while manager.recorder and manager.recorder.batches.full():
+                        time.sleep(0.001)
+                manager.stop_recording()
+                elapsed = time.perf_counter() - start
+                start = time.perf_counter()
+                manager.dump_recording(path)
+                dumped = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f'{size:>10} {mode:>7} {elapsed:>11.3f} {dumped:>9.3f} {peak / 2 ** 20:>10.1f}')
+
+
+def benchmark_eda_format(sizes: list) -> None:
+    """
+    Writes a synthetic E4_Bvp recording (64 samples per second, so a million samples is
+    over four hours) as a CSV and as an EDA binary file, and compares their sizes, the
+    time to load the CSV with pandas, and the time to open the binary file and read every
+    value or just the last minute.
+
+    :param sizes: a list of sample counts
+    :return: nothing
+    """
+    import numpy
+    import pandas
+    from model.eda_file import EDABinaryFile, EDABinaryWriter
+
+    print(f'{"samples":>10} {"csv (MB)":>9} {"e4b (MB)":>9} {"read_csv (s)":>13} '
+          f'{"memmap all (s)":>15} {"last minute (ms)":>17}')
+    for size in sizes:
+        rng = numpy.random.default_rng(0)
+        times = 1617900000.0 + numpy.arange(size) / 64
+        values = rng.normal(0, 50, size)
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = pathlib.Path(directory).joinpath("benchmark_eda_1_bvp.csv")
+            binary_path = pathlib.Path(directory).joinpath("benchmark_eda_1_bvp.e4b")
+            with csv_path.open("w", newline="") as dump:
+                writer = csv.writer(dump)
+                writer.writerow(("time", "value"))
+                writer.writerows(zip(times.tolist(), values.tolist()))
+            writer = EDABinaryWriter(str(binary_path), ("time", "value"))
+            writer.append(times, values)
+            writer.close()
+
+            start = time.perf_counter()
+            frame = pandas.read_csv(csv_path)
+            frame["value"].sum()
+            csv_load = time.perf_counter() - start
+            start = time.perf_counter()
+            binary = EDABinaryFile(str(binary_path))
+            binary.column("value").sum()
+            binary_load = time.perf_counter() - start
+            start = time.perf_counter()
+            EDABinaryFile(str(binary_path)).window(times[-1] - 60)
+            window = time.perf_counter() - start
+            del binary
+            print(f'{size:>10} {csv_path.stat().st_size / 2 ** 20:>9.1f} {binary_path.stat().st_size / 2 ** 20:>9.1f} '
+                  f'{csv_load:>13.3f} {binary_load:>15.4f} {window * 1000:>17.3f}')
+
+
+def benchmark_plot(sizes: list) -> None:
+    """
+    Draws a scrolling 10 second line (advancing half a second a frame) with the original
+    approach (clear the axes, plot a new line, reset the labels, and redraw the figure)
+    and with PlotRenderer, on an off-screen Agg canvas (so the final copy to the Tk window
+    is not included). Reports the frames per second each could sustain, the share of the
+    UI thread each takes at the original 500 ms interval, and the interval PlotRenderer
+    settles on.
+
+    :param sizes: a list of points per frame
+    :return: nothing
+    """
+    import numpy
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from view.plot_renderer import PlotRenderer
+
+    frames = 60
+    print(f'{"points":>8} {"mode":>9} {"fps":>8} {"cpu @500ms":>11} {"interval (ms)":>14} {"full draws":>11}')
+    for size in sizes:
+        rng = numpy.random.default_rng(0)
+        for mode in ("redraw", "blit"):
+            figure = Figure(figsize=(6, 4), dpi=100)
+            canvas = FigureCanvasAgg(figure)
+            axes = figure.add_subplot(111)
+            renderer = PlotRenderer(axes, canvas) if mode == "blit" else None
+            canvas.draw()
+            cpu = 0.0
+            start = time.perf_counter()
+            for frame in range(frames):
+                x = numpy.linspace(frame / 2, frame / 2 + 10, size)
+                y = numpy.sin(x) + rng.normal(0, 0.1, size)
+                cpu_start = time.thread_time()
+                if renderer:
+                    renderer.render(x, y)
+                else:
+                    axes.clear()
+                    axes.plot(x, y)
+                    figure.suptitle("Plot")
+                    axes.set_xlabel("Time")
+                    axes.set_ylabel("Value")
+                    canvas.draw()
+                cpu += time.thread_time() - cpu_start
+            elapsed = time.perf_counter() - start
+            interval = renderer.next_interval() if renderer else 500
+            full_draws = renderer.full_draws if renderer else frames
+            print(f'{size:>8} {mode:>9} {frames / elapsed:>8.1f} {cpu / frames / 0.5:>11.1%} '
+                  f'{interval:>14} {full_draws:>11}')
+
+
+def benchmark_downsample(sizes: list) -> None:
+    """
+    Reduces a growing synthetic E4_Bvp recording (64 samples per second) to 2000 points
+    with MinMaxDownsampler, the first time and after each second of new samples (when
+    only the newest bucket is recomputed), then compares drawing the whole recording
+    with PlotRenderer with and without downsampling.
+
+    :param sizes: a list of sample counts
+    :return: nothing
+    """
+    import numpy
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from model.downsampler import MinMaxDownsampler
+    from view.plot_renderer import PlotRenderer
+
+    print(f'{"samples":>10} {"first (ms)":>11} {"update (ms)":>12} {"raw frame (ms)":>15} {"reduced frame (ms)":>19}')
+    for size in sizes:
+        rng = numpy.random.default_rng(0)
+        times = numpy.arange(size) / 64
+        values = rng.normal(0, 50, size)
+        downsampler = MinMaxDownsampler(2000)
+        start = time.perf_counter()
+        downsampler.downsample(times[:size - 640], values[:size - 640])
+        first = time.perf_counter() - start
+        updates = []
+        for end in range(size - 576, size + 1, 64):
+            start = time.perf_counter()
+            reduced = downsampler.downsample(times[:end], values[:end])
+            updates.append(time.perf_counter() - start)
+        frames = []
+        for x, y in ((times, values), reduced):
+            figure = Figure(figsize=(6, 4), dpi=100)
+            renderer = PlotRenderer(figure.add_subplot(111), FigureCanvasAgg(figure))
+            renderer.render(x, y)
+            start = time.perf_counter()
+            for _ in range(5):
+                renderer.render(x, y)
+            frames.append((time.perf_counter() - start) / 5)
+        print(f'{size:>10} {first * 1000:>11.2f} {sum(updates) / len(updates) * 1000:>12.3f} '
+              f'{frames[0] * 1000:>15.1f} {frames[1] * 1000:>19.1f}')
+
+
+def benchmark_eda_store(sizes: list) -> None:
+    """
+    Times one EDA plot refresh (fetching the samples to draw) with the original list of
+    string dicts turned into a DataFrame, and with a SampleStore window. Also reports
+    the memory each holds.
+
+    :param sizes: a list of sample counts (4 per second of recording)
+    :return: nothing
+    """
+    import pandas
+    from model.sample_store import SampleStore
+
+    print(f'{"samples":>10} {"dataframe (ms)":>15} {"window (us)":>12} {"dicts (MB)":>11} {"store (MB)":>11}')
+    for size in sizes:
+        times = [1617900000.0 + i / 4 for i in range(size)]
+        values = [random.uniform(0, 50) for _ in range(size)]
+        tracemalloc.start()
+        legacy = [{"type": "E4_Gsr", "time": str(t), "value": str(v)} for t, v in zip(times, values)]
+        legacy_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        store = SampleStore(("time", "value"))
+        store.extend(times, values)
+        store_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        frame = pandas.DataFrame(legacy)
+        frame.get("time").astype("float"), frame.get("value").astype("float")
+        dataframe = time.perf_counter() - start
+        start = time.perf_counter()
+        store.window(times[-1] - 60)
+        window = time.perf_counter() - start
+        print(f'{size:>10} {dataframe * 1e3:>15.1f} {window * 1e6:>12.1f} '
+              f'{legacy_memory / 2 ** 20:>11.1f} {store_memory / 2 ** 20:>11.1f}')
+
+
+BENCHMARKS = {
+    "join": benchmark_join,
+    "stream": benchmark_stream,
+    "plan": benchmark_plan,
+    "table": benchmark_table,
+    "waveform": benchmark_waveform,
+    "resample": benchmark_resample,
+    "e4": benchmark_e4,
+    "eda_store": benchmark_eda_store,
+    "e4_streams": benchmark_e4_streams,
+    "e4_devices": benchmark_e4_devices,
+    "e4_ingest": benchmark_e4_ingest,
+    "eda_writer": benchmark_eda_writer,
+    "eda_format": benchmark_eda_format,
+    "plot": benchmark_plot,
+    "downsample": benchmark_downsample
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the EDAAudioSync performance benchmarks.")
+    parser.add_argument("benchmark", choices=BENCHMARKS.keys())
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="the workload sizes to run")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args.sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,49 @@
+import argparse
 import csv
+import hashlib
+import heapq
+import itertools
 import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 import tkinter as tk
 from contextlib import ExitStack
 from tkinter import filedialog
 import pathlib
 
+from model.survey_table import SurveyTable
+from tools.file_patterns import expand_patterns
+
 SEGMENTS = ("before", "during", "after")
 FIRST_NAME = "RecipientFirstName"
 LAST_NAME = "RecipientLastName"
 
+# How to resolve a name that appears more than once in a segment
+DUPLICATE_LAST = "last"
+DUPLICATE_FIRST = "first"
+DUPLICATE_ERROR = "error"
+DUPLICATE_POLICIES = (DUPLICATE_LAST, DUPLICATE_FIRST, DUPLICATE_ERROR)
+
+# How to resolve a student who is absent from one or more segments
+MISSING_KEEP = "keep"
+MISSING_DROP = "drop"
+MISSING_ERROR = "error"
+MISSING_POLICIES = (MISSING_KEEP, MISSING_DROP, MISSING_ERROR)
+
+# Compiled column plans keyed by a hash of the segment and its metadata rows. The cache only lives as long as
+# the process (e.g. across the cohorts of a batch run): compiling a plan costs about as much as reading it back
+# from disk, so it is not persisted between runs.
+COLUMN_PLANS = {}
+
+# Aggregation engines
+BACKEND_PYTHON = "python"
+BACKEND_PANDAS = "pandas"
+BACKENDS = (BACKEND_PYTHON, BACKEND_PANDAS)
+
+# The most responses per segment held in memory by the streaming aggregator before spilling to disk
+DEFAULT_RUN_SIZE = 50000
+
 EMOTIONS_TO_PROMPTS = {
     "before": ["enjoyment", "enjoyment", "enjoyment", "enjoyment", "enjoyment", "hope", "hope", "hope", "hope", "hope",
                "hope", "pride", "anger", "anger", "anxiety", "anxiety", "anxiety", "anxiety", "anxiety", "shame",
@@ -47,34 +82,153 @@ def load_surveys(file_paths: list) -> dict:
     with ExitStack() as stack:
         files = [stack.enter_context(open(path)) for path in file_paths]
         for file in files:
-            survey = list(csv.DictReader(file))
-            surveys[get_survey_segment(file.name)] = {
+            metadata1, metadata2, reader = open_survey(file)
+            survey = list(reader)
+            segment = get_survey_segment(file.name)
+            surveys[segment] = {
                 "survey": survey,
-                "metadata1": survey.pop(0),
-                "metadata2": survey.pop(0)
+                "metadata1": metadata1,
+                "metadata2": metadata2,
+                "index": index_participants(survey),
+                "plan": get_column_plan(segment, metadata1, metadata2)
             }
     return surveys
 
 
-def get_student_responses(surveys: dict, index: int) -> dict:
+def open_survey(file) -> tuple:
+    """
+    Reads the two Qualtrics metadata rows from an open survey file and leaves the responses unread.
+
+    :param file: an open survey CSV file
+    :return: the first metadata row, the second metadata row, and a lazy reader over the responses as a tuple
+    """
+    reader = csv.DictReader(file)
+    return next(reader), next(reader), reader
+
+
+def participant_key(participant: dict) -> tuple:
+    """
+    Generates the key used to match a participant across survey segments.
+
+    :param participant: a single survey response
+    :return: the participant's name as a (first name, last name) tuple
+    """
+    return participant[FIRST_NAME], participant[LAST_NAME]
+
+
+def index_participants(survey: list) -> dict:
+    """
+    Builds a name index for a survey, so participants can be looked up without scanning every row.
+
+    :param survey: a list of survey responses
+    :return: a mapping of participant keys to the responses with that name (in file order)
+    """
+    index = {}
+    for participant in survey:
+        index.setdefault(participant_key(participant), []).append(participant)
+    return index
+
+
+def find_participant(surveys: dict, segment: str, key: tuple, on_duplicate: str = DUPLICATE_LAST):
+    """
+    Looks up a participant's response in a single segment using the segment's name index.
+
+    :param surveys: a dictionary of surveys as generated by load_surveys
+    :param segment: the segment to search (before, during, after)
+    :param key: the participant key as generated by participant_key
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
+    :return: the matching response or None if the participant did not complete the segment
+    """
+    return select_response(surveys[segment]["index"].get(key), segment, key, on_duplicate)
+
+
+def select_response(matches: list, segment: str, key: tuple, on_duplicate: str = DUPLICATE_LAST):
+    """
+    Picks a single response from all of the responses that share a participant's name.
+
+    :param matches: the responses with the participant's name (in file order)
+    :param segment: the segment the responses came from (before, during, after)
+    :param key: the participant key as generated by participant_key
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
+    :return: the selected response or None if there are no matches
+    """
+    if not matches:
+        return None
+    if len(matches) > 1 and on_duplicate == DUPLICATE_ERROR:
+        raise ValueError(f"Found {len(matches)} responses for {key[0]} {key[1]} in the {segment} survey")
+    return matches[0] if on_duplicate == DUPLICATE_FIRST else matches[-1]
+
+
+def join_participant(surveys: dict, key: tuple, on_duplicate: str = DUPLICATE_LAST) -> tuple:
+    """
+    Joins a single participant's responses across every segment.
+
+    :param surveys: a dictionary of surveys as generated by load_surveys
+    :param key: the participant key as generated by participant_key
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
+    :return: the student responses and a list of segments the participant is missing from as a tuple
+    """
+    student_responses = {
+        FIRST_NAME: key[0],
+        LAST_NAME: key[1]
+    }
+    missing = []
+    for segment in SEGMENTS:
+        participant = find_participant(surveys, segment, key, on_duplicate)
+        if participant:
+            apply_column_plan(student_responses, participant, surveys[segment]["plan"])
+        else:
+            missing.append(segment)
+    return student_responses, missing
+
+
+def get_student_responses(surveys: dict, index: int, on_duplicate: str = DUPLICATE_LAST) -> dict:
     """
     Returns a list of student responses which are aggregated from three different surveys.
 
     :param surveys: a dictionary of surveys (preferably 3)
     :param index: the current row of the before survey
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
     :return: all student responses a single dictionary
     """
-    student_responses = {
-        FIRST_NAME: surveys[SEGMENTS[0]]["survey"][index][FIRST_NAME],
-        LAST_NAME: surveys[SEGMENTS[0]]["survey"][index][LAST_NAME]
-    }
-    for segment in SEGMENTS:
-        metadata = surveys[segment]["metadata1"]
-        for participant in surveys[segment]["survey"]:
-            if participant[FIRST_NAME] == student_responses[FIRST_NAME] \
-                    and participant[LAST_NAME] == student_responses[LAST_NAME]:
-                load_questions(student_responses, participant, segment, metadata)
-    return student_responses
+    key = participant_key(surveys[SEGMENTS[0]]["survey"][index])
+    return join_participant(surveys, key, on_duplicate)[0]
+
+
+def keep_student(key: tuple, missing: list, on_missing: str = MISSING_KEEP) -> bool:
+    """
+    Applies the missing segment policy to a joined student.
+
+    :param key: the participant key as generated by participant_key
+    :param missing: the segments the participant is missing from
+    :param on_missing: the missing segment policy (one of MISSING_POLICIES)
+    :return: True if the student belongs in the aggregate survey
+    """
+    if missing and on_missing == MISSING_ERROR:
+        raise ValueError(f"{key[0]} {key[1]} is missing from the {', '.join(missing)} survey(s)")
+    return not missing or on_missing == MISSING_KEEP
+
+
+def aggregate_surveys(surveys: dict, on_duplicate: str = DUPLICATE_LAST, on_missing: str = MISSING_KEEP) -> SurveyTable:
+    """
+    Aggregates every student in the before survey in a single pass over the name indices.
+    Students are joined one at a time straight into a compact table. The header is computed
+    up front, so students who are missing from a segment just leave its columns empty.
+
+    :param surveys: a dictionary of surveys as generated by load_surveys
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
+    :param on_missing: the missing segment policy (one of MISSING_POLICIES)
+    :return: the aggregate survey as a table of student responses
+    """
+    def generate():
+        for participant in surveys[SEGMENTS[0]]["survey"]:
+            key = participant_key(participant)
+            student_responses, missing = join_participant(surveys, key, on_duplicate)
+            if keep_student(key, missing, on_missing):
+                yield student_responses
+
+    headers = {segment: surveys[segment]["metadata1"].keys() for segment in SEGMENTS}
+    return SurveyTable.from_rows(generate(), aggregate_fieldnames(headers))
 
 
 def load_questions(responses: dict, participant: dict, segment: str, metadata: dict) -> None:
@@ -87,15 +241,205 @@ def load_questions(responses: dict, participant: dict, segment: str, metadata: d
     :param metadata: the metadata for this segment
     :return: nothing
     """
+    apply_column_plan(responses, participant, get_column_plan(segment, metadata))
+
+
+def compile_column_plan(segment: str, metadata: dict) -> dict:
+    """
+    Compiles the work of load_questions that only depends on the segment: the source
+    column of each question, its output keys, its description, and its subscale.
+
+    :param segment: the current segment (before, during, after)
+    :param metadata: the first metadata row for this segment
+    :return: a column plan with a template of constant columns and a list of (output key, source column) pairs
+    """
+    template = {}
+    questions = []
     for i in range(len(EMOTIONS_TO_PROMPTS[segment])):
         question_base = f'Q1_{i + 1}'
-        if question_base in participant:
+        if question_base in metadata:
             question = f'{question_base}_{segment}_question'
-            responses[question] = participant[question_base]
-            description = f'{question_base}_{segment}_description'
-            responses[description] = metadata[question_base].split("-")[-1].strip()
-            sub_scale = f'{question_base}_{segment}_subscale'
-            responses[sub_scale] = EMOTIONS_TO_PROMPTS[segment][i]
+            template[question] = None
+            template[f'{question_base}_{segment}_description'] = metadata[question_base].split("-")[-1].strip()
+            template[f'{question_base}_{segment}_subscale'] = EMOTIONS_TO_PROMPTS[segment][i]
+            questions.append((question, question_base))
+    return {
+        "template": template,
+        "questions": questions
+    }
+
+
+def metadata_digest(segment: str, metadata1: dict, metadata2: dict = None) -> str:
+    """
+    Hashes the metadata rows of a segment, which identifies the version of the survey.
+
+    :param segment: the current segment (before, during, after)
+    :param metadata1: the first metadata row for this segment
+    :param metadata2: the second metadata row for this segment
+    :return: the digest as a hex string
+    """
+    return hashlib.sha1(repr((segment, metadata1, metadata2)).encode("utf-8")).hexdigest()
+
+
+def get_column_plan(segment: str, metadata1: dict, metadata2: dict = None) -> dict:
+    """
+    Returns the column plan for a segment, compiling it only if this version of the survey
+    (identified by a hash of its metadata rows) has not been seen before in this process.
+    Both backends pass both metadata rows, so they share entries.
+
+    :param segment: the current segment (before, during, after)
+    :param metadata1: the first metadata row for this segment
+    :param metadata2: the second metadata row for this segment
+    :return: a column plan as generated by compile_column_plan
+    """
+    digest = metadata_digest(segment, metadata1, metadata2)
+    if digest not in COLUMN_PLANS:
+        COLUMN_PLANS[digest] = compile_column_plan(segment, metadata1)
+    return COLUMN_PLANS[digest]
+
+
+def apply_column_plan(responses: dict, participant: dict, plan: dict) -> None:
+    """
+    Loads a participant's questions into the survey using a compiled column plan.
+
+    :param responses: the final list of responses
+    :param participant: the current participant
+    :param plan: a column plan as generated by compile_column_plan
+    :return: nothing
+    """
+    responses.update(plan["template"])
+    for question, question_base in plan["questions"]:
+        responses[question] = participant[question_base]
+
+
+def survey_columns(segment: str, fieldnames: list) -> list:
+    """
+    Lists the question columns of a segment that are present in a survey.
+
+    :param segment: the segment of the survey (before, during, after)
+    :param fieldnames: the header of the survey
+    :return: the question columns in question order (i.e. ['Q1_1', 'Q1_2', ...])
+    """
+    return [
+        f'Q1_{i + 1}' for i in range(len(EMOTIONS_TO_PROMPTS[segment]))
+        if f'Q1_{i + 1}' in fieldnames
+    ]
+
+
+def aggregate_fieldnames(headers: dict) -> list:
+    """
+    Computes the header of the aggregate survey without reading any responses.
+
+    :param headers: a mapping of segments to survey headers
+    :return: the aggregate survey header
+    """
+    fieldnames = [FIRST_NAME, LAST_NAME]
+    for segment in SEGMENTS:
+        for question_base in survey_columns(segment, headers[segment]):
+            fieldnames.extend([
+                f'{question_base}_{segment}_question',
+                f'{question_base}_{segment}_description',
+                f'{question_base}_{segment}_subscale'
+            ])
+    return fieldnames
+
+
+def sort_responses(responses, fieldnames: list, run_size: int, stack: ExitStack):
+    """
+    Sorts survey responses by participant key. Responses are sorted in runs of at most
+    run_size rows; if there is more than one run, each run is spilled to a temporary
+    file and the runs are lazily merged. The sort is stable, so responses that share a
+    name stay in file order.
+
+    :param responses: an iterable of survey responses
+    :param fieldnames: the columns to keep from each response
+    :param run_size: the most responses to hold in memory at once
+    :param stack: the exit stack which owns the temporary files
+    :return: an iterator over the sorted responses
+    """
+    projected = ({name: response[name] for name in fieldnames} for response in responses)
+    runs = []
+    run = list(itertools.islice(projected, run_size))
+    while run:
+        run.sort(key=participant_key)
+        next_run = list(itertools.islice(projected, run_size))
+        if not runs and not next_run:
+            return iter(run)
+        spill = stack.enter_context(tempfile.TemporaryFile(mode="w+", newline=""))
+        csv.DictWriter(spill, fieldnames).writerows(run)
+        spill.seek(0)
+        runs.append(csv.DictReader(spill, fieldnames))
+        run = next_run
+    return heapq.merge(*runs, key=participant_key)
+
+
+def stream_student_responses(file_paths: list, stack: ExitStack, run_size: int = DEFAULT_RUN_SIZE,
+                             on_duplicate: str = DUPLICATE_LAST, on_missing: str = MISSING_KEEP) -> tuple:
+    """
+    Joins the surveys with a sort-merge on participant name. Each survey is sorted on its
+    own, then the sorted surveys are merged into a single stream and grouped by name, so
+    only one participant's responses are in memory during the join. Students come out in
+    name order rather than in the order of the before survey.
+
+    :param file_paths: a list of CSV file paths
+    :param stack: the exit stack which owns the open files
+    :param run_size: the most responses per survey to hold in memory at once
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
+    :param on_missing: the missing segment policy (one of MISSING_POLICIES)
+    :return: the aggregate survey header and a generator of student responses as a tuple
+    """
+    headers, plans, streams = {}, {}, []
+    for path in file_paths:
+        file = stack.enter_context(open(path))
+        segment = get_survey_segment(file.name)
+        metadata1, metadata2, reader = open_survey(file)
+        headers[segment] = reader.fieldnames
+        plans[segment] = get_column_plan(segment, metadata1, metadata2)
+        fieldnames = [FIRST_NAME, LAST_NAME] + survey_columns(segment, reader.fieldnames)
+        responses = sort_responses(reader, fieldnames, run_size, stack)
+        streams.append(zip(itertools.repeat(segment), responses))
+    merged = heapq.merge(*streams, key=lambda item: participant_key(item[1]))
+
+    def generate():
+        for key, group in itertools.groupby(merged, key=lambda item: participant_key(item[1])):
+            matches = {}
+            for segment, response in group:
+                matches.setdefault(segment, []).append(response)
+            for _ in matches.get(SEGMENTS[0], []):
+                student_responses = {
+                    FIRST_NAME: key[0],
+                    LAST_NAME: key[1]
+                }
+                missing = []
+                for segment in SEGMENTS:
+                    participant = select_response(matches.get(segment), segment, key, on_duplicate)
+                    if participant:
+                        apply_column_plan(student_responses, participant, plans[segment])
+                    else:
+                        missing.append(segment)
+                if keep_student(key, missing, on_missing):
+                    yield student_responses
+
+    return aggregate_fieldnames(headers), generate()
+
+
+def stream_csv(fieldnames: list, student_responses, file_path: pathlib.Path) -> int:
+    """
+    Writes student responses to the aggregate survey as soon as they are produced.
+
+    :param fieldnames: the aggregate survey header
+    :param student_responses: an iterable of student responses
+    :param file_path: the path to dump the aggregate survey
+    :return: the number of students written
+    """
+    count = 0
+    with file_path.joinpath("aggregate_survey.csv").open(mode="w", newline="") as dump:
+        writer = csv.DictWriter(dump, fieldnames)
+        writer.writeheader()
+        for student_response in student_responses:
+            writer.writerow(student_response)
+            count += 1
+    return count
 
 
 def dump_csv(master_survey: list, file_path: pathlib.Path):
@@ -107,22 +451,243 @@ def dump_csv(master_survey: list, file_path: pathlib.Path):
     :return: nothing
     """
     with file_path.joinpath("aggregate_survey.csv").open(mode="w", newline="") as dump:
-        writer = csv.DictWriter(dump, master_survey[0].keys())
+        if isinstance(master_survey, SurveyTable):
+            writer = csv.writer(dump)
+            writer.writerow(master_survey.fieldnames)
+            writer.writerows(master_survey.iter_rows())
+        else:
+            # Students can be missing from a segment, so the header is every column seen (in order)
+            fieldnames = list(dict.fromkeys(key for student_responses in master_survey for key in student_responses))
+            writer = csv.DictWriter(dump, fieldnames)
+            writer.writeheader()
+            writer.writerows(master_survey)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line interface for the data aggregator.
+
+    :return: the argument parser
+    """
+    parser = argparse.ArgumentParser(description="Aggregates the before, during, and after AEQ surveys.")
+    parser.add_argument(
+        "cohorts",
+        nargs="*",
+        help="directories or glob patterns of cohort surveys to aggregate without the GUI (one cohort per directory)"
+    )
+    parser.add_argument(
+        "--combined",
+        type=pathlib.Path,
+        help="also write every cohort to this CSV with a leading Cohort column (batch mode only)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="the number of cohorts to aggregate at once (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--duplicates",
+        choices=DUPLICATE_POLICIES,
+        default=DUPLICATE_LAST,
+        help="how to handle a name that appears more than once in a survey (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--missing",
+        choices=MISSING_POLICIES,
+        default=MISSING_KEEP,
+        help="how to handle a student who is absent from a survey (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="join the surveys in constant memory with a sort-merge (students are written in name order)"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=BACKEND_PYTHON,
+        help="the aggregation engine to use (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--scores",
+        action="store_true",
+        help="append a mean and median column for every subscale and segment (pandas backend only)"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-join students with new or changed responses since the last run (python backend only)"
+    )
+    parser.add_argument(
+        "--run-size",
+        type=int,
+        default=DEFAULT_RUN_SIZE,
+        help="the most responses per survey held in memory while streaming (default: %(default)s)"
+    )
+    return parser
+
+
+def aggregate(file_paths: list, output_path: pathlib.Path, args: argparse.Namespace) -> int:
+    """
+    Aggregates a set of surveys into output_path/aggregate_survey.csv using the engine
+    selected on the command line.
+
+    :param file_paths: a list of CSV file paths
+    :param output_path: the directory to dump the aggregate survey
+    :param args: the parsed command line arguments
+    :return: the number of students in the aggregate survey
+    """
+    if args.backend == BACKEND_PANDAS:
+        from tools import frame_aggregator
+        frames = frame_aggregator.load_frames(file_paths)
+        master_frame = frame_aggregator.aggregate_frames(frames, args.duplicates, args.missing, args.scores)
+        frame_aggregator.dump_frame(master_frame, output_path)
+        return len(master_frame)
+    elif args.incremental:
+        from tools import incremental_aggregator
+        return incremental_aggregator.aggregate_incremental(file_paths, output_path, args.duplicates, args.missing)
+    elif args.stream:
+        with ExitStack() as stack:
+            fieldnames, student_responses = stream_student_responses(
+                file_paths, stack, args.run_size, args.duplicates, args.missing
+            )
+            return stream_csv(fieldnames, student_responses, output_path)
+    else:
+        surveys = load_surveys(file_paths)
+        master_survey = aggregate_surveys(surveys, args.duplicates, args.missing)
+        dump_csv(master_survey, output_path)
+        return len(master_survey)
+
+
+def find_cohorts(patterns: list) -> dict:
+    """
+    Finds every cohort under a set of directories or glob patterns. A cohort is a directory
+    which holds exactly one before, one during, and one after survey.
+
+    :param patterns: a list of directories, files, or glob patterns
+    :return: a mapping of cohort directories to their survey paths (in segment order)
+    """
+    segments = {}
+    for path in sorted(expand_patterns(patterns)):
+        segment = get_survey_segment(path)
+        if path.lower().endswith(".csv") and segment:
+            directory = pathlib.Path(path).parent.absolute()
+            segments.setdefault(directory, {}).setdefault(segment, []).append(path)
+
+    cohorts = {}
+    for directory, paths in sorted(segments.items()):
+        if all(len(paths.get(segment, [])) == 1 for segment in SEGMENTS):
+            cohorts[directory] = [paths[segment][0] for segment in SEGMENTS]
+        else:
+            print(f"Skipping {directory}: expected one before, during, and after survey but found "
+                  f"{', '.join(f'{len(paths.get(segment, []))} {segment}' for segment in SEGMENTS)}")
+    return cohorts
+
+
+def aggregate_cohort(directory: pathlib.Path, file_paths: list, args: argparse.Namespace) -> tuple:
+    """
+    Aggregates a single cohort into its own directory. Runs in a worker process.
+
+    :param directory: the cohort directory
+    :param file_paths: the before, during, and after survey paths
+    :param args: the parsed command line arguments
+    :return: the number of students and the elapsed seconds as a tuple
+    """
+    start = time.perf_counter()
+    students = aggregate(file_paths, directory, args)
+    return students, time.perf_counter() - start
+
+
+def combine_cohorts(cohorts: list, combined_path: pathlib.Path) -> None:
+    """
+    Concatenates the aggregate surveys of several cohorts into a single CSV. Columns
+    missing from a cohort are left empty.
+
+    :param cohorts: a list of (label, cohort directory) tuples
+    :param combined_path: the path of the combined CSV
+    :return: nothing
+    """
+    fieldnames = ["Cohort"]
+    for _, directory in cohorts:
+        with directory.joinpath("aggregate_survey.csv").open(newline="") as survey:
+            header = next(csv.reader(survey), [])
+        fieldnames.extend(name for name in header if name not in fieldnames)
+    with combined_path.open(mode="w", newline="") as dump:
+        writer = csv.DictWriter(dump, fieldnames)
         writer.writeheader()
-        writer.writerows(master_survey)
+        for label, directory in cohorts:
+            with directory.joinpath("aggregate_survey.csv").open(newline="") as survey:
+                for student_responses in csv.DictReader(survey):
+                    writer.writerow({"Cohort": label, **student_responses})
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    Aggregates every cohort found on the command line in a process pool, then prints
+    a timing summary.
+
+    :param args: the parsed command line arguments
+    :return: the number of cohorts which failed
+    """
+    cohorts = find_cohorts(args.cohorts)
+    if not cohorts:
+        print("No cohorts found")
+        return 0
+    root = pathlib.Path(os.path.commonpath(list(cohorts))) if len(cohorts) > 1 else next(iter(cohorts)).parent
+    results = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(cohorts)))) as pool:
+        futures = {
+            directory: pool.submit(aggregate_cohort, directory, file_paths, args)
+            for directory, file_paths in cohorts.items()
+        }
+        for directory, future in futures.items():
+            try:
+                results[directory] = future.result()
+            except Exception as e:
+                results[directory] = e
+    elapsed = time.perf_counter() - start
+
+    print(f'{"cohort":<40} {"students":>9} {"time (s)":>9}')
+    for directory, result in results.items():
+        label = str(directory.relative_to(root))
+        if isinstance(result, Exception):
+            print(f'{label:<40} {"failed":>9} {"":>9}  {result}')
+        else:
+            print(f'{label:<40} {result[0]:>9} {result[1]:>9.3f}')
+    failures = sum(isinstance(result, Exception) for result in results.values())
+    print(f'{len(results) - failures} of {len(results)} cohorts aggregated in {elapsed:.3f}s')
+
+    if args.combined:
+        combine_cohorts(
+            [(str(directory.relative_to(root)), directory)
+             for directory, result in results.items() if not isinstance(result, Exception)],
+            args.combined
+        )
+    return failures
 
 
 def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.backend == BACKEND_PANDAS and args.stream:
+        parser.error("--stream is only available with the python backend")
+    if args.incremental and (args.backend == BACKEND_PANDAS or args.stream):
+        parser.error("--incremental is only available with the python backend and without --stream")
+    if args.scores and args.backend != BACKEND_PANDAS:
+        parser.error("--scores is only available with the pandas backend")
+    if args.combined and not args.cohorts:
+        parser.error("--combined is only available in batch mode")
+    if args.cohorts:
+        raise SystemExit(1 if run_batch(args) else 0)
+
     root = tk.Tk()
     root.withdraw()
 
     file_paths = filedialog.askopenfilenames()
     if file_paths:
-        surveys = load_surveys(file_paths)
-        master_survey = []
-        for i in range(len(surveys[SEGMENTS[0]]["survey"])):
-            master_survey.append(get_student_responses(surveys, i))
-        dump_csv(master_survey, pathlib.Path(file_paths[0]).parent.absolute())
+        aggregate(file_paths, pathlib.Path(file_paths[0]).parent.absolute(), args)
 
 
 if __name__ == '__main__':
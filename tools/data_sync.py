@@ -1,21 +1,77 @@
+import argparse
+
 from controller.sync_controller import SyncController
 from model.audio_manager import AudioManager
+from model.eda_group_manager import EDAGroupManager
 from model.eda_manager import EDAManager
+from model.eda_recorder import RECORDERS
 from model.survey_manager import SurveyManager
 from view.main_view import MainView
 import tkinter
 
 
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line parser for the sync tool.
+
+    :return: the parser
+    """
+    parser = argparse.ArgumentParser(description="Records audio and EDA data during an interview.")
+    parser.add_argument(
+        "--frames-per-buffer",
+        type=int,
+        default=None,
+        help="the number of audio frames PortAudio hands over at a time (defaults to the profile's chunk size)"
+    )
+    parser.add_argument(
+        "--blocking",
+        action="store_true",
+        help="read the mic with blocking reads on a dedicated thread instead of the PortAudio callback"
+    )
+    parser.add_argument(
+        "--streams",
+        nargs="+",
+        choices=EDAManager.STREAM_SAMPLES.keys(),
+        default=[EDAManager.GALVANIC_SKIN_RESPONSE],
+        help="the E4 streams to record, each dumped to its own CSV (default: gsr)"
+    )
+    parser.add_argument(
+        "--devices",
+        nargs="+",
+        default=None,
+        help="record several E4 devices at once: their IDs, or 'all' for every device the server lists "
+             "(default: the first device only)"
+    )
+    parser.add_argument(
+        "--eda-format",
+        choices=RECORDERS.keys(),
+        default="csv",
+        help="save EDA samples as CSVs or as compact binary files readable with numpy.memmap (default: csv)"
+    )
+    parser.add_argument(
+        "--plot-points",
+        type=int,
+        default=SyncController.PLOT_POINTS,
+        help=f"the most points drawn per live plot (default: {SyncController.PLOT_POINTS})"
+    )
+    return parser
+
+
 def main():
+    args = build_parser().parse_args()
     root = tkinter.Tk()
     root.columnconfigure(0, weight=1)
     root.rowconfigure(0, weight=1)
 
-    audio_model = AudioManager()
+    audio_model = AudioManager(frames_per_buffer=args.frames_per_buffer, blocking=args.blocking)
     survey_model = SurveyManager()
-    eda_model = EDAManager()
+    if args.devices:
+        devices = EDAGroupManager.ALL_DEVICES if args.devices == [EDAGroupManager.ALL_DEVICES] else args.devices
+        eda_model = EDAGroupManager(devices, streams=args.streams, file_format=args.eda_format)
+    else:
+        eda_model = EDAManager(streams=args.streams, file_format=args.eda_format)
     view = MainView(root)
-    controller = SyncController(audio_model, survey_model, eda_model, view)
+    controller = SyncController(audio_model, survey_model, eda_model, view, args.plot_points)
     view.register_observer(controller)
 
     root.mainloop()
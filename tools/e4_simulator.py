@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import collections
+import csv
+import glob
+import itertools
+import math
+import os
+import random
+import time
+
+from model.eda_manager import EDAManager
+
+# Samples per second of each sample type on a real E4 (tags only come from button presses)
+SAMPLE_RATES = {
+    "E4_Acc": 32, "E4_Bvp": 64, "E4_Gsr": 4, "E4_Temperature": 4,
+    "E4_Ibi": 1, "E4_Hr": 1, "E4_Battery": 0.1, "E4_Tag": 0
+}
+
+# How often each connection wakes up to send the samples which have come due
+TICK_SECONDS = 0.01
+
+
+def synthesize(sample_type: str, rng: random.Random):
+    """
+    Generates plausible samples of one type forever at the E4's rate.
+
+    :param sample_type: the type of sample (e.g. E4_Gsr)
+    :param rng: the random number generator
+    :return: an iterator of (seconds since start, fields) tuples, the fields led by a space
+    """
+    rate = SAMPLE_RATES[sample_type]
+    if not rate:
+        return
+    level = {"E4_Gsr": 0.5, "E4_Temperature": 33.0, "E4_Ibi": 0.8, "E4_Hr": 75.0, "E4_Battery": 1.0}.get(sample_type)
+    for i in itertools.count():
+        offset = i / rate
+        if sample_type == "E4_Acc":
+            fields = f' {rng.randint(-64, 64)} {rng.randint(-64, 64)} {rng.randint(-64, 64)}'
+        elif sample_type == "E4_Bvp":
+            fields = f' {50 * math.sin(2 * math.pi * 1.2 * offset) + rng.gauss(0, 2):.6f}'
+        elif sample_type == "E4_Battery":
+            level = max(level - 0.0001, 0.0)
+            fields = f' {level:.2f}'
+        else:
+            level = max(level + rng.gauss(0, 0.01) * level, 0.0)
+            fields = f' {level:.6f}'
+        yield offset, fields
+
+
+def load_recordings(patterns: list) -> dict:
+    """
+    Loads recorded EDA CSVs (as written by EDAManager.dump_recording) for replay. The
+    sample type of each file comes from its suffix (e.g. session_eda_1_gsr.csv holds
+    E4_Gsr samples).
+
+    :param patterns: a list of CSV files or glob patterns
+    :return: a mapping of sample types to lists of (seconds since start, fields) tuples, the fields led by a space
+    """
+    suffixes = {
+        sample_type.replace("E4_", "").lower(): sample_type
+        for samples in EDAManager.STREAM_SAMPLES.values()
+        for sample_type in samples
+    }
+    recordings = {}
+    for pattern in patterns:
+        for path in glob.glob(pattern) or [pattern]:
+            suffix = os.path.splitext(path)[0].rsplit("_", 1)[-1]
+            if suffix not in suffixes:
+                print(f"Skipping {path}: can't tell which stream it holds")
+                continue
+            with open(path, newline="") as recording:
+                rows = list(csv.reader(recording))[1:]
+            if rows:
+                start = float(rows[0][0])
+                recordings[suffixes[suffix]] = [
+                    (float(row[0]) - start, "".join(f' {field}' for field in row[1:])) for row in rows
+                ]
+    return recordings
+
+
+class E4Simulator:
+    """
+    A stand-in for the E4 streaming server for load testing. Speaks the device_list,
+    device_connect, device_subscribe, and device_disconnect commands, and streams
+    synthetic samples (or replays recorded CSVs) for every subscribed stream at speed
+    times the real rate. With fragment set, the output is cut at random byte offsets
+    into pieces of at most that many bytes, each sent on its own, so samples and
+    responses regularly arrive split across reads. Each connection is closed after
+    duration seconds of streaming, if given.
+    """
+
+    def __init__(self, devices: int = 1, speed: float = 1.0, fragment: int = 0, recordings: dict = None,
+                 duration: float = None, seed: int = 0):
+        self.device_ids = [f'{0x9ff167 + device:06x}' for device in range(devices)]
+        self.speed = speed
+        self.fragment = fragment
+        self.recordings = recordings
+        self.duration = duration
+        self.rng = random.Random(seed)
+        self.sent = collections.Counter()
+        self.scheduled = collections.Counter()
+        self.connections = 0
+
+    async def serve(self, host: str = EDAManager.LOCALHOST, port: int = EDAManager.PORT):
+        """
+        Starts listening.
+
+        :param host: the address to listen on
+        :param port: the port to listen on (0 for any free port)
+        :return: the asyncio server
+        """
+        return await asyncio.start_server(self._handle, host, port)
+
+    def _sources(self, sample_type: str):
+        """
+        Returns the samples to stream for a sample type.
+
+        :param sample_type: the type of sample (e.g. E4_Gsr)
+        :return: an iterator of (seconds since start, fields) tuples, the fields led by a space
+        """
+        if self.recordings is not None:
+            return iter(self.recordings.get(sample_type, []))
+        return synthesize(sample_type, random.Random(self.rng.random()))
+
+    async def _send(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        """
+        Sends data, cut into random fragments if fragmentation is on.
+
+        :param writer: the connection
+        :param data: the bytes to send
+        :return: nothing
+        """
+        if not self.fragment:
+            writer.write(data)
+        else:
+            start = 0
+            while start < len(data):
+                end = start + self.rng.randint(1, self.fragment)
+                writer.write(data[start:end])
+                start = end
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves one client connection.
+
+        :param reader: the incoming side of the connection
+        :param writer: the outgoing side of the connection
+        :return: nothing
+        """
+        self.connections += 1
+        subscriptions = set()
+        device = None
+        streamer = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8").split()
+                if not command:
+                    continue
+                if command[0] == EDAManager.LIST_DEVICES_COMMAND:
+                    listing = " | ".join(f'{device_id} Empatica_E4' for device_id in self.device_ids)
+                    response = f'R {command[0]} {len(self.device_ids)} | {listing}'
+                elif command[0] == EDAManager.CONNECT_DEVICE_COMMAND:
+                    if len(command) > 1 and command[1] in self.device_ids:
+                        device = command[1]
+                        response = f'R {command[0]} OK'
+                    else:
+                        response = f'R {command[0]} ERR the requested device is not available'
+                elif command[0] == EDAManager.DISCONNECT_DEVICE_COMMAND:
+                    device = None
+                    response = f'R {command[0]} OK'
+                elif command[0] == EDAManager.STREAM_SUBSCRIBE_COMMAND and len(command) == 3 and device:
+                    stream, state = command[1], command[2]
+                    for sample_type in EDAManager.STREAM_SAMPLES.get(stream, {}):
+                        if state == EDAManager.STREAM_ON:
+                            subscriptions.add(sample_type)
+                        else:
+                            subscriptions.discard(sample_type)
+                    response = f'R {command[0]} {stream} {EDAManager.STATUS_CODE_OK}'
+                    if streamer is None and subscriptions:
+                        streamer = asyncio.create_task(self._stream(writer, subscriptions))
+                else:
+                    response = f'R {command[0]} ERR unknown command or no device connected'
+                await self._send(writer, f'{response}\r\n'.encode("utf-8"))
+        except ConnectionError:
+            pass
+        finally:
+            if streamer:
+                streamer.cancel()
+            writer.close()
+
+    async def _stream(self, writer: asyncio.StreamWriter, subscriptions: set) -> None:
+        """
+        Streams every subscribed sample type until the duration is up, sending whatever
+        has come due every tick. If the client can't keep up, sending blocks and the
+        connection falls behind schedule (which the caller can see by comparing sent
+        with scheduled).
+
+        :param writer: the connection
+        :param subscriptions: the subscribed sample types (which may change while streaming)
+        :return: nothing
+        """
+        start = time.perf_counter()
+        epoch = time.time()
+        sources = {}
+        heads = {}
+        sent = collections.Counter()
+        try:
+            while True:
+                elapsed = time.perf_counter() - start
+                if self.duration is not None and elapsed >= self.duration:
+                    break
+                due = elapsed * self.speed
+                lines = []
+                for sample_type in list(subscriptions):
+                    if sample_type not in sources:
+                        sources[sample_type] = self._sources(sample_type)
+                        heads[sample_type] = next(sources[sample_type], None)
+                    head, source = heads[sample_type], sources[sample_type]
+                    count = 0
+                    while head is not None and head[0] <= due:
+                        lines.append(f'{sample_type} {epoch + head[0]:.3f}{head[1]}\r\n')
+                        head = next(source, None)
+                        count += 1
+                    heads[sample_type] = head
+                    sent[sample_type] += count
+                    self.sent[sample_type] += count
+                if lines:
+                    await self._send(writer, "".join(lines).encode("utf-8"))
+                await asyncio.sleep(TICK_SECONDS)
+            # Samples which came due but were never sent because the client fell behind
+            due = self.duration * self.speed
+            for sample_type, head in heads.items():
+                self.scheduled[sample_type] += sent[sample_type]
+                while head is not None and head[0] <= due:
+                    self.scheduled[sample_type] += 1
+                    head = next(sources[sample_type], None)
+            writer.close()
+        except ConnectionError:
+            pass
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line interface for the E4 simulator.
+
+    :return: the argument parser
+    """
+    parser = argparse.ArgumentParser(description="Runs a local stand-in for the E4 streaming server.")
+    parser.add_argument("--host", default=EDAManager.LOCALHOST, help="the address to listen on")
+    parser.add_argument("--port", type=int, default=EDAManager.PORT, help="the port to listen on")
+    parser.add_argument("--devices", type=int, default=1, help="the number of simulated wristbands")
+    parser.add_argument("--speed", type=float, default=1.0, help="the multiple of the real sample rate to send at")
+    parser.add_argument(
+        "--fragment",
+        type=int,
+        default=0,
+        help="cut the output into random pieces of at most this many bytes (default: off)"
+    )
+    parser.add_argument(
+        "--replay",
+        nargs="+",
+        default=None,
+        help="recorded EDA CSVs (or glob patterns) to replay instead of synthetic samples"
+    )
+    parser.add_argument("--duration", type=float, default=None, help="close each connection after this many seconds")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    recordings = load_recordings(args.replay) if args.replay else None
+    simulator = E4Simulator(args.devices, args.speed, args.fragment, recordings, args.duration)
+
+    async def run():
+        server = await simulator.serve(args.host, args.port)
+        print(f"Simulating {args.devices} E4 device(s) on {args.host}:{args.port} at {args.speed}x")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
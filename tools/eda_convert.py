@@ -0,0 +1,52 @@
+import argparse
+import glob
+import os
+import time
+
+from model.eda_file import EXTENSION, binary_to_csv, csv_to_binary
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line interface for the EDA file converter.
+
+    :return: the argument parser
+    """
+    parser = argparse.ArgumentParser(
+        description=f"Converts EDA recordings between CSV and the binary .{EXTENSION} format, "
+                    f"writing each next to the original with the other extension."
+    )
+    parser.add_argument("recordings", nargs="+", help=f"CSV or .{EXTENSION} files (or glob patterns) to convert")
+    parser.add_argument("--force", action="store_true", help="overwrite converted files which already exist")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    failures = 0
+    for pattern in args.recordings:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            root, ext = os.path.splitext(path)
+            if ext.lower() == ".csv":
+                output, convert = f'{root}.{EXTENSION}', csv_to_binary
+            elif ext.lower() == f'.{EXTENSION}':
+                output, convert = f'{root}.csv', binary_to_csv
+            else:
+                print(f"Skipping {path}: not a CSV or .{EXTENSION} file")
+                continue
+            if os.path.exists(output) and not args.force:
+                print(f"Skipping {path}: {output} already exists")
+                continue
+            start = time.perf_counter()
+            try:
+                samples = convert(path, output)
+            except (OSError, ValueError) as e:
+                print(f"Failed to convert {path}: {e}")
+                failures += 1
+                continue
+            print(f"Converted {samples} samples from {path} to {output} in {time.perf_counter() - start:.3f}s")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import re
+
+from model.eda_recorder import EDARecorder, RECORDERS
+from tools.file_patterns import expand_patterns
+
+# EDA segments are named <file>.<segment number><SEGMENT_SUFFIX> (e.g. session_eda_1_gsr.csv.0000.part)
+SEGMENT_PATTERN = re.compile(
+    rf'\.({"|".join(map(re.escape, RECORDERS))})\.\d+{re.escape(EDARecorder.SEGMENT_SUFFIX)}$', re.IGNORECASE
+)
+
+
+def find_segments(patterns: list) -> dict:
+    """
+    Finds every EDA segment under a set of directories or glob patterns which was never joined
+    (e.g. after a crash), grouped by the file it belongs to.
+
+    :param patterns: a list of directories, files, or glob patterns
+    :return: a mapping of file paths to their segments (in order)
+    """
+    segments = dict()
+    for path in sorted(expand_patterns(patterns)):
+        if SEGMENT_PATTERN.search(path):
+            segments.setdefault(path[:-len(EDARecorder.SEGMENT_SUFFIX)].rsplit(".", 1)[0], []).append(path)
+    return segments
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line interface for the EDA recovery tool.
+
+    :return: the argument parser
+    """
+    parser = argparse.ArgumentParser(
+        description=f"Joins the EDA segments (<file>.NNNN{EDARecorder.SEGMENT_SUFFIX}) left behind by a crash "
+                    f"into the files they belong to, dropping any partly written last sample."
+    )
+    parser.add_argument("recordings", nargs="+", help="segments, directories, or glob patterns to recover")
+    parser.add_argument("--force", action="store_true", help="overwrite files which already exist")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    segments = find_segments(args.recordings)
+    if not segments:
+        print("No EDA segments found")
+        return
+
+    failures = 0
+    for path, parts in segments.items():
+        if os.path.exists(path) and not args.force:
+            print(f"Skipping {len(parts)} segments of {path}: {path} already exists")
+            continue
+        try:
+            EDARecorder.recover_segments(parts)
+        except (OSError, ValueError) as e:
+            print(f"Failed to recover {path}: {e}")
+            failures += 1
+            continue
+        print(f"Recovered {path} from {len(parts)} segments")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
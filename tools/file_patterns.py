@@ -0,0 +1,21 @@
+import glob
+import os
+
+
+def expand_patterns(patterns: list) -> set:
+    """
+    Collects every file named by a set of directories, files, or glob patterns. Directories
+    are searched recursively, and patterns which match nothing are taken as plain paths.
+
+    :param patterns: a list of directories, files, or glob patterns
+    :return: a set of file paths
+    """
+    files = set()
+    for pattern in patterns:
+        for match in glob.glob(pattern, recursive=True) or [pattern]:
+            if os.path.isdir(match):
+                for directory, _, names in os.walk(match):
+                    files.update(os.path.join(directory, name) for name in names)
+            elif os.path.isfile(match):
+                files.add(match)
+    return files
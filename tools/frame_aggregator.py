@@ -0,0 +1,157 @@
+import pathlib
+
+import numpy
+import pandas as pd
+
+from model.survey_table import SurveyTable
+from tools.data_aggregator import (
+    SEGMENTS, FIRST_NAME, LAST_NAME, EMOTIONS_TO_PROMPTS, DUPLICATE_LAST, DUPLICATE_FIRST, DUPLICATE_ERROR,
+    MISSING_KEEP, MISSING_ERROR, get_survey_segment, survey_columns, get_column_plan
+)
+
+NAMES = [FIRST_NAME, LAST_NAME]
+
+
+def to_likert(column: pd.Series) -> pd.Series:
+    """
+    Converts a column of responses to nullable 8-bit integers if, like a Likert column of a
+    SurveyTable, every response is empty or a small integer written as such (e.g. "3" but not
+    "03" or "Agree"). Any other column is kept as strings, so it is written back unchanged.
+
+    :param column: a column of responses as strings
+    :return: the column as Int8 (with skipped questions missing) or the column itself
+    """
+    answered = column[column != ""]
+    numbers = pd.to_numeric(answered, errors="coerce")
+    if numbers.isna().any() or not numbers.between(SurveyTable.MISSING + 1, 127).all() \
+            or (numbers.astype("int64").astype(str) != answered).any():
+        return column
+    return pd.to_numeric(column.mask(column == "")).astype("Int8")
+
+
+def load_frame(path) -> tuple:
+    """
+    Loads a single survey as a typed frame. Names are kept as strings and responses
+    are loaded as nullable 8-bit integers, so skipped questions stay empty. Question
+    columns which hold anything other than small integers (e.g. choice text) stay strings.
+
+    :param path: the path to a survey CSV
+    :return: the segment, the first metadata row, the second metadata row, and the responses as a tuple
+    """
+    header = pd.read_csv(path, nrows=2, dtype=str, keep_default_na=False)
+    segment = get_survey_segment(str(path))
+    questions = survey_columns(segment, header.columns)
+    frame = pd.read_csv(path, skiprows=[1, 2], usecols=NAMES + questions, dtype=str, keep_default_na=False)
+    for question in questions:
+        frame[question] = to_likert(frame[question])
+    return segment, header.iloc[0].to_dict(), header.iloc[1].to_dict(), frame[NAMES + questions]
+
+
+def load_frames(file_paths: list) -> dict:
+    """
+    Loads a set of surveys as typed frames.
+
+    :param file_paths: a list of CSV file paths
+    :return: a dict of (first metadata row, second metadata row, responses) tuples (one for each file)
+    """
+    frames = {}
+    for path in file_paths:
+        segment, metadata1, metadata2, frame = load_frame(path)
+        frames[segment] = (metadata1, metadata2, frame)
+    return frames
+
+
+def deduplicate(frame: pd.DataFrame, students: pd.MultiIndex, segment: str,
+                on_duplicate: str = DUPLICATE_LAST) -> pd.DataFrame:
+    """
+    Applies the duplicate name policy to a segment, so each name appears at most once.
+
+    :param frame: the responses of a segment
+    :param students: the names of the students being aggregated (only their duplicates are errors)
+    :param segment: the segment of the responses (before, during, after)
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
+    :return: the responses with one row per name
+    """
+    duplicated = frame.duplicated(subset=NAMES, keep=False) & pd.MultiIndex.from_frame(frame[NAMES]).isin(students)
+    if on_duplicate == DUPLICATE_ERROR and duplicated.any():
+        first, last = frame.loc[duplicated, NAMES].iloc[0]
+        raise ValueError(f"Found {int(duplicated.sum())} responses for {first} {last} in the {segment} survey")
+    return frame.drop_duplicates(subset=NAMES, keep="first" if on_duplicate == DUPLICATE_FIRST else "last")
+
+
+def aggregate_frames(frames: dict, on_duplicate: str = DUPLICATE_LAST, on_missing: str = MISSING_KEEP,
+                     scores: bool = False) -> pd.DataFrame:
+    """
+    Aggregates the surveys with a left merge of every segment onto the before survey.
+    The columns and values match aggregate_surveys; descriptions and subscales are
+    only filled in for students who completed the segment.
+
+    :param frames: a dictionary of frames as generated by load_frames
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
+    :param on_missing: the missing segment policy (one of MISSING_POLICIES)
+    :param scores: True to append a mean and median column for every (subscale, segment) pair
+    :return: the aggregate survey as a frame
+    """
+    aggregate = frames[SEGMENTS[0]][2][NAMES]
+    students = pd.MultiIndex.from_frame(aggregate)
+    present = {}
+    for segment in SEGMENTS:
+        _, _, frame = frames[segment]
+        questions = [column for column in frame.columns if column not in NAMES]
+        frame = deduplicate(frame, students, segment, on_duplicate).rename(
+            columns={question: f'{question}_{segment}_question' for question in questions}
+        )
+        frame[f'_{segment}'] = True
+        aggregate = aggregate.merge(frame, how="left", on=NAMES, sort=False)
+        present[segment] = aggregate.pop(f'_{segment}').notna().to_numpy()
+
+    missing = ~numpy.logical_and.reduce([present[segment] for segment in SEGMENTS])
+    if missing.any() and on_missing == MISSING_ERROR:
+        first, last = aggregate.loc[missing, NAMES].iloc[0]
+        segments = [segment for segment in SEGMENTS if not present[segment][missing.argmax()]]
+        raise ValueError(f"{first} {last} is missing from the {', '.join(segments)} survey(s)")
+
+    columns = {name: aggregate[name] for name in NAMES}
+    for segment in SEGMENTS:
+        for key, value in get_column_plan(segment, *frames[segment][:2])["template"].items():
+            columns[key] = aggregate[key] if value is None else numpy.where(present[segment], value, "")
+    result = pd.DataFrame(columns, index=aggregate.index)
+    if scores:
+        result = pd.concat([result, compute_scores(frames, aggregate)], axis=1)
+    if on_missing != MISSING_KEEP:
+        result = result.loc[~missing]
+    return result
+
+
+def compute_scores(frames: dict, aggregate: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes each participant's mean and median for every (subscale, segment) pair by
+    grouping the question columns of each segment by subscale.
+
+    :param frames: a dictionary of frames as generated by load_frames
+    :param aggregate: the merged responses (one question column per segment question)
+    :return: a frame of score columns named {subscale}_{segment}_mean and {subscale}_{segment}_median
+    """
+    scores = []
+    for segment in SEGMENTS:
+        questions = [column for column in frames[segment][2].columns if column not in NAMES]
+        subscales = [EMOTIONS_TO_PROMPTS[segment][int(question.split("_")[-1]) - 1] for question in questions]
+        # Text responses (e.g. "Agree") don't score, so they count as skipped
+        responses = aggregate[[f'{question}_{segment}_question' for question in questions]].apply(
+            pd.to_numeric, errors="coerce"
+        ).astype("float64")
+        grouped = responses.T.groupby(subscales, sort=False)
+        for statistic, values in (("mean", grouped.mean().T), ("median", grouped.median().T)):
+            scores.append(values.rename(columns=lambda subscale: f'{subscale}_{segment}_{statistic}'))
+    return pd.concat(scores, axis=1)
+
+
+def dump_frame(aggregate: pd.DataFrame, file_path: pathlib.Path) -> None:
+    """
+    Dumps the aggregate frame to some file path as a CSV (in the same format as dump_csv).
+
+    :param aggregate: the aggregate survey
+    :param file_path: the path to dump the aggregate survey
+    :return: nothing
+    """
+    aggregate.to_csv(file_path.joinpath("aggregate_survey.csv"), index=False, lineterminator="\r\n")
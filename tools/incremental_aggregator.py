@@ -0,0 +1,290 @@
+import csv
+import hashlib
+import json
+import os
+import pathlib
+
+from tools.data_aggregator import (
+    SEGMENTS, FIRST_NAME, LAST_NAME, DUPLICATE_LAST, MISSING_KEEP, get_survey_segment, load_surveys,
+    aggregate_surveys, dump_csv, participant_key, join_participant, keep_student, metadata_digest
+)
+
+RESPONSE_ID = "ResponseId"
+CHECKPOINT_NAME = "aggregate_survey.checkpoint.json"
+CHECKPOINT_VERSION = 3
+
+
+def file_digest(path) -> str:
+    """
+    Hashes the contents of a file.
+
+    :param path: the path to the file
+    :return: the SHA-256 digest as a hex string
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def response_digest(participant: dict) -> str:
+    """
+    Hashes a single survey response, so changed responses can be told apart from unchanged ones.
+
+    :param participant: a single survey response
+    :return: a short digest as a hex string
+    """
+    return hashlib.sha1("\x1f".join(f'{key}={value}' for key, value in participant.items()).encode("utf-8")) \
+        .hexdigest()[:16]
+
+
+def file_stamp(path) -> list:
+    """
+    Identifies the current version of a file by its size and modification time.
+
+    :param path: the path to the file
+    :return: the stamp as a list (or None if there is no such file)
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def output_stamp(output_path: pathlib.Path) -> list:
+    """
+    Identifies the current version of the aggregate survey by its size and modification time.
+
+    :param output_path: the directory of the aggregate survey
+    :return: the stamp as a list (or None if there is no aggregate survey)
+    """
+    return file_stamp(output_path.joinpath("aggregate_survey.csv"))
+
+
+def source_digests(file_paths: list, checkpoint: dict) -> tuple:
+    """
+    Stamps and hashes the surveys. A survey whose size and modification time match the checkpoint
+    keeps the digest recorded there, so unchanged surveys are never read.
+
+    :param file_paths: a list of CSV file paths
+    :param checkpoint: the previous checkpoint (or None)
+    :return: a mapping of segments to source file stamps and a mapping of segments to source file digests
+    """
+    stamps, digests = {}, {}
+    for path in file_paths:
+        segment = get_survey_segment(str(path))
+        stamps[segment] = file_stamp(path)
+        previous = checkpoint["segments"].get(segment) if checkpoint is not None else None
+        if previous is not None and previous["stamp"] == stamps[segment]:
+            digests[segment] = previous["sha256"]
+        else:
+            digests[segment] = file_digest(path)
+    return stamps, digests
+
+
+def load_checkpoint(output_path: pathlib.Path) -> dict:
+    """
+    Loads the checkpoint stored next to the aggregate survey.
+
+    :param output_path: the directory of the aggregate survey
+    :return: the checkpoint or None if there is no usable checkpoint
+    """
+    try:
+        with output_path.joinpath(CHECKPOINT_NAME).open() as file:
+            checkpoint = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return checkpoint if checkpoint.get("version") == CHECKPOINT_VERSION else None
+
+
+def dump_checkpoint(output_path: pathlib.Path, checkpoint: dict) -> None:
+    """
+    Atomically replaces the checkpoint stored next to the aggregate survey.
+
+    :param output_path: the directory of the aggregate survey
+    :param checkpoint: the new checkpoint
+    :return: nothing
+    """
+    path = output_path.joinpath(CHECKPOINT_NAME)
+    with path.with_suffix(".tmp").open(mode="w") as file:
+        json.dump(checkpoint, file)
+    os.replace(path.with_suffix(".tmp"), path)
+
+
+def build_checkpoint(surveys: dict, stamps: dict, digests: dict, options: list, students: list, rows: int,
+                     output_path: pathlib.Path) -> dict:
+    """
+    Records everything needed to update the aggregate survey incrementally next time.
+
+    :param surveys: a dictionary of surveys as generated by load_surveys
+    :param stamps: a mapping of segments to source file stamps
+    :param digests: a mapping of segments to source file digests
+    :param options: the duplicate and missing policies used for the aggregate survey
+    :param students: the participant keys in the aggregate survey
+    :param rows: the number of rows in the aggregate survey
+    :param output_path: the directory of the aggregate survey
+    :return: the checkpoint
+    """
+    return {
+        "version": CHECKPOINT_VERSION,
+        "options": options,
+        "output": output_stamp(output_path),
+        "students": sorted(map(list, set(students))),
+        "rows": rows,
+        "segments": {
+            segment: {
+                "stamp": stamps[segment],
+                "sha256": digests[segment],
+                "metadata": metadata_digest(segment, surveys[segment]["metadata1"], surveys[segment]["metadata2"]),
+                "responses": {
+                    participant[RESPONSE_ID]: [response_digest(participant), *participant_key(participant)]
+                    for participant in surveys[segment]["survey"]
+                }
+            }
+            for segment in SEGMENTS
+        }
+    }
+
+
+def is_resumable(checkpoint: dict, surveys: dict, options: list, output_path: pathlib.Path) -> bool:
+    """
+    Checks whether the aggregate survey can be updated in place: the checkpoint must describe the
+    current aggregate survey, the same policies, and the same version of every survey.
+
+    :param checkpoint: the previous checkpoint
+    :param surveys: a dictionary of surveys as generated by load_surveys
+    :param options: the duplicate and missing policies requested for this run
+    :param output_path: the directory of the aggregate survey
+    :return: True if only new or changed responses need to be joined
+    """
+    return checkpoint is not None \
+        and checkpoint["options"] == options \
+        and checkpoint["output"] == output_stamp(output_path) \
+        and all(RESPONSE_ID in surveys[segment]["metadata1"] for segment in SEGMENTS) \
+        and all(
+            checkpoint["segments"][segment]["metadata"] == metadata_digest(
+                segment, surveys[segment]["metadata1"], surveys[segment]["metadata2"]
+            )
+            for segment in SEGMENTS
+        )
+
+
+def find_changed_students(checkpoint: dict, surveys: dict) -> set:
+    """
+    Finds every student with a response that was added, changed, or removed since the checkpoint.
+
+    :param checkpoint: the previous checkpoint
+    :param surveys: a dictionary of surveys as generated by load_surveys
+    :return: a set of participant keys
+    """
+    changed = set()
+    for segment in SEGMENTS:
+        previous = dict(checkpoint["segments"][segment]["responses"])
+        for participant in surveys[segment]["survey"]:
+            entry = previous.pop(participant[RESPONSE_ID], None)
+            if entry is None or entry[0] != response_digest(participant):
+                changed.add(participant_key(participant))
+                if entry is not None:
+                    changed.add(tuple(entry[1:]))
+        changed.update(tuple(entry[1:]) for entry in previous.values())
+    return changed
+
+
+def update_csv(output_path: pathlib.Path, rows: dict, existing: set, order: list) -> bool:
+    """
+    Applies re-joined students to the aggregate survey, keeping one row per before survey response in
+    before survey order (like a full aggregation). When every changed student is new and comes after every
+    student already in the aggregate survey, the rows are appended; otherwise the aggregate survey is rewritten.
+
+    :param output_path: the directory of the aggregate survey
+    :param rows: a mapping of participant keys to their re-joined row (None removes a student)
+    :param existing: the participant keys already in the aggregate survey
+    :param order: the participant key of every before survey response (in file order)
+    :return: False if the rows do not fit the header of the aggregate survey (nothing is written)
+    """
+    path = output_path.joinpath("aggregate_survey.csv")
+    with path.open(newline="") as survey:
+        fieldnames = next(csv.reader(survey), [])
+    if any(student_responses.keys() - set(fieldnames) for student_responses in rows.values() if student_responses):
+        return False
+    first_changed = next((i for i, key in enumerate(order) if key in rows), len(order))
+    if not existing.intersection(rows) and not existing.intersection(order[first_changed:]):
+        with path.open(mode="a", newline="") as dump:
+            writer = csv.DictWriter(dump, fieldnames)
+            writer.writerows(rows[key] for key in order[first_changed:] if rows.get(key))
+        return True
+
+    previous = {}
+    with path.open(newline="") as survey:
+        for student_responses in csv.DictReader(survey):
+            previous.setdefault(participant_key(student_responses), student_responses)
+    temporary = path.with_suffix(".tmp")
+    with temporary.open(mode="w", newline="") as dump:
+        writer = csv.DictWriter(dump, fieldnames)
+        writer.writeheader()
+        for key in order:
+            student_responses = rows[key] if key in rows else previous.get(key)
+            if student_responses:
+                writer.writerow(student_responses)
+    os.replace(temporary, path)
+    return True
+
+
+def aggregate_incremental(file_paths: list, output_path: pathlib.Path, on_duplicate: str = DUPLICATE_LAST,
+                          on_missing: str = MISSING_KEEP) -> int:
+    """
+    Brings output_path/aggregate_survey.csv up to date with the surveys, only re-joining students with
+    new, changed, or removed responses. Falls back to a full aggregation when there is no usable checkpoint.
+    Surveys whose size and modification time are unchanged are not hashed, so an up to date run only stats
+    them. Once any survey has changed, every survey is parsed (the responses of all three segments are
+    needed to re-join a student), so such a run still costs time in proportion to the size of the study.
+
+    :param file_paths: a list of CSV file paths
+    :param output_path: the directory of the aggregate survey
+    :param on_duplicate: the duplicate name policy (one of DUPLICATE_POLICIES)
+    :param on_missing: the missing segment policy (one of MISSING_POLICIES)
+    :return: the number of students in the aggregate survey
+    """
+    options = [on_duplicate, on_missing]
+    checkpoint = load_checkpoint(output_path)
+    stamps, digests = source_digests(file_paths, checkpoint)
+    if checkpoint is not None and checkpoint["options"] == options \
+            and checkpoint["output"] == output_stamp(output_path) \
+            and all(checkpoint["segments"][segment]["sha256"] == digests[segment] for segment in SEGMENTS):
+        if any(checkpoint["segments"][segment]["stamp"] != stamps[segment] for segment in SEGMENTS):
+            # Touched but unchanged, so record the new stamps to skip hashing them next time
+            for segment in SEGMENTS:
+                checkpoint["segments"][segment]["stamp"] = stamps[segment]
+            dump_checkpoint(output_path, checkpoint)
+        print("Aggregate survey is up to date")
+        return checkpoint["rows"]
+
+    surveys = load_surveys(file_paths)
+    if is_resumable(checkpoint, surveys, options, output_path):
+        changed = find_changed_students(checkpoint, surveys)
+        order = [participant_key(participant) for participant in surveys[SEGMENTS[0]]["survey"]]
+        rows = {}
+        for key in order:
+            if key in changed and key not in rows:
+                student_responses, missing = join_participant(surveys, key, on_duplicate)
+                rows[key] = student_responses if keep_student(key, missing, on_missing) else None
+        rows.update((key, None) for key in changed - rows.keys())
+        existing = set(map(tuple, checkpoint["students"]))
+        if update_csv(output_path, rows, existing, order):
+            students = (existing - changed) | {key for key, student_responses in rows.items() if student_responses}
+            count = sum(key in students for key in order)
+            dump_checkpoint(output_path, build_checkpoint(surveys, stamps, digests, options, students, count,
+                                                          output_path))
+            print(f"Re-joined {sum(map(bool, rows.values()))} students ({len(changed & existing)} replaced "
+                  f"or removed, {len(changed - existing)} new)")
+            return count
+
+    master_survey = aggregate_surveys(surveys, on_duplicate, on_missing)
+    dump_csv(master_survey, output_path)
+    students = [(student[FIRST_NAME], student[LAST_NAME]) for student in master_survey]
+    dump_checkpoint(output_path, build_checkpoint(surveys, stamps, digests, options, students,
+                                                  len(master_survey), output_path))
+    print(f"Aggregated {len(master_survey)} students from scratch")
+    return len(master_survey)
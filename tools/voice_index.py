@@ -0,0 +1,90 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from model.voice_activity import VoiceActivityDetector, voice_index_path
+from tools.file_patterns import expand_patterns
+
+
+def find_recordings(patterns: list, force: bool = False) -> list:
+    """
+    Finds every WAV file under a set of directories or glob patterns which needs indexing.
+
+    :param patterns: a list of directories, files, or glob patterns
+    :param force: True to include recordings whose index is already up to date
+    :return: a sorted list of WAV paths
+    """
+    recordings = [path for path in expand_patterns(patterns) if path.lower().endswith(".wav")]
+    if not force:
+        recordings = [
+            path for path in recordings
+            if not os.path.exists(voice_index_path(path))
+            or os.path.getmtime(voice_index_path(path)) < os.path.getmtime(path)
+        ]
+    return sorted(recordings)
+
+
+def index_recording(path: str) -> tuple:
+    """
+    Indexes a single recording. Runs in a worker process.
+
+    :param path: the path to the WAV file
+    :return: the number of segments and the elapsed seconds as a tuple
+    """
+    start = time.perf_counter()
+    segments = VoiceActivityDetector.index_wav(path)
+    return segments, time.perf_counter() - start
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line interface for the voice activity indexer.
+
+    :return: the argument parser
+    """
+    parser = argparse.ArgumentParser(
+        description="Writes a voice activity index (<name>_voice.csv) next to each interview recording."
+    )
+    parser.add_argument("recordings", nargs="+", help="WAV files, directories, or glob patterns to index")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="the number of recordings to index in parallel (default: one per core)"
+    )
+    parser.add_argument("--force", action="store_true", help="re-index recordings whose index is up to date")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    recordings = find_recordings(args.recordings, args.force)
+    if not recordings:
+        print("No recordings to index")
+        return
+
+    results = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(recordings)))) as pool:
+        futures = {path: pool.submit(index_recording, path) for path in recordings}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                results[path] = e
+    elapsed = time.perf_counter() - start
+
+    print(f'{"recording":<50} {"segments":>9} {"time (s)":>9}')
+    for path, result in results.items():
+        if isinstance(result, Exception):
+            print(f'{path:<50} {"failed":>9} {"":>9}  {result}')
+        else:
+            print(f'{path:<50} {result[0]:>9} {result[1]:>9.3f}')
+    failures = sum(isinstance(result, Exception) for result in results.values())
+    print(f'{len(results) - failures} of {len(results)} recordings indexed in {elapsed:.3f}s')
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,13 @@
 import statistics
 import tkinter as tk
 from collections import OrderedDict
-from tkinter import filedialog
+from tkinter import filedialog, messagebox
 
-import matplotlib.animation as animation
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+from view.plot_renderer import PlotRenderer
+
 
 class MainView(tk.Frame):
     """
@@ -15,22 +16,23 @@ class MainView(tk.Frame):
     """
 
     PARTICIPANT_STRING = "Select a Participant"
+    FILE_SELECT_STRING = "Select Survey File"
+    POLL_INTERVAL = 100
 
     def __init__(self, root, *args, **kwargs):
         tk.Frame.__init__(self, root, *args, **kwargs)
 
         # Initialize fields
         self.controller = None
-        self.ani_audio = None
-        self.ani_eda = None
         self.option = tk.StringVar(self)
         self.option.set(MainView.PARTICIPANT_STRING)
         self.option.trace("w", self.load_participant_survey)
+        self.profile_option = tk.StringVar(self)
 
         # Insert widgets
         self.start_button = tk.Button(self, text="Start", command=self.start_action, state=tk.DISABLED)
         self.stop_button = tk.Button(self, text="Stop", command=self.stop_action, state=tk.DISABLED)
-        self.file_select_button = tk.Button(self, text="Select Survey File", command=self.load_survey_event)
+        self.file_select_button = tk.Button(self, text=MainView.FILE_SELECT_STRING, command=self.load_survey_event)
         self.survey_canvas = tk.Canvas(self)
         self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.survey_canvas.yview)
         self.survey_view = SurveyView(self.survey_canvas)
@@ -38,12 +40,15 @@ class MainView(tk.Frame):
         self.eda_plot = PlotView(self, "EDA Plot", "Time", "Galvanic Skin Response")
         self.participant_menu = tk.OptionMenu(self, self.option, MainView.PARTICIPANT_STRING)
         self.participant_menu.config(state=tk.DISABLED)
+        self.participants_loaded = False
+        self.profile_menu = tk.OptionMenu(self, self.profile_option, "")
 
         # Arrange elements
         self.file_select_button.grid(row=0, column=0, sticky="nsew")
         self.participant_menu.grid(row=0, column=1, sticky="nsew")
         self.start_button.grid(row=0, column=2, sticky="nsew")
         self.stop_button.grid(row=0, column=3, sticky="nsew")
+        self.profile_menu.grid(row=0, column=4, sticky="nsew")
         self.survey_canvas.grid(row=1, column=0, sticky="nsew", columnspan=4)
         self.scrollbar.grid(row=1, column=4, sticky="ns")
         self.audio_plot.grid(row=2, column=0, sticky="nsew", columnspan=2)
@@ -85,6 +90,41 @@ class MainView(tk.Frame):
         path = filedialog.askopenfilename()
         self.controller.process_survey_load_event(path)
 
+    def poll_survey_progress(self) -> None:
+        """
+        Polls the controller for survey load progress until the survey is loaded.
+
+        :return: nothing
+        """
+        if self.controller.process_survey_progress_event():
+            self.after(MainView.POLL_INTERVAL, self.poll_survey_progress)
+
+    def update_survey_progress(self, fraction) -> None:
+        """
+        Shows the survey load progress on the file select button.
+
+        :param fraction: the fraction of the survey loaded so far (None once loading is over)
+        :return: nothing
+        """
+        if fraction is None:
+            self.file_select_button.config(text=MainView.FILE_SELECT_STRING, state=tk.NORMAL)
+        else:
+            self.file_select_button.config(text=f'Loading Survey ({fraction:.0%})', state=tk.DISABLED)
+            self.participant_menu.config(state=tk.DISABLED)
+
+    def show_survey_error(self, message: str) -> None:
+        """
+        Reports a survey which failed to load and restores the file select button and the
+        participant menu (which still lists the participants of the last survey loaded, if any).
+
+        :param message: a description of the failure
+        :return: nothing
+        """
+        self.update_survey_progress(None)
+        if self.participants_loaded:
+            self.participant_menu.config(state=tk.NORMAL)
+        messagebox.showerror("Failed to load survey", message, parent=self)
+
     def load_participant_survey(self, *_) -> None:
         """
         Loads the participant survey based on updates to the option menu.
@@ -109,6 +149,34 @@ class MainView(tk.Frame):
                 command=lambda value=participant: self.option.set(value)
             )
         self.participant_menu.config(state=tk.NORMAL)
+        self.participants_loaded = True
+
+    def update_profile_menu(self, profiles: list, current: str) -> None:
+        """
+        Fills the recording profile menu.
+
+        :param profiles: the names of the recording profiles
+        :param current: the name of the selected profile
+        :return: nothing
+        """
+        menu = self.profile_menu["menu"]
+        menu.delete(0, "end")
+        for profile in profiles:
+            menu.add_command(
+                label=profile,
+                command=lambda value=profile: self.select_profile(value)
+            )
+        self.profile_option.set(current)
+
+    def select_profile(self, profile: str) -> None:
+        """
+        Passes a recording profile selection to the controller.
+
+        :param profile: the name of the selected profile
+        :return: nothing
+        """
+        self.profile_option.set(profile)
+        self.controller.process_profile_selection_event(profile)
 
     @staticmethod
     def _update_button_enabled(button: tk.Button, state: bool) -> None:
@@ -139,6 +207,7 @@ class MainView(tk.Frame):
         :param state: the new state of the stop button (True for enabled)
         """
         MainView._update_button_enabled(self.stop_button, state)
+        self.profile_menu.config(state=tk.DISABLED if state else tk.NORMAL)
 
     def register_observer(self, controller) -> None:
         """
@@ -166,22 +235,21 @@ class MainView(tk.Frame):
 
     def animate_plots(self) -> None:
         """
-        Sets up the animation after we get our controller reference.
+        Starts refreshing the plots from the controller after we get our controller reference.
 
         :return: nothing
         """
-        self.ani_audio = animation.FuncAnimation(
-            self.audio_plot.plots,
-            self.controller.process_audio_animation,
-            interval=500,
-            blit=True
-        )
-        self.ani_eda: animation.FuncAnimation = animation.FuncAnimation(
-            self.eda_plot.plots,
-            self.controller.process_eda_animation,
-            interval=500,
-            blit=True
-        )
+        self.audio_plot.animate(self.controller.process_audio_animation)
+        self.eda_plot.animate(self.controller.process_eda_animation)
+
+    def stop_plots(self) -> None:
+        """
+        Stops refreshing the plots, leaving the last frame on screen.
+
+        :return: nothing
+        """
+        self.audio_plot.stop()
+        self.eda_plot.stop()
 
     def get_output_file_name(self):
         participant_name = self.option.get()
@@ -330,6 +398,12 @@ class TableView(tk.Frame):
 
 
 class PlotView(tk.Frame):
+    """
+    A live line plot. The data comes from a function polled on the Tk thread, and
+    frames are drawn by a PlotRenderer, which blits the line and only redraws the axes
+    when their limits change. The refresh interval follows the renderer's suggestion,
+    so slow frames are drawn less often rather than starving the rest of the UI.
+    """
 
     def __init__(self, root, title, x_label, y_label, *args, **kwargs):
         tk.Frame.__init__(self, root, *args, **kwargs)
@@ -337,11 +411,14 @@ class PlotView(tk.Frame):
         self.title = title
         self.x_label = x_label
         self.y_label = y_label
+        self.source = None
+        self.pending = None
 
         self.plots = Figure(figsize=(6, 4), dpi=100)
         self.plot = self.plots.add_subplot(111)
-        self.curve, = self.plot.plot([])
         self.canvas = FigureCanvasTkAgg(self.plots, master=self)
+        self.renderer = PlotRenderer(self.plot, self.canvas)
+        self.curve = self.renderer.line
 
         self.plots.suptitle(title)
         self.plot.set_xlabel(x_label)
@@ -352,11 +429,39 @@ class PlotView(tk.Frame):
         self.rowconfigure(0, weight=1)
         self.columnconfigure(0, weight=1)
 
-    def clear(self):
-        self.plot.clear()
+    def animate(self, source) -> None:
+        """
+        Starts refreshing the plot, replacing any earlier source.
+
+        :param source: a function returning the x and y values to show as a tuple (or None to skip a frame)
+        :return: nothing
+        """
+        self.source = source
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+        self.pending = self.after(PlotRenderer.MIN_INTERVAL, self._refresh)
 
-    def redraw(self):
-        self.plots.suptitle(self.title)
-        self.plot.set_xlabel(self.x_label)
-        self.plot.set_ylabel(self.y_label)
-        self.canvas.draw()
+    def stop(self) -> None:
+        """
+        Stops refreshing the plot.
+
+        :return: nothing
+        """
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+            self.pending = None
+        self.source = None
+
+    def _refresh(self) -> None:
+        """
+        Draws one frame and schedules the next.
+
+        :return: nothing
+        """
+        try:
+            data = self.source()
+            if data is not None:
+                self.renderer.render(*data)
+        except Exception as e:
+            print(f"Failed to draw a frame of the {self.title}: {e}")
+        self.pending = self.after(self.renderer.next_interval(), self._refresh)
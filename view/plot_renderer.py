@@ -0,0 +1,121 @@
+import time
+
+import numpy
+
+
+class PlotRenderer:
+    """
+    Draws a single line on a matplotlib axes with blitting. The line is created once
+    and updated with set_data; the axes, ticks, and labels are drawn into a cached
+    background only when the limits have to change (or the canvas is redrawn, e.g.
+    after a resize), and every other frame just restores the background, draws the
+    line, and blits the axes. Limits are padded so a growing or scrolling line only
+    forces a full redraw every so often.
+
+    Also times every frame and suggests how long to wait before the next one, so
+    drawing never takes more than TARGET_SHARE of the UI thread.
+    """
+
+    # The fraction of the axes range added beyond the data when the limits change
+    X_MARGIN = 0.25
+    Y_MARGIN = 0.1
+
+    # The limits are also recomputed once the data covers less than this fraction of them
+    MIN_COVERAGE = 0.5
+
+    # The share of the UI thread drawing may take, and the bounds of the refresh interval (ms)
+    TARGET_SHARE = 0.1
+    MIN_INTERVAL = 50
+    MAX_INTERVAL = 1000
+    SMOOTHING = 0.2
+
+    def __init__(self, axes, canvas):
+        self.axes = axes
+        self.canvas = canvas
+        self.line, = axes.plot([], [], animated=True)
+        self.background = None
+        self.frames = 0
+        self.full_draws = 0
+        self.render_time = None
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _on_draw(self, _) -> None:
+        """
+        Caches the freshly drawn axes (which never include the animated line) and puts
+        the line back on top.
+
+        :param _: the draw event
+        :return: nothing
+        """
+        self.background = self.canvas.copy_from_bbox(self.axes.bbox)
+        self.axes.draw_artist(self.line)
+
+    @staticmethod
+    def _padded_limits(limits: tuple, low: float, high: float, before: float, after: float) -> tuple:
+        """
+        Returns new limits for data spanning [low, high], or the current limits if they
+        still fit the data well.
+
+        :param limits: the current limits
+        :param low: the smallest data value
+        :param high: the largest data value
+        :param before: the fraction of the data range to leave below the data
+        :param after: the fraction of the data range to leave above the data
+        :return: the limits to use
+        """
+        current_low, current_high = limits
+        if (current_low <= low and high <= current_high
+                and high - low >= PlotRenderer.MIN_COVERAGE * (current_high - current_low)):
+            return limits
+        span = high - low or abs(high) or 1.0
+        return low - before * span, high + after * span
+
+    def render(self, x, y) -> float:
+        """
+        Shows new data, redrawing the axes only if the limits have to change.
+
+        :param x: the x values
+        :param y: the y values
+        :return: how long the frame took in seconds
+        """
+        start = time.perf_counter()
+        self.line.set_data(x, y)
+        redraw = self.background is None
+        if len(x):
+            x_limits = PlotRenderer._padded_limits(
+                self.axes.get_xlim(), float(numpy.min(x)), float(numpy.max(x)), 0.0, PlotRenderer.X_MARGIN
+            )
+            y_limits = PlotRenderer._padded_limits(
+                self.axes.get_ylim(), float(numpy.min(y)), float(numpy.max(y)),
+                PlotRenderer.Y_MARGIN, PlotRenderer.Y_MARGIN
+            )
+            if x_limits != self.axes.get_xlim() or y_limits != self.axes.get_ylim():
+                self.axes.set_xlim(x_limits)
+                self.axes.set_ylim(y_limits)
+                redraw = True
+        if redraw:
+            # Draws the axes and caches them as the background (see _on_draw)
+            self.canvas.draw()
+            self.full_draws += 1
+        else:
+            self.canvas.restore_region(self.background)
+            self.axes.draw_artist(self.line)
+        self.canvas.blit(self.axes.bbox)
+        elapsed = time.perf_counter() - start
+        self.frames += 1
+        if self.render_time is None:
+            self.render_time = elapsed
+        else:
+            self.render_time += PlotRenderer.SMOOTHING * (elapsed - self.render_time)
+        return elapsed
+
+    def next_interval(self) -> int:
+        """
+        Suggests how long to wait before the next frame, from the recent frame times.
+
+        :return: the interval in milliseconds
+        """
+        if self.render_time is None:
+            return PlotRenderer.MIN_INTERVAL
+        interval = self.render_time / PlotRenderer.TARGET_SHARE * 1000
+        return int(min(max(interval, PlotRenderer.MIN_INTERVAL), PlotRenderer.MAX_INTERVAL))